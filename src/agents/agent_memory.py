@@ -1,16 +1,16 @@
-import redis
 import logging
+from src.config.registry import registry
 
 class AgentMemory:
-    """Stores AI Agent decisions for optimized learning"""
+    """Stores AI Agent decisions for optimized learning (buffered, flushed to Redis in pipelined batches)"""
 
-    def __init__(self):
-        self.redis_client = redis.StrictRedis(host="localhost", port=6379, db=0)
+    def __init__(self, store=None):
+        self.store = store if store is not None else registry.get("agent_memory")  # one write-behind store per process
 
-    def store_memory(self, agent_name, key, value):
-        """Store AI agent's past actions"""
+    def store_memory(self, agent_name, key, value, ttl=None):
+        """Store AI agent's past actions (returns immediately; ttl in seconds overrides the default)"""
         try:
-            self.redis_client.set(f"{agent_name}:{key}", value)
+            self.store.put(f"{agent_name}:{key}", value, ttl)
             logging.info(f"Memory Stored: {agent_name} -> {key} -> {value}")
         except Exception as e:
             logging.error(f"Memory Storage Failed: {e}")
@@ -18,7 +18,16 @@ class AgentMemory:
     def retrieve_memory(self, agent_name, key):
         """Retrieve past AI decisions"""
         try:
-            return self.redis_client.get(f"{agent_name}:{key}")
+            return self.store.get(f"{agent_name}:{key}")
         except Exception as e:
             logging.error(f"Memory Retrieval Failed: {e}")
             return None
+
+    def retrieve_memories(self, agent_name, keys):
+        """Retrieve past AI decisions for many keys in one round trip"""
+        try:
+            memories = self.store.get_many(f"{agent_name}:{key}" for key in keys)
+            return {key: memories[f"{agent_name}:{key}"] for key in keys}
+        except Exception as e:
+            logging.error(f"Memory Retrieval Failed: {e}")
+            return {}
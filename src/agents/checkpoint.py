@@ -0,0 +1,197 @@
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.config.settings import (WORKFLOW_CHECKPOINT_BACKEND, WORKFLOW_CHECKPOINT_PATH, WORKFLOW_CHECKPOINT_REDIS_URL,
+                                 WORKFLOW_CHECKPOINT_BATCH_SIZE, WORKFLOW_RUNNER_ID)
+
+# Recent write-latency samples kept for percentile reporting
+LATENCY_SAMPLES = 4096
+
+# Checkpoint operations, applied in submission order: (kind, event_id, field, status)
+Operation = Tuple[str, str, Optional[str], Optional[str]]
+
+class RedisCheckpointBackend:
+    """ Redis Checkpoints: a Set of Active Event IDs plus One Hash of Node Statuses per Event, Both Scoped to the Runner
+
+    Runners sharing one Redis only ever see (and resume) their own workflows, never another process's in-flight ones.
+    """
+
+    def __init__(self, url: str = WORKFLOW_CHECKPOINT_REDIS_URL, runner_id: str = WORKFLOW_RUNNER_ID):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = f"workflow:checkpoint:{runner_id}"
+        self.active_key = f"{self.prefix}:active"
+
+    def _key(self, event_id: str) -> str:
+        return f"{self.prefix}:{event_id}"
+
+    def apply(self, operations: Sequence[Operation]):
+        pipeline = self.client.pipeline(transaction=False)
+        for kind, event_id, field, status in operations:
+            if kind == "begin":
+                pipeline.sadd(self.active_key, event_id)
+            elif kind == "node":
+                pipeline.hset(self._key(event_id), field, status)
+            else:
+                pipeline.delete(self._key(event_id))
+                pipeline.srem(self.active_key, event_id)
+        pipeline.execute()
+
+    def incomplete(self) -> Dict[str, Dict[str, str]]:
+        event_ids = sorted(self.client.smembers(self.active_key))
+        pipeline = self.client.pipeline(transaction=False)
+        for event_id in event_ids:
+            pipeline.hgetall(self._key(event_id))
+        return dict(zip(event_ids, pipeline.execute()))
+
+
+class SQLiteCheckpointBackend:
+    """ Embedded Checkpoints in a Local SQLite File (WAL; one transaction per batch of operations), Scoped to the Runner """
+
+    def __init__(self, path: str = WORKFLOW_CHECKPOINT_PATH, runner_id: str = WORKFLOW_RUNNER_ID):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.runner_id = runner_id
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS workflows (runner_id TEXT, event_id TEXT, started_at REAL, PRIMARY KEY (runner_id, event_id))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS node_status (runner_id TEXT, event_id TEXT, field TEXT, status TEXT, "
+                                    "PRIMARY KEY (runner_id, event_id, field))")
+
+    def apply(self, operations: Sequence[Operation]):
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN")
+            try:
+                for kind, event_id, field, status in operations:
+                    if kind == "begin":
+                        cursor.execute("INSERT OR IGNORE INTO workflows VALUES (?, ?, ?)", (self.runner_id, event_id, time.time()))
+                    elif kind == "node":
+                        cursor.execute("INSERT OR REPLACE INTO node_status VALUES (?, ?, ?, ?)", (self.runner_id, event_id, field, status))
+                    else:
+                        cursor.execute("DELETE FROM node_status WHERE runner_id = ? AND event_id = ?", (self.runner_id, event_id))
+                        cursor.execute("DELETE FROM workflows WHERE runner_id = ? AND event_id = ?", (self.runner_id, event_id))
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def incomplete(self) -> Dict[str, Dict[str, str]]:
+        with self.lock:
+            workflows = {event_id: {} for (event_id,) in self.connection.execute(
+                "SELECT event_id FROM workflows WHERE runner_id = ? ORDER BY started_at", (self.runner_id,))}
+            for event_id, field, status in self.connection.execute(
+                    "SELECT event_id, field, status FROM node_status WHERE runner_id = ?", (self.runner_id,)):
+                if event_id in workflows:
+                    workflows[event_id][field] = status
+        return workflows
+
+
+class WorkflowCheckpoint:
+    """ Delta Checkpoints for the Agent DAG: One Status Change per Completed Node, Written Behind
+
+    Nodes only enqueue their change; a writer thread applies queued changes in order, in batches, so
+    checkpoint I/O never sits on a node's critical path. A crash can lose the last unflushed changes,
+    in which case those nodes simply run again on resume (at-least-once).
+    """
+
+    def __init__(self, backend, batch_size: int = WORKFLOW_CHECKPOINT_BATCH_SIZE):
+        self.backend = backend
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.batches = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # enqueue -> durable, seconds
+        self.batch_seconds = deque(maxlen=LATENCY_SAMPLES)
+        self._worker = threading.Thread(target=self._run, name="workflow-checkpoint", daemon=True)
+        self._worker.start()
+
+    def begin(self, event_id: str):
+        """ Marks a workflow as in flight (resumable even before its first node completes) """
+        self._queue.put((("begin", event_id, None, None), time.perf_counter()))
+
+    def record(self, event_id: str, field: str, status: str):
+        """ Records one node's new status (the delta, not the whole state) """
+        self._queue.put((("node", event_id, field, status), time.perf_counter()))
+
+    def complete(self, event_id: str):
+        """ Drops a finished workflow's checkpoint """
+        self._queue.put((("complete", event_id, None, None), time.perf_counter()))
+
+    def incomplete(self) -> Dict[str, Dict[str, str]]:
+        """ event_id -> {status field: status} for every workflow this runner began but never completed """
+        self.flush()
+        return self.backend.incomplete()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            requests = [request for request in batch if request is not None and not isinstance(request[0], threading.Event)]
+            if requests:
+                self._write(requests)
+            for request in batch:
+                if request is not None and isinstance(request[0], threading.Event):
+                    request[0].set()  # flush() barrier: everything queued before it is written
+            if any(request is None for request in batch):
+                return
+
+    def _write(self, requests: List[tuple], attempts: int = 3):
+        started = time.perf_counter()
+        for attempt in range(attempts):
+            try:
+                self.backend.apply([operation for operation, _ in requests])
+                break
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                logging.error(f"Workflow Checkpoint Write Failed ({len(requests)} Changes, Attempt {attempt + 1}): {e}")
+                if attempt == attempts - 1:
+                    return  # lost changes only mean those nodes re-run on resume
+                time.sleep(0.1 * 2 ** attempt)
+        finished = time.perf_counter()
+        with self._lock:
+            self.writes += len(requests)
+            self.batches += 1
+            self.batch_seconds.append(finished - started)
+            self.latencies.extend(finished - enqueued for _, enqueued in requests)
+
+    def flush(self, timeout: Optional[float] = None):
+        """ Waits until every change queued so far has been written """
+        barrier = threading.Event()
+        self._queue.put((barrier, None))
+        barrier.wait(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies, batch_seconds = sorted(self.latencies), sorted(self.batch_seconds)
+            percentile = lambda samples, fraction: samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000 if samples else 0.0
+            return {
+                "writes": self.writes, "batches": self.batches, "failures": self.failures, "queued": self._queue.qsize(),
+                "write_latency_ms": {"p50": percentile(latencies, 0.5), "p99": percentile(latencies, 0.99)},
+                "batch_write_ms": {"p50": percentile(batch_seconds, 0.5), "p99": percentile(batch_seconds, 0.99)},
+            }
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+
+def create_checkpoint(backend: str = WORKFLOW_CHECKPOINT_BACKEND) -> Optional[WorkflowCheckpoint]:
+    """ Checkpoint store for the configured backend ("redis", "sqlite" or "none") """
+    if backend == "none":
+        return None
+    return WorkflowCheckpoint(SQLiteCheckpointBackend() if backend == "sqlite" else RedisCheckpointBackend())
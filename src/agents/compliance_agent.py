@@ -2,6 +2,8 @@ import logging
 from src.retrieval.hybrid_search import hybrid_search
 from src.database.db_operations import update_shipment_compliance
 from src.agents.agent_memory import AgentMemory
+from src.agents.memoization import rule_index_version, shipment_version
+from src.config.registry import registry
 
 class ComplianceAgent:
     """AI Agent for Automated Compliance Fixes"""
@@ -9,8 +11,15 @@ class ComplianceAgent:
     def __init__(self):
         self.agent_name = "Compliance AI"
         self.memory = AgentMemory()
+        self.memo = registry.get("agent_memo")
 
     def check_and_fix_compliance(self, shipment_id):
+        """Check and fix compliance issues (reuses the last fix while the shipment and rule indexes are unchanged)"""
+        return self.memo.run(self.agent_name, shipment_id,
+                             lambda: {"shipment": shipment_version(shipment_id), "rules": rule_index_version()},
+                             lambda: self._check_and_fix_compliance(shipment_id))
+
+    def _check_and_fix_compliance(self, shipment_id):
         """Check and fix compliance issues using Hybrid Search"""
         try:
             compliance_data = hybrid_search(f"Missing docs for shipment {shipment_id}")
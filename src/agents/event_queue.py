@@ -0,0 +1,201 @@
+import time
+import heapq
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set
+from src.config.settings import (EVENT_QUEUE_CAPACITY, EVENT_COALESCE_WINDOW_MS, EVENT_QUEUE_SUBMIT_TIMEOUT,
+                                 WORKFLOW_MAX_EVENTS_IN_FLIGHT)
+
+# Priorities (lower runs first)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+# Submit outcomes
+QUEUED = "queued"
+COALESCED = "coalesced"
+REJECTED = "rejected"
+
+# Recent queue-lag samples kept for percentile reporting
+LAG_SAMPLES = 4096
+
+@dataclass
+class _Pending:
+    """ The one outstanding event of an entity (later events for the entity replace it) """
+    event_id: str
+    entity_id: str
+    priority: int
+    first_seen: float
+    merged: int = 0
+    ready: bool = False  # past its coalescing window, in the priority heap
+    version: int = 0  # heap entries with an older version are stale
+
+
+class EventIntakeQueue:
+    """ Priority Intake Queue in Front of the Agent Workflow
+
+    Events are keyed by entity (e.g. shipment ID). An entity's event is held for the coalescing window;
+    events for the same entity arriving meanwhile supersede it (latest event ID, highest priority), so a
+    burst costs one workflow run. An entity never has two runs in flight: events arriving during a run
+    queue one follow-up run. Capacity bounds distinct pending entities; when full, submit() blocks up to
+    a timeout and then rejects. A dispatcher thread starts ready events in priority order, keeping at most
+    max_in_flight workflows running.
+    """
+
+    def __init__(self, dispatch: Callable[[str], Future], capacity: int = EVENT_QUEUE_CAPACITY,
+                 coalesce_window_ms: float = EVENT_COALESCE_WINDOW_MS, max_in_flight: int = WORKFLOW_MAX_EVENTS_IN_FLIGHT):
+        self.dispatch = dispatch
+        self.capacity = capacity
+        self.window = coalesce_window_ms / 1000
+        self.max_in_flight = max_in_flight
+        self._pending: Dict[str, _Pending] = {}
+        self._waiting = deque()  # (ready_at, entity_id), in arrival order -> ready_at ascending
+        self._ready = []  # heap of (priority, seq, entity_id, version)
+        self._blocked: Set[str] = set()  # ready, but the entity's previous run is still in flight
+        self._in_flight: Set[str] = set()
+        self._seq = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # Metrics
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.dispatched = 0
+        self.failed = 0
+        self.lags = deque(maxlen=LAG_SAMPLES)  # first event received -> workflow started, seconds
+
+        self._worker = threading.Thread(target=self._run, name="event-intake", daemon=True)
+        self._worker.start()
+
+    def submit(self, event_id: str, entity_id: Optional[str] = None, priority: int = PRIORITY_NORMAL,
+               timeout: Optional[float] = EVENT_QUEUE_SUBMIT_TIMEOUT) -> str:
+        """ Enqueues one event; returns "queued", "coalesced" or "rejected" (queue full past timeout, or closed) """
+        entity_id = entity_id or event_id
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            self.submitted += 1
+            while True:
+                if self._closed:
+                    self.rejected += 1
+                    return REJECTED
+                pending = self._pending.get(entity_id)
+                if pending is not None:
+                    self._supersede(pending, event_id, priority)
+                    return COALESCED
+                if len(self._pending) < self.capacity:
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    self.rejected += 1
+                    logging.error(f"Event Intake Queue Full ({self.capacity} Entities), Rejected {event_id}")
+                    return REJECTED
+                self._condition.wait(remaining)
+
+            now = time.monotonic()
+            self._pending[entity_id] = _Pending(event_id, entity_id, priority, now)
+            self._waiting.append((now + self.window, entity_id))
+            self._condition.notify_all()
+            return QUEUED
+
+    def _supersede(self, pending: _Pending, event_id: str, priority: int):
+        pending.event_id = event_id
+        pending.merged += 1
+        self.coalesced += 1
+        if priority < pending.priority:
+            pending.priority = priority
+            if pending.ready and pending.entity_id not in self._blocked:
+                pending.version += 1
+                self._push(pending)
+                self._condition.notify_all()
+
+    def _push(self, pending: _Pending):
+        self._seq += 1
+        heapq.heappush(self._ready, (pending.priority, self._seq, pending.entity_id, pending.version))
+
+    def _promote(self, now: float) -> Optional[float]:
+        """ Moves entities past their window into the priority heap; returns seconds until the next one is due """
+        while self._waiting:
+            ready_at, entity_id = self._waiting[0]
+            if ready_at > now:
+                return ready_at - now
+            self._waiting.popleft()
+            pending = self._pending[entity_id]
+            pending.ready = True
+            if entity_id in self._in_flight:
+                self._blocked.add(entity_id)
+            else:
+                self._push(pending)
+        return None
+
+    def _pop_ready(self) -> Optional[_Pending]:
+        while self._ready:
+            _, _, entity_id, version = heapq.heappop(self._ready)
+            pending = self._pending.get(entity_id)
+            if pending is not None and pending.version == version:
+                return pending
+        return None
+
+    def _run(self):
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        while True:
+            slots.acquire()
+            with self._condition:
+                while True:
+                    wait = self._promote(time.monotonic())
+                    pending = self._pop_ready()
+                    if pending is not None:
+                        break
+                    if self._closed and not self._pending and not self._in_flight:
+                        slots.release()
+                        return
+                    self._condition.wait(wait)
+                del self._pending[pending.entity_id]
+                self._in_flight.add(pending.entity_id)
+                self.dispatched += 1
+                self.lags.append(time.monotonic() - pending.first_seen)
+                self._condition.notify_all()  # capacity freed for blocked submitters
+
+            try:
+                future = self.dispatch(pending.event_id)
+            except Exception as e:
+                future = Future()
+                future.set_exception(e)
+            future.add_done_callback(lambda done, entity_id=pending.entity_id: self._finished(entity_id, done, slots))
+
+    def _finished(self, entity_id: str, future: Future, slots: threading.BoundedSemaphore):
+        if future.exception() is not None:
+            logging.error(f"Workflow for {entity_id} Failed: {future.exception()}")
+        with self._condition:
+            if future.exception() is not None:
+                self.failed += 1
+            self._in_flight.discard(entity_id)
+            if entity_id in self._blocked:
+                self._blocked.discard(entity_id)
+                self._push(self._pending[entity_id])
+            self._condition.notify_all()
+        slots.release()
+
+    def stats(self) -> dict:
+        """ Depth, in-flight count, coalescing / rejection counters and queue lag percentiles """
+        with self._condition:
+            lags = sorted(self.lags)
+            oldest = min((pending.first_seen for pending in self._pending.values()), default=None)
+            percentile = lambda fraction: lags[min(len(lags) - 1, int(len(lags) * fraction))] * 1000 if lags else 0.0
+            return {
+                "depth": len(self._pending), "capacity": self.capacity, "in_flight": len(self._in_flight),
+                "submitted": self.submitted, "coalesced": self.coalesced, "rejected": self.rejected,
+                "dispatched": self.dispatched, "failed": self.failed,
+                "queue_lag_ms": {"p50": percentile(0.5), "p99": percentile(0.99)},
+                "oldest_pending_ms": (time.monotonic() - oldest) * 1000 if oldest is not None else 0.0,
+            }
+
+    def close(self, timeout: Optional[float] = None):
+        """ Stops accepting events and waits until everything queued has run """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
@@ -2,6 +2,8 @@ import logging
 from src.models.predictive_maintenance import detect_failures
 from src.database.db_operations import schedule_maintenance
 from src.agents.agent_memory import AgentMemory
+from src.agents.memoization import sensor_window
+from src.config.registry import registry
 
 class MaintenanceAgent:
     """AI Agent for Predictive Equipment Monitoring"""
@@ -9,8 +11,14 @@ class MaintenanceAgent:
     def __init__(self):
         self.agent_name = "Maintenance AI"
         self.memory = AgentMemory()
+        self.memo = registry.get("agent_memo")
 
     def monitor_and_fix_equipment(self, equipment_id):
+        """AI-driven predictive maintenance (runs once per equipment and sensor window)"""
+        return self.memo.run(self.agent_name, equipment_id, lambda: {"sensor_window": sensor_window()},
+                             lambda: self._monitor_and_fix_equipment(equipment_id))
+
+    def _monitor_and_fix_equipment(self, equipment_id):
         """AI-driven predictive maintenance for logistics equipment"""
         try:
             failure_risk = detect_failures(equipment_id)
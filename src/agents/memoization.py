@@ -0,0 +1,107 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+from src.config.settings import AGENT_MEMO_ENABLED, AGENT_MEMO_TTLS, MAINTENANCE_SENSOR_WINDOW_SECONDS
+
+def fingerprint(inputs: Any) -> str:
+    """ Stable digest of an agent's relevant inputs """
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def shipment_version(shipment_id) -> Optional[Dict]:
+    """ The shipment fields agents act on (status, ETA, last update); None when the shipment does not exist """
+    from src.database.db_operations import DatabaseOperations
+    from src.database.shipment_cache import shipment_snapshot
+    db = DatabaseOperations()
+    try:
+        shipment = db.get_shipment(shipment_id)
+        if shipment is None:
+            return None
+        return {**shipment_snapshot(shipment), "updated_at": getattr(shipment, "updated_at", None)}
+    finally:
+        db.close()
+
+def inventory_version(product_id) -> Optional[Dict]:
+    """ A product's inventory record as stored (stock level, last update / version); None when it does not exist """
+    from src.database.db_operations import DatabaseOperations
+    db = DatabaseOperations()
+    try:
+        inventory = db.get_inventory(product_id)
+        if inventory is None:
+            return None
+        return {column.name: getattr(inventory, column.name) for column in inventory.__table__.columns}
+    finally:
+        db.close()
+
+def rule_index_version() -> str:
+    """ Content digest of the compliance rule indexes (shared by every process holding the same rules) """
+    from src.retrieval.hybrid_search import get_hybrid_search
+    return get_hybrid_search().indexes.content_version()
+
+def sensor_window(now: Optional[float] = None, window_seconds: int = MAINTENANCE_SENSOR_WINDOW_SECONDS) -> int:
+    """ Index of the sensor aggregation window containing now """
+    return int((time.time() if now is None else now) // window_seconds)
+
+
+class AgentResultMemo:
+    """ Memoizes Agent Results on (Agent, Entity, Input Fingerprint) in Agent Memory
+
+    An agent run is skipped when the stored result for the entity was produced from the same inputs and
+    is younger than the agent's freshness limit. The fingerprint is re-taken after a run, so the agent's
+    own writes to its inputs (e.g. a new route) do not invalidate the result it just produced. Failed
+    runs ("error" status) are never stored.
+    """
+
+    def __init__(self, memory, ttls: Dict[str, float] = AGENT_MEMO_TTLS, enabled: bool = AGENT_MEMO_ENABLED):
+        self.memory = memory
+        self.ttls = ttls
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, agent_name: str, outcome: str):
+        with self._lock:
+            counts = self.counts.setdefault(agent_name, {"hits": 0, "misses": 0, "stale": 0, "errors": 0})
+            counts[outcome] += 1
+
+    def run(self, agent_name: str, entity_id, inputs: Callable[[], Any], compute: Callable[[], Dict]) -> Dict:
+        """ Stored result when the entity's inputs are unchanged and fresh, otherwise compute() (and store it) """
+        ttl = self.ttls.get(agent_name, 0)
+        if not self.enabled or ttl <= 0:
+            return compute()
+
+        try:
+            current = fingerprint(inputs())
+        except Exception as e:
+            logging.error(f"Agent Input Fingerprint Failed for {agent_name} {entity_id}: {e}")
+            self._count(agent_name, "errors")
+            return compute()
+
+        entry = self.memory.retrieve_memory(f"{agent_name}:memo", entity_id)
+        if isinstance(entry, dict) and entry.get("fingerprint") == current:
+            if time.time() - entry.get("stored_at", 0) <= ttl:
+                self._count(agent_name, "hits")
+                logging.info(f"{agent_name} Reused Result for {entity_id} (Inputs Unchanged)")
+                return entry["result"]
+            self._count(agent_name, "stale")
+        else:
+            self._count(agent_name, "misses")
+
+        result = compute()
+        if result.get("status") == "error":
+            return result
+        try:
+            after = fingerprint(inputs())
+        except Exception as e:
+            logging.error(f"Agent Input Fingerprint Failed for {agent_name} {entity_id}: {e}")
+            return result
+        self.memory.store_memory(f"{agent_name}:memo", entity_id, {"fingerprint": after, "stored_at": time.time(), "result": result},
+                                 ttl=max(1, int(ttl)))
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """ Hits, misses (inputs changed / first run), stale (too old) and fingerprint errors per agent """
+        with self._lock:
+            return {agent_name: dict(counts) for agent_name, counts in self.counts.items()}
@@ -0,0 +1,41 @@
+import time
+import threading
+
+class TokenBucket:
+    """ In-Process Token Bucket: rate Acquisitions per Second on Average, Bursts up to burst """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """ Blocks the calling thread until a token is available """
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.acquired += 1
+                    if waited:
+                        self.throttled += 1
+                        self.wait_seconds += waited
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"rate_per_second": self.rate, "burst": self.burst, "acquired": self.acquired,
+                    "throttled": self.throttled, "throttle_wait_s": round(self.wait_seconds, 3)}
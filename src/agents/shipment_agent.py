@@ -2,6 +2,8 @@ import logging
 from src.models.route_optimizer import optimize_route
 from src.database.db_operations import update_shipment_route
 from src.agents.agent_memory import AgentMemory
+from src.agents.memoization import shipment_version
+from src.config.registry import registry
 
 class ShipmentAgent:
     """AI Agent for Autonomous Shipment Rerouting"""
@@ -9,8 +11,14 @@ class ShipmentAgent:
     def __init__(self):
         self.agent_name = "Shipment AI"
         self.memory = AgentMemory()
+        self.memo = registry.get("agent_memo")
 
     def reroute_shipment(self, shipment_id):
+        """AI-powered shipment rerouting (reuses the last route while the shipment record is unchanged)"""
+        return self.memo.run(self.agent_name, shipment_id, lambda: {"shipment": shipment_version(shipment_id)},
+                             lambda: self._reroute_shipment(shipment_id))
+
+    def _reroute_shipment(self, shipment_id):
         """AI-powered shipment rerouting based on live tracking data"""
         try:
             new_route = optimize_route(shipment_id)
@@ -4,6 +4,15 @@ import redis
 from langgraph.graph import StateGraph
 from enum import Enum
 import json  
+import threading
+from dataclasses import dataclass
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+from src.agents.checkpoint import create_checkpoint
+from src.agents.dag_executor import DAGExecutor
+from src.agents.event_queue import EventIntakeQueue, PRIORITY_NORMAL
+from src.config.settings import (WORKFLOW_MAX_EVENTS_IN_FLIGHT, WORKFLOW_NODE_WORKERS, WORKFLOW_NODE_CONCURRENCY, WORKFLOW_NODE_RATE_LIMITS,
+                                 WORKFLOW_RESUME_ON_START)
 from src.agents.compliance_agent import ComplianceAgent
 from src.agents.shipment_agent import ShipmentAgent
 from src.agents.warehouse_agent import WarehouseAgent
@@ -21,6 +30,7 @@ class TaskStatus(Enum):
     FAILED = "FAILED"
 
 
+@dataclass
 class LogisticsState:
     """ Workflow State Tracking (Stores execution progress) """
     compliance_status: TaskStatus = TaskStatus.PENDING
@@ -30,6 +40,22 @@ class LogisticsState:
     event_id: str = ""  # Unique ID for tracking tasks
 
 
+#DAG Dependencies (reroute_shipment & optimize_inventory only need check_compliance, so they can run in parallel)
+WORKFLOW_EDGES = [
+    ("check_compliance", "reroute_shipment"),
+    ("check_compliance", "optimize_inventory"),
+    ("reroute_shipment", "monitor_equipment"),
+]
+
+# State field each node updates (checkpoints store only these per-node deltas)
+NODE_STATUS_FIELDS = {
+    "check_compliance": "compliance_status",
+    "reroute_shipment": "shipment_status",
+    "optimize_inventory": "inventory_status",
+    "monitor_equipment": "maintenance_status",
+}
+
+
 class TaskManager:
     """ Orchestrates all AI agents and manages DAG-based execution """
 
@@ -39,26 +65,54 @@ class TaskManager:
         self.shipment_agent = ShipmentAgent()
         self.warehouse_agent = WarehouseAgent()
         self.maintenance_agent = MaintenanceAgent()
+        self.checkpoint = create_checkpoint()  # Redis / SQLite per settings, None when disabled
 
         # Initialize LangGraph Workflow DAG
         self.workflow = StateGraph(LogisticsState)
         
         # Define DAG Nodes (Each AI agent is a node in the workflow)
-        self.workflow.add_node("check_compliance", self.check_compliance)
-        self.workflow.add_node("reroute_shipment", self.reroute_shipment)
-        self.workflow.add_node("optimize_inventory", self.optimize_inventory)
-        self.workflow.add_node("monitor_equipment", self.monitor_equipment)
+        self.nodes = {name: self._checkpointed(name, node) for name, node in {
+            "check_compliance": self.check_compliance,
+            "reroute_shipment": self.reroute_shipment,
+            "optimize_inventory": self.optimize_inventory,
+            "monitor_equipment": self.monitor_equipment,
+        }.items()}
+        for name, node in self.nodes.items():
+            self.workflow.add_node(name, node)
 
         #Define State Transitions (DAG dependencies)
-        self.workflow.add_edge("check_compliance", "reroute_shipment")  
-        self.workflow.add_edge("check_compliance", "optimize_inventory")  
-        self.workflow.add_edge("reroute_shipment", "monitor_equipment")  
-
-        #Enable Checkpointing (Using Redis for persistent AI workflow state tracking)
-        self.workflow.set_checkpoint(RedisCheckpoint())
+        for parent, child in WORKFLOW_EDGES:
+            self.workflow.add_edge(parent, child)
 
         self.app = self.workflow.compile()
 
+        #Parallel Executor (same DAG; bounded worker pool & optional rate limit per node, shared by all events in flight)
+        self.executor = DAGExecutor(self.nodes, WORKFLOW_EDGES, WORKFLOW_NODE_CONCURRENCY, default_workers=WORKFLOW_NODE_WORKERS,
+                                    rate_limits=WORKFLOW_NODE_RATE_LIMITS)
+
+        #Resume Workflows Interrupted by a Crash / Restart (in the background, from their last completed nodes)
+        #The unfinished set is read here, before any new work is accepted, so workflows started later are never re-run
+        if self.checkpoint is not None and WORKFLOW_RESUME_ON_START:
+            interrupted = self.load_incomplete_workflows()
+            if interrupted:
+                threading.Thread(target=self.resume_incomplete_workflows, args=(WORKFLOW_MAX_EVENTS_IN_FLIGHT, interrupted),
+                                 name="workflow-resume", daemon=True).start()
+
+        #Event Intake (priority queue coalescing bursts per entity, feeding the parallel executor)
+        self.intake = EventIntakeQueue(self.submit_workflow)
+
+    def _checkpointed(self, name, node):
+        """ Wraps a node so its status change is checkpointed (queued, written behind) when it returns """
+        field = NODE_STATUS_FIELDS[name]
+
+        def run(state: LogisticsState):
+            before = getattr(state, field)
+            state = node(state)
+            if self.checkpoint is not None and getattr(state, field) != before:
+                self.checkpoint.record(state.event_id, field, getattr(state, field).value)
+            return state
+        return run
+
 # Compliance Agent Execution
     def check_compliance(self, state: LogisticsState):
         """ Checks and fixes compliance issues """
@@ -126,17 +180,98 @@ class TaskManager:
     # Executes the AI Workflow using DAG-based Execution
     def execute_workflow(self, event_id):
         """ Executes the DAG-based AI workflow """
-        state = LogisticsState(event_id=event_id)
-        final_state = self.app.invoke(state)
+        final_state = self.app.invoke(self._begin(event_id))
+        return self._record(final_state)
+
+    def execute_workflow_parallel(self, event_id):
+        """ Executes the DAG with independent branches (shipment rerouting, inventory) running concurrently """
+        final_state = self.executor.run(self._begin(event_id))
+        return self._record(final_state)
+
+    def submit_workflow(self, event_id) -> Future:
+        """ Starts one workflow on the parallel executor without waiting; the future resolves to the final state """
+        done = Future()
+
+        def finished(future: Future):
+            try:
+                done.set_result(self._record(future.result()))
+            except Exception as e:
+                done.set_exception(e)
+        self.executor.submit(self._begin(event_id)).add_done_callback(finished)
+        return done
+
+    def enqueue_event(self, event_id, entity_id: Optional[str] = None, priority: int = PRIORITY_NORMAL) -> str:
+        """ Queues an event for the workflow; events for the same entity (e.g. shipment) within the window run once """
+        return self.intake.submit(event_id, entity_id, priority)
 
+    def intake_stats(self):
+        """ Intake queue depth, coalesced / rejected events and queue lag """
+        return self.intake.stats()
+
+    def execute_batch(self, event_ids: List[str], max_events: int = WORKFLOW_MAX_EVENTS_IN_FLIGHT) -> List[LogisticsState]:
+        """ Drains a backlog of events in parallel (at most max_events in flight, node limits shared across events) """
+        return self._run_batch([self._begin(event_id) for event_id in event_ids], max_events)
+
+    def load_incomplete_workflows(self) -> Dict[str, Dict[str, str]]:
+        """ Checkpointed workflows this runner began but never completed (event_id -> node statuses) """
+        try:
+            return self.checkpoint.incomplete() if self.checkpoint is not None else {}
+        except Exception as e:
+            logging.error(f"Workflow Checkpoint Load Failed: {e}")
+            return {}
+
+    def resume_incomplete_workflows(self, max_events: int = WORKFLOW_MAX_EVENTS_IN_FLIGHT,
+                                    checkpoints: Optional[Dict[str, Dict[str, str]]] = None) -> List[LogisticsState]:
+        """ Re-runs checkpointed, unfinished workflows in bulk (the given snapshot, else all loaded now: only call
+        this before accepting new work); nodes already COMPLETED are skipped """
+        checkpoints = self.load_incomplete_workflows() if checkpoints is None else checkpoints
+        if not checkpoints:
+            return []
+
+        states = []
+        for event_id, statuses in checkpoints.items():
+            state = LogisticsState(event_id=event_id)
+            for field, status in statuses.items():
+                if field in NODE_STATUS_FIELDS.values():
+                    setattr(state, field, TaskStatus(status))
+            states.append(state)
+        logging.info(f"Resuming {len(states)} Incomplete Workflows")
+        return self._run_batch(states, max_events)
+
+    def checkpoint_stats(self):
+        """ Checkpoint write latency (queued -> durable) and batch sizes """
+        return self.checkpoint.stats() if self.checkpoint is not None else {}
+
+    def _begin(self, event_id):
+        if self.checkpoint is not None:
+            self.checkpoint.begin(event_id)
+        return LogisticsState(event_id=event_id)
+
+    def _run_batch(self, states: List[LogisticsState], max_events: int) -> List[LogisticsState]:
+        final_states = self.executor.run_batch(states, max_events)
+        logging.info(f"Workflow Batch Complete: {len(final_states)} Events, {self.executor.stats()}")
+        return [self._record(final_state) for final_state in final_states]
+
+    def memo_stats(self):
+        """ Agent result reuse (hits / misses / stale) per agent """
+        return self.compliance_agent.memo.stats()
+
+    def workflow_stats(self):
+        """ Per-node latency, queue depth & running tasks of the parallel executor """
+        return self.executor.stats()
+
+    def _record(self, final_state):
         # Store execution in AI memory for learning-based decision-making
-        self.memory.store_memory("TaskManager", event_id, {
+        self.memory.store_memory("TaskManager", final_state.event_id, {
             "compliance": final_state.compliance_status.value,
             "shipment": final_state.shipment_status.value,
             "inventory": final_state.inventory_status.value,
             "maintenance": final_state.maintenance_status.value
         })
 
+        if self.checkpoint is not None:
+            self.checkpoint.complete(final_state.event_id)
+
         logging.info(f"Workflow Execution Complete: {final_state}")
         return final_state
 
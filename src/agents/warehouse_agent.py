@@ -2,6 +2,8 @@ import logging
 from src.models.warehouse_ai import warehouse_prediction
 from src.database.db_operations import update_inventory
 from src.agents.agent_memory import AgentMemory
+from src.agents.memoization import inventory_version
+from src.config.registry import registry
 
 class WarehouseAgent:
     """AI Agent for Warehouse Stock Optimization"""
@@ -9,8 +11,14 @@ class WarehouseAgent:
     def __init__(self):
         self.agent_name = "Warehouse AI"
         self.memory = AgentMemory()
+        self.memo = registry.get("agent_memo")
 
     def optimize_inventory(self, product_id):
+        """Predict and optimize warehouse inventory levels (reuses the last prediction while the inventory record is unchanged)"""
+        return self.memo.run(self.agent_name, product_id, lambda: {"inventory": inventory_version(product_id)},
+                             lambda: self._optimize_inventory(product_id))
+
+    def _optimize_inventory(self, product_id):
         """Predict and optimize warehouse inventory levels"""
         try:
             predicted_stock = warehouse_prediction(product_id)
@@ -0,0 +1,245 @@
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Sequence, Set, Tuple
+from src.config.settings import (ALERT_DIGEST_WINDOW_MS, ALERT_DIGEST_MAX_LINES, ALERT_QUEUE_CAPACITY, ALERT_CHANNEL_WORKERS,
+                                 ALERT_MAX_RETRIES, ALERT_RETRY_BACKOFF_MS, ALERT_SMS_GATEWAY_URL)
+
+# Recent delivery-latency samples kept per channel for percentile reporting
+LATENCY_SAMPLES = 4096
+
+# Errors a retry cannot fix (broken setup, not a flaky server)
+NON_RETRYABLE = (ImportError, AttributeError, TypeError)
+
+# Enqueue outcomes
+SENT = "sent"  # first alert of its group: delivered right away
+GROUPED = "grouped"  # new details, delivered in the group's next digest
+DEDUPLICATED = "deduplicated"  # same details already seen in the window: only counted
+DROPPED = "dropped"  # dispatcher full or closed, or no channel queue had room
+
+@dataclass
+class _Group:
+    """ Alerts of one type for one entity inside the current digest window """
+    alert_type: str
+    entity_id: Optional[str]
+    window_end: float
+    seen: Set[str] = field(default_factory=set)
+    pending: "OrderedDict[str, None]" = field(default_factory=OrderedDict)
+    repeats: int = 0
+    first_pending: Optional[float] = None  # when the oldest undelivered alert arrived
+
+
+class AlertDispatcher:
+    """ Background Alert Delivery: enqueue() Returns Immediately, Channel Worker Pools Deliver
+
+    The first alert of a (type, entity) group goes out at once and opens a digest window. Alerts for
+    the group during the window are deduplicated by their details and sent as one digest when it
+    closes; a group that keeps firing keeps getting one digest per window, deduplicated against the
+    details of the previous window only. Each channel (email, SMS) has its own bounded queue and worker
+    threads, so a slow SMTP server never delays SMS. Failed deliveries are retried with backoff; a full
+    queue drops the message (and counts it).
+    """
+
+    def __init__(self, channels: Sequence, window_ms: float = ALERT_DIGEST_WINDOW_MS, capacity: int = ALERT_QUEUE_CAPACITY,
+                 workers: int = ALERT_CHANNEL_WORKERS, max_retries: int = ALERT_MAX_RETRIES,
+                 retry_backoff_ms: float = ALERT_RETRY_BACKOFF_MS, max_digest_lines: int = ALERT_DIGEST_MAX_LINES):
+        self.channels = list(channels)
+        self.window = window_ms / 1000
+        self.capacity = capacity
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        self.max_digest_lines = max_digest_lines
+        self._groups: Dict[Tuple[str, Optional[str]], _Group] = {}
+        self._windows = deque()  # (window_end, key), ascending
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # Metrics
+        self.enqueued = 0
+        self.deduplicated = 0
+        self.grouped = 0
+        self.digests = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._channel_stats = {channel.name: {"sent": 0, "retries": 0, "failed": 0, "dropped": 0} for channel in self.channels}
+        self._latencies = {channel.name: deque(maxlen=LATENCY_SAMPLES) for channel in self.channels}
+
+        self._queues = {channel.name: queue.Queue(maxsize=capacity) for channel in self.channels}
+        self._workers: List[threading.Thread] = []
+        for channel in self.channels:
+            for index in range(workers):
+                worker = threading.Thread(target=self._deliver_loop, args=(channel,), name=f"alert-{channel.name}-{index}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        self._flusher = threading.Thread(target=self._digest_loop, name="alert-digest", daemon=True)
+        self._flusher.start()
+
+    def enqueue(self, alert_type: str, details: str, entity_id: Optional[Hashable] = None) -> str:
+        """ Queues one alert; returns "sent", "grouped", "deduplicated" or "dropped" (never blocks on delivery) """
+        key = (alert_type, None if entity_id is None else str(entity_id))
+        now = time.monotonic()
+        with self._condition:
+            self.enqueued += 1
+            if self._closed:
+                self.dropped += 1
+                return DROPPED
+            group = self._groups.get(key)
+            if group is None:
+                if len(self._groups) >= self.capacity:
+                    self.dropped += 1
+                    logging.error(f"Alert Dispatcher Full ({self.capacity} Groups), Dropped {alert_type} Alert")
+                    return DROPPED
+                group = self._groups[key] = _Group(alert_type, key[1], now + self.window, seen={details})
+                self._windows.append((group.window_end, key))
+                self._condition.notify()
+            elif details in group.seen:
+                group.repeats += 1
+                group.first_pending = group.first_pending or now
+                self.deduplicated += 1
+                return DEDUPLICATED
+            else:
+                group.seen.add(details)
+                group.pending[details] = None
+                group.first_pending = group.first_pending or now
+                self.grouped += 1
+                return GROUPED
+        if self._submit("Logistics Alert", f"🚨 Alert: {alert_type} - Details: {details}", now):
+            return SENT
+        with self._condition:
+            self.dropped += 1
+            group = self._groups.get(key)
+            if group is not None:
+                group.seen.discard(details)  # never delivered: a repeat goes into the digest instead of being deduplicated
+        return DROPPED
+
+    def _digest(self, group: _Group) -> str:
+        subject = f"{group.alert_type}" + (f" - {group.entity_id}" if group.entity_id is not None else "")
+        lines = [f"🚨 Alert Digest: {subject}: {len(group.pending)} New, {group.repeats} Repeated in the Last {self.window:g}s"]
+        details = list(group.pending)
+        lines.extend(f"- {detail}" for detail in details[:self.max_digest_lines])
+        if len(details) > self.max_digest_lines:
+            lines.append(f"... and {len(details) - self.max_digest_lines} More")
+        return "\n".join(lines)
+
+    def _close_windows(self, now: float, force: bool = False) -> List[Tuple[str, str, float]]:
+        """ Ends every window due by now (all windows when force); returns the digests to deliver """
+        digests = []
+        while self._windows and (force or self._windows[0][0] <= now):
+            _, key = self._windows.popleft()
+            group = self._groups[key]
+            if not group.pending and not group.repeats:
+                del self._groups[key]  # quiet for a whole window: the next alert goes out immediately again
+                continue
+            digests.append((f"Logistics Alert Digest: {group.alert_type}", self._digest(group), group.first_pending))
+            self.digests += 1
+            if force:
+                del self._groups[key]
+                continue
+            # Still firing: open the next window (details just reported stay deduplicated; older ones are forgotten,
+            # so a group that never goes quiet does not accumulate every detail it ever sent)
+            group.seen = set(group.pending)
+            group.pending.clear()
+            group.repeats = 0
+            group.first_pending = None
+            group.window_end = now + self.window
+            self._windows.append((group.window_end, key))
+        return digests
+
+    def _digest_loop(self):
+        while True:
+            with self._condition:
+                while not self._closed and (not self._windows or self._windows[0][0] > time.monotonic()):
+                    self._condition.wait(self._windows[0][0] - time.monotonic() if self._windows else None)
+                if self._closed:
+                    return
+                digests = self._close_windows(time.monotonic())
+            for subject, body, received in digests:
+                self._submit(subject, body, received)
+
+    def _submit(self, subject: str, body: str, received: float) -> bool:
+        """ Queues a message on every channel; False when no channel had room for it """
+        accepted = False
+        for channel in self.channels:
+            try:
+                self._queues[channel.name].put_nowait((subject, body, received))
+                accepted = True
+            except queue.Full:
+                with self._lock:
+                    self._channel_stats[channel.name]["dropped"] += 1
+                logging.error(f"Alert Queue Full for {channel.name}, Dropped: {subject}")
+        return accepted
+
+    def _deliver_loop(self, channel):
+        work = self._queues[channel.name]
+        stats = self._channel_stats[channel.name]
+        while True:
+            item = work.get()
+            if item is None:
+                channel.close()
+                return
+            subject, body, received = item
+            for attempt in range(self.max_retries + 1):
+                try:
+                    channel.send(subject, body)
+                    with self._lock:
+                        stats["sent"] += 1
+                        self._latencies[channel.name].append(time.monotonic() - received)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or isinstance(e, NON_RETRYABLE):
+                        with self._lock:
+                            stats["failed"] += 1
+                        logging.error(f"Alert Delivery via {channel.name} Failed After {attempt + 1} Attempts: {e}")
+                        break
+                    with self._lock:
+                        stats["retries"] += 1
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def stats(self) -> dict:
+        """ Enqueue outcomes, digests, and per-channel sent / retried / failed / dropped counts with delivery latency """
+        percentile = lambda samples, fraction: samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000 if samples else 0.0
+        with self._condition:
+            open_groups = len(self._groups)
+        with self._lock:
+            channels = {}
+            for name, counts in self._channel_stats.items():
+                latencies = sorted(self._latencies[name])
+                channels[name] = {**counts, "queued": self._queues[name].qsize(),
+                                  "delivery_latency_ms": {"p50": percentile(latencies, 0.5), "p99": percentile(latencies, 0.99)}}
+            return {"enqueued": self.enqueued, "deduplicated": self.deduplicated, "grouped": self.grouped, "digests": self.digests,
+                    "dropped": self.dropped, "open_groups": open_groups, "channels": channels}
+
+    def close(self, timeout: Optional[float] = None):
+        """ Sends every open digest now, then stops once the channel queues are drained """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            digests = self._close_windows(time.monotonic(), force=True)
+            self._condition.notify_all()
+        for subject, body, received in digests:
+            self._submit(subject, body, received)
+        for channel in self.channels:
+            for worker in self._workers:
+                if worker.name.startswith(f"alert-{channel.name}-"):
+                    self._queues[channel.name].put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+        self._flusher.join(timeout)
+
+
+def create_alert_dispatcher() -> AlertDispatcher:
+    """ Process-wide dispatcher over the configured email (SMTP) & SMS channels, drained at interpreter exit """
+    from src.alerts.channels import SMSChannel, SMTPEmailChannel
+    channels = [SMTPEmailChannel()]
+    if ALERT_SMS_GATEWAY_URL:
+        channels.append(SMSChannel())
+    else:
+        logging.info("SMS Alerts Disabled: No ALERT_SMS_GATEWAY_URL Configured")
+    dispatcher = AlertDispatcher(channels)
+    atexit.register(dispatcher.close)
+    return dispatcher
@@ -0,0 +1,96 @@
+import smtplib
+import threading
+from email.message import EmailMessage
+from typing import Callable, Optional
+from src.config.settings import (ALERT_SMTP_HOST, ALERT_SMTP_PORT, ALERT_SMTP_TIMEOUT, ALERT_EMAIL_FROM, ALERT_EMAIL_TO,
+                                 ALERT_SMS_TO, ALERT_SMS_GATEWAY_URL, ALERT_SMS_TIMEOUT)
+
+class SMTPEmailChannel:
+    """ Email Delivery over SMTP; Each Delivery Worker Thread Keeps (and Reuses) Its Own Connection """
+
+    name = "email"
+
+    def __init__(self, host: str = ALERT_SMTP_HOST, port: int = ALERT_SMTP_PORT, sender: str = ALERT_EMAIL_FROM,
+                 recipient: str = ALERT_EMAIL_TO, timeout: float = ALERT_SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> smtplib.SMTP:
+        connection: Optional[smtplib.SMTP] = getattr(self._local, "connection", None)
+        if connection is not None:
+            try:
+                if connection.noop()[0] == 250:
+                    return connection
+            except smtplib.SMTPException:
+                pass
+            self._drop()
+        self._local.connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        return self._local.connection
+
+    def _drop(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def send(self, subject: str, body: str):
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = self.sender, self.recipient, subject
+        message.set_content(body)
+        try:
+            self._connection().send_message(message)
+        except Exception:
+            self._drop()  # a broken connection is rebuilt on the retry
+            raise
+
+    def close(self):
+        """ Closes the calling worker's connection """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            try:
+                connection.quit()
+            except Exception:
+                pass
+            self._local.connection = None
+
+
+class HTTPSMSGateway:
+    """ send_sms(number, message) over an HTTP SMS Gateway (JSON POST on a keep-alive session) """
+
+    def __init__(self, url: str = ALERT_SMS_GATEWAY_URL, timeout: float = ALERT_SMS_TIMEOUT):
+        import requests
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def __call__(self, number: str, message: str):
+        response = self.session.post(self.url, json={"to": number, "message": message}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class SMSChannel:
+    """ SMS Delivery through a send_sms(number, message) Gateway Function (the configured HTTP gateway by default) """
+
+    name = "sms"
+
+    def __init__(self, send_sms: Optional[Callable[[str, str], object]] = None, recipient: str = ALERT_SMS_TO,
+                 gateway_url: str = ALERT_SMS_GATEWAY_URL):
+        if send_sms is None:
+            if not gateway_url:
+                raise ValueError("No SMS Gateway Configured (set ALERT_SMS_GATEWAY_URL)")
+            send_sms = HTTPSMSGateway(gateway_url)
+        self._send_sms = send_sms
+        self.recipient = recipient
+
+    def send(self, subject: str, body: str):
+        self._send_sms(self.recipient, body)
+
+    def close(self):
+        pass
@@ -0,0 +1,88 @@
+import time
+import random
+import threading
+import socketserver
+from email import message_from_bytes
+from email.message import Message
+from typing import List, Tuple
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """ Just Enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, NOOP, RSET, QUIT """
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        self.reply("220 localhost Local SMTP Stand-In")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", errors="replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command.startswith(("MAIL", "RCPT", "NOOP", "RSET")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                self.reply(self.server.accept(b"".join(lines)))
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command Not Implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """ Local SMTP Sink for Tests & Offline Runs: Keeps Every Accepted Message, with Optional Latency / Failures """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0, latency_ms: float = 0, failure_rate: float = 0.0):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.messages: List[Message] = []
+        self.lock = threading.Lock()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server_address[0], self.server_address[1]
+
+    def accept(self, raw: bytes) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            return "451 Temporary Local Failure"
+        with self.lock:
+            self.messages.append(message_from_bytes(raw))
+        return "250 Message Accepted"
+
+    def start(self) -> "LocalSMTPServer":
+        threading.Thread(target=self.serve_forever, name="local-smtp", daemon=True).start()
+        return self
+
+
+class LocalSMSGateway:
+    """ In-Process SMS Gateway Stand-In: a send_sms(number, message) that records, with Optional Latency / Failures """
+
+    def __init__(self, latency_ms: float = 0, failure_rate: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.messages: List[Tuple[str, str]] = []
+        self.lock = threading.Lock()
+
+    def __call__(self, number: str, message: str):
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise ConnectionError("Local SMS Gateway Failure")
+        with self.lock:
+            self.messages.append((number, message))
@@ -1,11 +1,34 @@
-from fastapi import APIRouter
-from src.pipeline.agentic_rag_pipeline import AgenticRAGPipeline
+import logging
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, constr
+from typing import Dict, List
+from src.config.registry import registry
 
 router = APIRouter(tags=["Compliance Automation"])
-rag_pipeline = AgenticRAGPipeline()
+
+#Define Pydantic Model for Batch Compliance Checks
+class ComplianceBatchRequest(BaseModel):
+    query_texts: List[constr(min_length=3)] = Field(..., min_length=1, description="One query per shipment / document to check")
+    top_n: int = Field(default=5, gt=0, description="Compliance rules to return per query")
+    filters: Dict[str, List[str]] = Field(default_factory=dict, description="e.g. {\"jurisdiction\": [\"EU\"], \"transport_mode\": [\"sea\"]}")
 
 @router.get("/check")
-def check_compliance(query_text: str):
-    """ Uses Hybrid Search + RAG to verify compliance rules """
-    compliance_results = rag_pipeline.retrieve_compliance_rules({"query_text": query_text})
+async def check_compliance(query_text: str):
+    """ Uses Hybrid Search + RAG to verify compliance rules (BM25 & vector legs run concurrently) """
+    rag_pipeline = await registry.aget("rag_pipeline")  # Loaded once per process, off the event loop
+    compliance_results = await rag_pipeline.aquery_compliance_rules(query_text)
     return {"query_text": query_text, "compliance_results": compliance_results}
+
+@router.post("/check/batch")
+async def check_compliance_batch(request: ComplianceBatchRequest):
+    """ Retrieves compliance rules for many queries in one call (batched encode, matrix FAISS search, vectorized BM25) """
+    from src.retrieval.hybrid_search import ahybrid_search_batch  # imported on first use: keeps FAISS out of API startup
+    try:
+        responses = await ahybrid_search_batch(request.query_texts, request.top_n, request.filters)
+    except Exception as e:
+        logging.error(f"Compliance Batch Check Failed: {e}")
+        raise HTTPException(status_code=503, detail="Compliance Search Unavailable")
+    return {"results": [
+        {"query_text": query_text, "compliance_rules": response.results, "degraded": response.degraded}
+        for query_text, response in zip(request.query_texts, responses)
+    ]}
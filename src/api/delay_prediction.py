@@ -1,11 +1,11 @@
 from fastapi import APIRouter
-from src.models.transformer_model import DelayPredictionModel
+from src.config.registry import registry
 
 router = APIRouter(tags=["Delay Prediction"])
-model = DelayPredictionModel()
 
 @router.get("/{shipment_id}")
 def predict_shipment_delay(shipment_id: str):
     """ Predicts shipment delay risk & adjusted ETA """
+    model = registry.get("delay_model")  # Shared instance, loaded on first use or during warmup
     delay_data = model.predict_delay(shipment_id)
     return {"shipment_id": shipment_id, "ETA": delay_data["eta"], "delay_risk": delay_data["risk_percentage"]}
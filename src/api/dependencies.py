@@ -0,0 +1,33 @@
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from fastapi import HTTPException
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from src.database import db_config
+from src.database.db_operations import AsyncDatabaseOperations
+
+@asynccontextmanager
+async def open_async_db() -> AsyncIterator[AsyncDatabaseOperations]:
+    """ Async database operations on a pooled session, for code that only sometimes needs the database (e.g. cache misses) """
+    if db_config.AsyncSessionLocal is None:
+        raise HTTPException(status_code=503, detail="Async Database Engine Unavailable")
+    session = db_config.AsyncSessionLocal()
+    started = time.perf_counter()
+    try:
+        await session.connection()
+    except PoolTimeoutError as e:
+        await session.close()
+        db_config.async_pool_metrics.record_timeout()
+        logging.error(f"Async Database Pool Exhausted: {e}")
+        raise HTTPException(status_code=503, detail="Database Busy")
+    db_config.async_pool_metrics.record_wait(time.perf_counter() - started)
+    try:
+        yield AsyncDatabaseOperations(session)
+    finally:
+        await session.close()
+
+async def get_async_db() -> AsyncIterator[AsyncDatabaseOperations]:
+    """ Request-scoped async database operations (one AsyncSession per request, returned to the pool afterwards) """
+    async with open_async_db() as db:
+        yield db
@@ -1,5 +1,11 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from src.config.registry import registry
+from src.config.settings import WARMUP_ON_STARTUP
+from src.database.db_config import pool_metrics, async_pool_metrics
+from src.database.shipment_cache import shipment_cache
 
 # Import API Routers
 from src.api.shipment_tracking import router as shipment_router
@@ -9,8 +15,18 @@ from src.api.warehouse_management import router as warehouse_router
 from src.api.predictive_maintenance import router as maintenance_router
 from src.api.compliance_api import router as compliance_router
 
+#Load Models & Indexes in the Background (the worker serves requests while they load); on shutdown, flush & stop
+#the alert dispatcher, agent memory store, search threads and shard processes that were loaded
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        registry.warmup()
+    yield
+    registry.close()
+    shipment_cache.close()
+
 #Initialize FastAPI App
-app = FastAPI(title="Logistics AI API", version="1.0.0", description="AI-powered Logistics API")
+app = FastAPI(title="Logistics AI API", version="1.0.0", description="AI-powered Logistics API", lifespan=lifespan)
 
 #Enable CORS for Frontend Access
 app.add_middleware(
@@ -33,3 +49,14 @@ app.include_router(compliance_router, prefix="/compliance")
 @app.get("/")
 def root():
     return {"message": "Logistics AI API is Running!"}
+
+# Readiness Endpoint (503 until every warmed-up component has loaded)
+@app.get("/ready")
+def ready():
+    status_code = 200 if registry.is_ready() else 503
+    return JSONResponse(status_code=status_code, content={"ready": status_code == 200, "components": registry.status()})
+
+# Database Connection Pool Metrics (checkouts, wait percentiles, timeouts, current usage)
+@app.get("/db/pool")
+def database_pool_stats():
+    return {"sync": pool_metrics.stats(), "async": async_pool_metrics.stats()}
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Query
-from src.models.route_optimizer import RouteOptimizer
+from src.config.registry import registry
 
 router = APIRouter(tags=["Route Optimization"])
-optimizer = RouteOptimizer()
 
 @router.get("/optimize")
 def get_optimized_route(source: str, destination: str):
     """ Returns AI-optimized route for delivery """
+    optimizer = registry.get("route_optimizer")  # Shared instance, loaded on first use or during warmup
     optimized_route = optimizer.optimize(source, destination)
     return {"optimized_route": optimized_route}
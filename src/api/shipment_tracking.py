@@ -1,22 +1,83 @@
-from fastapi import APIRouter, HTTPException
-from src.database.db_operations import DatabaseOperations
+import json
+import logging
+from typing import AsyncIterator, List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from src.api.dependencies import get_async_db, open_async_db
+from src.config.settings import SHIPMENT_INGEST_BATCH_SIZE, SHIPMENT_LOOKUP_MAX_IDS
+from src.database.db_operations import AsyncDatabaseOperations
+from src.database.shipment_cache import shipment_cache, shipment_snapshot
 
 router = APIRouter(tags=["Shipment Tracking"])
 
-db = DatabaseOperations()
+#Define Pydantic Model for Batch Shipment Lookups
+class ShipmentBatchRequest(BaseModel):
+    shipment_ids: List[str] = Field(..., min_length=1, max_length=SHIPMENT_LOOKUP_MAX_IDS, description="Shipments to look up (duplicates are returned once)")
+
+@router.post("/bulk")
+async def bulk_ingest_shipments(request: Request, batch_size: int = Query(SHIPMENT_INGEST_BATCH_SIZE, ge=1, le=50000)):
+    """ Bulk-loads shipment records streamed as newline-delimited JSON (insert or update by shipment ID) """
+    from src.pipeline.shipment_ingestion import ShipmentIngestor, aread_ndjson
+    report = await ShipmentIngestor(batch_size=batch_size).aingest(aread_ndjson(request.stream()))
+    return report
+
+@router.post("/batch")
+async def get_shipment_statuses(request: ShipmentBatchRequest):
+    """ Streams one NDJSON line per shipment (cached ones first, then one IN query per chunk of the rest) """
+    return StreamingResponse(_stream_shipments(request.shipment_ids), media_type="application/x-ndjson")
+
+def _ndjson(record: dict) -> bytes:
+    return (json.dumps(record) + "\n").encode("utf-8")
+
+async def _stream_shipments(shipment_ids: List[str]) -> AsyncIterator[bytes]:
+    misses = []
+    for shipment_id in dict.fromkeys(shipment_ids):
+        cached = shipment_cache.local.get(shipment_id)
+        if cached is None:
+            misses.append(shipment_id)
+        else:
+            yield _ndjson({"id": cached["id"], "status": cached["status"], "ETA": cached["eta"]})
+    if not misses:
+        return
+
+    found = set()
+    try:
+        async with open_async_db() as db:
+            async for shipments in db.get_shipments(misses):
+                for shipment in map(shipment_snapshot, shipments.values()):
+                    found.add(shipment["id"])
+                    yield _ndjson({"id": shipment["id"], "status": shipment["status"], "ETA": shipment["eta"]})
+    except Exception as e:  # headers are already sent: report the failure in-band
+        logging.error(f"Batch Shipment Lookup Failed: {e}")
+        yield _ndjson({"error": "Shipment Lookup Failed", "unresolved": len(misses) - len(found)})
+        return
+    for shipment_id in misses:
+        if shipment_id not in found:
+            yield _ndjson({"id": shipment_id, "error": "Shipment Not Found"})
+
+@router.get("/cache/stats")
+def shipment_cache_stats():
+    """ Hit rates of the shipment status cache tiers & coalesced misses """
+    return shipment_cache.stats()
 
 @router.get("/{shipment_id}")
-def get_shipment_status(shipment_id: str):
-    """ Fetches real-time shipment details """
-    shipment = db.get_shipment(shipment_id)
+async def get_shipment_status(shipment_id: str):
+    """ Fetches real-time shipment details (read-through cache; a database session is only opened on a miss) """
+    shipment = await shipment_cache.aget(shipment_id, lambda: _load_shipment(shipment_id))
     if not shipment:
         raise HTTPException(status_code=404, detail="Shipment Not Found")
-    return {"id": shipment.id, "status": shipment.status, "ETA": shipment.eta}
+    return {"id": shipment["id"], "status": shipment["status"], "ETA": shipment["eta"]}
+
+async def _load_shipment(shipment_id: str):
+    async with open_async_db() as db:
+        shipment = await db.get_shipment(shipment_id)
+        return shipment_snapshot(shipment) if shipment else None
 
 @router.put("/{shipment_id}/update")
-def update_shipment_status(shipment_id: str, new_status: str):
+async def update_shipment_status(shipment_id: str, new_status: str, db: AsyncDatabaseOperations = Depends(get_async_db)):
     """ Updates shipment status (Delivered, In Transit, Delayed) """
-    updated_shipment = db.update_shipment_status(shipment_id, new_status)
+    updated_shipment = await db.update_shipment_status(shipment_id, new_status)
     if not updated_shipment:
         raise HTTPException(status_code=404, detail="Shipment Not Found")
     return {"message": "Shipment Status Updated", "new_status": updated_shipment.status}
@@ -0,0 +1,173 @@
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+class ComponentLoadError(RuntimeError):
+    """ Raised by ComponentRegistry.get() when a component's factory failed """
+
+
+class _Component:
+    def __init__(self, name: str, factory: Callable[[], Any], warmup: bool):
+        self.name = name
+        self.factory = factory
+        self.warmup = warmup
+        self.lock = threading.Lock()
+        self.instance: Any = None
+        self.state = "pending"  # pending -> loading -> ready | failed
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+class ComponentRegistry:
+    """ Process-Wide Registry of Heavy Models & Indexes, Each Loaded Once (On First Use or During Warmup)
+
+    Factories run under a per-component lock, so concurrent first requests share one load and a
+    component can depend on another through get() inside its factory.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, _Component] = {}
+        self._warmup_thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, factory: Callable[[], Any], warmup: bool = True):
+        """ Declares a component; nothing is loaded until get() or warmup() """
+        self._components[name] = _Component(name, factory, warmup)
+
+    def get(self, name: str) -> Any:
+        """ Returns the shared instance, loading it on first use (waits if another thread is loading it) """
+        component = self._components[name]
+        if component.state == "ready":
+            return component.instance
+
+        with component.lock:
+            if component.state != "ready":
+                component.state = "loading"
+                started = time.perf_counter()
+                try:
+                    component.instance = component.factory()
+                except Exception as e:
+                    component.state, component.error = "failed", str(e)
+                    logging.error(f"Component {name} Failed to Load: {e}")
+                    raise ComponentLoadError(f"{name}: {e}") from e
+                component.load_seconds = time.perf_counter() - started
+                component.state, component.error = "ready", None
+                logging.info(f"Component {name} Loaded in {component.load_seconds:.2f}s")
+        return component.instance
+
+    async def aget(self, name: str) -> Any:
+        """ get() for async routes: a cold load runs in a worker thread, not on the event loop """
+        component = self._components[name]
+        if component.state == "ready":
+            return component.instance
+        return await asyncio.to_thread(self.get, name)
+
+    def warmup(self, names: Optional[List[str]] = None, background: bool = True):
+        """ Loads components (default: all registered with warmup=True), in a daemon thread when background """
+        names = names if names is not None else [name for name, component in self._components.items() if component.warmup]
+
+        def load_all():
+            started = time.perf_counter()
+            for name in names:
+                try:
+                    self.get(name)
+                except ComponentLoadError:
+                    pass  # recorded in status(); retried on next get()
+            logging.info(f"Warmup Finished in {time.perf_counter() - started:.2f}s: {self.status()}")
+
+        if not background:
+            load_all()
+            return
+        if self._warmup_thread is None or not self._warmup_thread.is_alive():
+            self._warmup_thread = threading.Thread(target=load_all, name="component-warmup", daemon=True)
+            self._warmup_thread.start()
+
+    def close(self):
+        """ Closes every loaded component that holds threads, processes or connections (latest registered first,
+        so dependents close before what they use); a closed component loads again on its next get() """
+        for name, component in reversed(list(self._components.items())):
+            with component.lock:
+                if component.state != "ready" or not hasattr(component.instance, "close"):
+                    continue
+                try:
+                    component.instance.close()
+                except Exception as e:
+                    logging.error(f"Component {name} Failed to Close: {e}")
+                component.instance, component.state = None, "pending"
+
+    def is_ready(self, names: Optional[List[str]] = None) -> bool:
+        names = names if names is not None else [name for name, component in self._components.items() if component.warmup]
+        return all(self._components[name].state == "ready" for name in names)
+
+    def status(self) -> Dict[str, dict]:
+        """ Per-component state, load time (seconds) and last error """
+        return {name: {"state": component.state, "load_seconds": component.load_seconds, "error": component.error}
+                for name, component in self._components.items()}
+
+
+def _embedding_model():
+    from sentence_transformers import SentenceTransformer
+    from src.config.settings import EMBEDDING_MODEL_NAME
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+def _query_encoder():
+    from src.retrieval.embedding_service import EmbeddingService
+    return EmbeddingService(registry.get("embedding_model"))
+
+def _hybrid_search():
+    from src.retrieval.hybrid_search import HybridSearch
+    return HybridSearch()
+
+def _compliance_rag():
+    from src.models.compliance_rag import ComplianceRAG
+    return ComplianceRAG()
+
+def _rag_pipeline():
+    from src.pipeline.agentic_RAG_pipeline import AgenticRAGPipeline
+    return AgenticRAGPipeline()
+
+def _agent_memory():
+    from src.database.agent_memory_db import create_memory_store
+    return create_memory_store()
+
+def _agent_memo():
+    from src.agents.agent_memory import AgentMemory
+    from src.agents.memoization import AgentResultMemo
+    return AgentResultMemo(AgentMemory())
+
+def _alert_dispatcher():
+    from src.alerts.alert_dispatcher import create_alert_dispatcher
+    return create_alert_dispatcher()
+
+def _delay_model():
+    from src.models.transformer_model import DelayPredictionModel
+    return DelayPredictionModel()
+
+def _route_optimizer():
+    from src.models.route_optimizer import RouteOptimizer
+    return RouteOptimizer()
+
+def _warehouse_ai():
+    from src.models.warehouse_ai import WarehouseAI
+    return WarehouseAI()
+
+def _maintenance_ai():
+    from src.models.predictive_maintenance import PredictiveMaintenanceAI
+    return PredictiveMaintenanceAI()
+
+
+# Shared by every module in the process; factories import lazily so importing the API stays cheap
+registry = ComponentRegistry()
+registry.register("embedding_model", _embedding_model)
+registry.register("query_encoder", _query_encoder)
+registry.register("hybrid_search", _hybrid_search)
+registry.register("compliance_rag", _compliance_rag)
+registry.register("rag_pipeline", _rag_pipeline)
+registry.register("delay_model", _delay_model)
+registry.register("route_optimizer", _route_optimizer)
+registry.register("warehouse_ai", _warehouse_ai)
+registry.register("maintenance_ai", _maintenance_ai)
+registry.register("agent_memory", _agent_memory, warmup=False)  # used by agents, not the API routes
+registry.register("agent_memo", _agent_memo, warmup=False)
+registry.register("alert_dispatcher", _alert_dispatcher, warmup=False)
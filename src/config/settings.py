@@ -0,0 +1,131 @@
+import os
+import json
+import socket
+
+# Embedding Model & Index Build Settings
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")
+INDEX_BUILD_CHUNK_SIZE = int(os.getenv("INDEX_BUILD_CHUNK_SIZE", "2000"))  # rules fetched per server-side cursor batch
+
+# Persisted Index Snapshots (memory-mapped & shared by all API workers; reused only while the compliance rules'
+# fingerprint - row count & latest update - matches the one they were built from)
+INDEX_SNAPSHOT_DIR = os.getenv("INDEX_SNAPSHOT_DIR", "data/index_snapshots")
+INDEX_SNAPSHOT_ENABLED = os.getenv("INDEX_SNAPSHOT_ENABLED", "true").lower() == "true"
+INDEX_SNAPSHOT_REBUILD = os.getenv("INDEX_SNAPSHOT_REBUILD", "false").lower() == "true"  # ignore published snapshots: rebuild from the database (and republish)
+
+# FAISS Index Type & Tuning (flat | ivf_flat | ivf_pq | hnsw)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "1024"))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "48"))
+FAISS_PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "200"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+# Incremental Index Updates (delta size that triggers folding into the base index)
+INDEX_COMPACT_THRESHOLD = int(os.getenv("INDEX_COMPACT_THRESHOLD", "5000"))
+
+# Query-Side Caches (entries / seconds)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "10000"))
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+HYBRID_RESULT_CACHE_SIZE = int(os.getenv("HYBRID_RESULT_CACHE_SIZE", "5000"))
+HYBRID_RESULT_CACHE_TTL = float(os.getenv("HYBRID_RESULT_CACHE_TTL", "300"))
+
+# Hybrid Search Concurrency (per-leg timeouts in seconds)
+HYBRID_SEARCH_WORKERS = int(os.getenv("HYBRID_SEARCH_WORKERS", "8"))
+HYBRID_BM25_TIMEOUT = float(os.getenv("HYBRID_BM25_TIMEOUT", "0.5"))
+HYBRID_VECTOR_TIMEOUT = float(os.getenv("HYBRID_VECTOR_TIMEOUT", "1.0"))
+HYBRID_BATCH_CHUNK_SIZE = int(os.getenv("HYBRID_BATCH_CHUNK_SIZE", "512"))  # queries per batched encode / search
+
+# Query Embedding Micro-Batching (concurrent encodes are coalesced into one model call)
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+
+# Sharded Retrieval (0 = single in-process index; N = N worker processes, one BM25 + FAISS shard each)
+RETRIEVAL_SHARDS = int(os.getenv("RETRIEVAL_SHARDS", "0"))
+SHARD_START_METHOD = os.getenv("SHARD_START_METHOD", "spawn")
+
+# Component Warmup (load models & indexes in a background thread when the API starts)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# Bulk Shipment Ingestion (records per insert-or-update transaction)
+SHIPMENT_INGEST_BATCH_SIZE = int(os.getenv("SHIPMENT_INGEST_BATCH_SIZE", "1000"))
+
+# Database Connection Pools (per engine; timeouts & recycle in seconds)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Shipment Status Cache (entries / seconds; with Redis, writes are published to every API worker - the in-process
+# TTL only bounds staleness while that subscription is down)
+SHIPMENT_CACHE_SIZE = int(os.getenv("SHIPMENT_CACHE_SIZE", "50000"))
+SHIPMENT_CACHE_TTL = float(os.getenv("SHIPMENT_CACHE_TTL", "30"))
+SHIPMENT_CACHE_REDIS_URL = os.getenv("SHIPMENT_CACHE_REDIS_URL", "")  # empty = in-process tier only
+SHIPMENT_CACHE_REDIS_TTL = int(os.getenv("SHIPMENT_CACHE_REDIS_TTL", "300"))
+
+# Batch Shipment Lookup (IDs per IN query / IDs per request)
+SHIPMENT_LOOKUP_CHUNK_SIZE = int(os.getenv("SHIPMENT_LOOKUP_CHUNK_SIZE", "1000"))
+SHIPMENT_LOOKUP_MAX_IDS = int(os.getenv("SHIPMENT_LOOKUP_MAX_IDS", "100000"))
+
+# Agent Workflow Execution (events in flight per batch; worker threads per DAG node, overridable per node as JSON)
+WORKFLOW_MAX_EVENTS_IN_FLIGHT = int(os.getenv("WORKFLOW_MAX_EVENTS_IN_FLIGHT", "32"))
+WORKFLOW_NODE_WORKERS = int(os.getenv("WORKFLOW_NODE_WORKERS", "4"))
+WORKFLOW_NODE_CONCURRENCY = json.loads(os.getenv("WORKFLOW_NODE_CONCURRENCY", "{}"))  # e.g. {"check_compliance": 8}
+WORKFLOW_NODE_RATE_LIMITS = json.loads(os.getenv("WORKFLOW_NODE_RATE_LIMITS", "{}"))  # runs/second per agent node, e.g. {"reroute_shipment": 20}
+
+# Agent Event Intake (distinct pending entities; same-entity events within the window coalesce into one run)
+EVENT_QUEUE_CAPACITY = int(os.getenv("EVENT_QUEUE_CAPACITY", "10000"))
+EVENT_COALESCE_WINDOW_MS = float(os.getenv("EVENT_COALESCE_WINDOW_MS", "2000"))
+EVENT_QUEUE_SUBMIT_TIMEOUT = float(os.getenv("EVENT_QUEUE_SUBMIT_TIMEOUT", "1.0"))  # seconds a producer blocks when full
+
+# Agent Memory Store (write-behind: flush after N buffered keys or an interval; TTL in seconds, 0 = keep forever)
+AGENT_MEMORY_BACKEND = os.getenv("AGENT_MEMORY_BACKEND", "redis")  # redis | memory
+AGENT_MEMORY_REDIS_URL = os.getenv("AGENT_MEMORY_REDIS_URL", "redis://localhost:6379/0")
+AGENT_MEMORY_TTL = int(os.getenv("AGENT_MEMORY_TTL", str(30 * 24 * 3600)))
+AGENT_MEMORY_FLUSH_SIZE = int(os.getenv("AGENT_MEMORY_FLUSH_SIZE", "256"))
+AGENT_MEMORY_FLUSH_INTERVAL_MS = float(os.getenv("AGENT_MEMORY_FLUSH_INTERVAL_MS", "50"))
+AGENT_MEMORY_MAX_BUFFER = int(os.getenv("AGENT_MEMORY_MAX_BUFFER", "100000"))
+
+# Agent Workflow Checkpoints (per-node status deltas, written behind; backend: redis | sqlite | none; resume defaults on only for the local sqlite store)
+WORKFLOW_CHECKPOINT_BACKEND = os.getenv("WORKFLOW_CHECKPOINT_BACKEND", "redis")
+WORKFLOW_CHECKPOINT_PATH = os.getenv("WORKFLOW_CHECKPOINT_PATH", "data/workflow_checkpoints.sqlite")
+WORKFLOW_CHECKPOINT_REDIS_URL = os.getenv("WORKFLOW_CHECKPOINT_REDIS_URL", "redis://localhost:6379/0")
+WORKFLOW_CHECKPOINT_BATCH_SIZE = int(os.getenv("WORKFLOW_CHECKPOINT_BATCH_SIZE", "512"))
+WORKFLOW_RUNNER_ID = os.getenv("WORKFLOW_RUNNER_ID", socket.gethostname())  # checkpoints are scoped per runner: give each process sharing a store its own stable ID
+WORKFLOW_RESUME_ON_START = os.getenv("WORKFLOW_RESUME_ON_START", "true" if WORKFLOW_CHECKPOINT_BACKEND == "sqlite" else "false").lower() == "true"
+
+# Agent Result Memoization (max age in seconds of a reused result per agent, 0 = always rerun; sensor window for maintenance inputs)
+AGENT_MEMO_ENABLED = os.getenv("AGENT_MEMO_ENABLED", "true").lower() == "true"
+AGENT_MEMO_TTLS = json.loads(os.getenv("AGENT_MEMO_TTLS", '{"Compliance AI": 3600, "Shipment AI": 900, "Warehouse AI": 1800, "Maintenance AI": 900}'))
+MAINTENANCE_SENSOR_WINDOW_SECONDS = int(os.getenv("MAINTENANCE_SENSOR_WINDOW_SECONDS", "300"))
+
+# External Maps API (base URL can point at the local stub server; timeouts in seconds; responses cached per origin, destination & time bucket)
+MAPS_API_BASE_URL = os.getenv("MAPS_API_BASE_URL", "https://maps.googleapis.com/maps/api")
+GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "YOUR_GOOGLE_MAPS_API_KEY")
+MAPS_API_TIMEOUT = float(os.getenv("MAPS_API_TIMEOUT", "10"))
+MAPS_API_MAX_CONCURRENCY = int(os.getenv("MAPS_API_MAX_CONCURRENCY", "32"))
+MAPS_CACHE_BUCKET_SECONDS = int(os.getenv("MAPS_CACHE_BUCKET_SECONDS", "300"))
+MAPS_CACHE_SIZE = int(os.getenv("MAPS_CACHE_SIZE", "10000"))
+
+# Fleet-Wide Batch Inference (rows per model call; worker processes for CPU-bound models, 0 = in-process)
+AI_BATCH_CHUNK_SIZE = int(os.getenv("AI_BATCH_CHUNK_SIZE", "1024"))
+AI_BATCH_PROCESSES = int(os.getenv("AI_BATCH_PROCESSES", "0"))
+
+# Alert Dispatch (first alert per type & entity goes out at once, repeats within the window are sent as one digest)
+ALERT_DIGEST_WINDOW_MS = float(os.getenv("ALERT_DIGEST_WINDOW_MS", "60000"))
+ALERT_DIGEST_MAX_LINES = int(os.getenv("ALERT_DIGEST_MAX_LINES", "20"))
+ALERT_QUEUE_CAPACITY = int(os.getenv("ALERT_QUEUE_CAPACITY", "10000"))  # open groups / queued messages per channel
+ALERT_CHANNEL_WORKERS = int(os.getenv("ALERT_CHANNEL_WORKERS", "4"))
+ALERT_MAX_RETRIES = int(os.getenv("ALERT_MAX_RETRIES", "3"))
+ALERT_RETRY_BACKOFF_MS = float(os.getenv("ALERT_RETRY_BACKOFF_MS", "500"))
+ALERT_SMTP_HOST = os.getenv("ALERT_SMTP_HOST", "localhost")
+ALERT_SMTP_PORT = int(os.getenv("ALERT_SMTP_PORT", "25"))
+ALERT_SMTP_TIMEOUT = float(os.getenv("ALERT_SMTP_TIMEOUT", "10"))
+ALERT_EMAIL_FROM = os.getenv("ALERT_EMAIL_FROM", "alerts@company.com")
+ALERT_EMAIL_TO = os.getenv("ALERT_EMAIL_TO", "logistics@company.com")
+ALERT_SMS_TO = os.getenv("ALERT_SMS_TO", "+1234567890")
+ALERT_SMS_GATEWAY_URL = os.getenv("ALERT_SMS_GATEWAY_URL", "")  # HTTP endpoint taking {"to", "message"}; empty = SMS alerts disabled
+ALERT_SMS_TIMEOUT = float(os.getenv("ALERT_SMS_TIMEOUT", "10"))
@@ -1,21 +1,246 @@
-import logging
-import redis
 import json
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from src.config.registry import registry
+from src.config.settings import (AGENT_MEMORY_BACKEND, AGENT_MEMORY_REDIS_URL, AGENT_MEMORY_TTL, AGENT_MEMORY_FLUSH_SIZE,
+                                 AGENT_MEMORY_FLUSH_INTERVAL_MS, AGENT_MEMORY_MAX_BUFFER)
 
-class AgentMemoryDB:
-    """ Stores AI Agent Task Execution Memory (Redis) """
+try:
+    import msgpack
+except ImportError:  # optional: values fall back to (tagged) JSON
+    msgpack = None
+
+# One-byte format tags in front of every stored value (untagged values are legacy JSON / plain strings)
+MSGPACK_TAG = b"\x01"
+JSON_TAG = b"\x02"
+
+def _plain(value: Any) -> Any:
+    """ Serializable form of values agents pass around (pydantic models, enums, sets, ...) """
+    if hasattr(value, "dict"):
+        return value.dict()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+def encode_value(value: Any) -> bytes:
+    if msgpack is not None:
+        return MSGPACK_TAG + msgpack.packb(value, default=_plain, use_bin_type=True)
+    return JSON_TAG + json.dumps(value, default=_plain, separators=(",", ":")).encode("utf-8")
+
+def decode_value(raw: Optional[bytes]) -> Any:
+    if raw is None:
+        return None
+    if raw[:1] == MSGPACK_TAG and msgpack is not None:
+        return msgpack.unpackb(raw[1:], raw=False)
+    if raw[:1] == JSON_TAG:
+        return json.loads(raw[1:])
+    text = raw.decode("utf-8", errors="replace")
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+class RedisMemoryBackend:
+    """ Redis Storage: Writes Go Out as One Non-Transactional Pipeline per Flush, Reads as One MGET """
+
+    def __init__(self, url: str = AGENT_MEMORY_REDIS_URL):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def write_many(self, items: Sequence[Tuple[str, bytes, Optional[int]]]):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, raw, ttl in items:
+            pipeline.set(key, raw, ex=ttl or None)
+        pipeline.execute()
+
+    def read_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return self.client.mget(keys) if keys else []
+
+
+class InMemoryBackend:
+    """ Process-Local Storage with TTLs (tests & single-process runs) """
 
     def __init__(self):
+        self.data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self.lock = threading.Lock()
+
+    def write_many(self, items: Sequence[Tuple[str, bytes, Optional[int]]]):
+        now = time.monotonic()
+        with self.lock:
+            for key, raw, ttl in items:
+                self.data[key] = (raw, now + ttl if ttl else None)
+
+    def read_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        now = time.monotonic()
+        values = []
+        with self.lock:
+            for key in keys:
+                raw, expires_at = self.data.get(key, (None, None))
+                if expires_at is not None and expires_at <= now:
+                    del self.data[key]
+                    raw = None
+                values.append(raw)
+        return values
+
+
+class AgentMemoryStore:
+    """ Write-Behind Agent Memory: put() Only Buffers, a Background Thread Flushes in Batches
+
+    Writes are coalesced per key and flushed when flush_size keys are pending or flush_interval_ms has
+    passed. Reads see buffered writes first. A failed flush is retried with the next one; past max_buffer
+    pending keys the oldest writes are dropped (and counted) rather than blocking agents.
+    """
+
+    def __init__(self, backend, flush_size: int = AGENT_MEMORY_FLUSH_SIZE, flush_interval_ms: float = AGENT_MEMORY_FLUSH_INTERVAL_MS,
+                 default_ttl: int = AGENT_MEMORY_TTL, max_buffer: int = AGENT_MEMORY_MAX_BUFFER):
+        self.backend = backend
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.default_ttl = default_ttl
+        self.max_buffer = max_buffer
+        self._pending: "OrderedDict[str, Tuple[bytes, Optional[int]]]" = OrderedDict()
+        self._flushing: Dict[str, Tuple[bytes, Optional[int]]] = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._failed_flushes = 0  # consecutive: backs the flush interval off while the backend is down
+
+        # Metrics
+        self.writes = 0
+        self.flushes = 0
+        self.flushed_keys = 0
+        self.flush_failures = 0
+        self.dropped = 0
+
+        self._worker = threading.Thread(target=self._run, name="agent-memory-flusher", daemon=True)
+        self._worker.start()
+
+    def put(self, key: str, value: Any, ttl: Optional[int] = None):
+        """ Buffers one write (never touches the network); ttl in seconds, 0 = keep forever """
+        raw = encode_value(value)
+        with self._condition:
+            self._pending[key] = (raw, self.default_ttl if ttl is None else ttl)
+            self._pending.move_to_end(key)
+            self.writes += 1
+            while len(self._pending) > self.max_buffer:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            if len(self._pending) >= self.flush_size:
+                self._condition.notify()
+            closed = self._closed
+        if closed:
+            self.flush()  # no flusher left (e.g. writes during interpreter shutdown)
+
+    def get(self, key: str) -> Any:
+        return self.get_many([key])[key]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """ Values for many keys in one round trip (buffered writes take precedence); missing keys map to None """
+        keys = list(keys)
+        raws: Dict[str, Optional[bytes]] = {}
+        with self._condition:
+            for key in keys:
+                buffered = self._pending.get(key) or self._flushing.get(key)
+                if buffered is not None:
+                    raws[key] = buffered[0]
+        remote = [key for key in keys if key not in raws]
+        if remote:
+            try:
+                raws.update(zip(remote, self.backend.read_many(remote)))
+            except Exception as e:
+                logging.error(f"Agent Memory Read Failed: {e}")
+        return {key: decode_value(raws.get(key)) for key in keys}
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._closed and len(self._pending) < self.flush_size:
+                    self._condition.wait(timeout=self.flush_interval * 2 ** min(self._failed_flushes, 6))
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def flush(self) -> int:
+        """ Writes everything buffered so far through one backend batch; returns the number of keys written """
+        with self._flush_lock:
+            with self._condition:
+                if not self._pending:
+                    return 0
+                self._flushing, self._pending = dict(self._pending), OrderedDict()
+            items = [(key, raw, ttl) for key, (raw, ttl) in self._flushing.items()]
+            try:
+                self.backend.write_many(items)
+                self.flushes += 1
+                self.flushed_keys += len(items)
+                self._failed_flushes = 0
+            except Exception as e:
+                self.flush_failures += 1
+                self._failed_flushes += 1
+                logging.error(f"Agent Memory Flush Failed ({len(items)} Keys): {e}")
+                with self._condition:
+                    for key, value in self._flushing.items():  # retry next time unless overwritten meanwhile
+                        if key not in self._pending:
+                            self._pending[key] = value
+                            self._pending.move_to_end(key, last=False)
+                items = []
+            finally:
+                with self._condition:
+                    self._flushing = {}
+            return len(items)
+
+    def stats(self) -> dict:
+        with self._condition:
+            pending = len(self._pending)
+        return {"writes": self.writes, "pending": pending, "flushes": self.flushes, "flushed_keys": self.flushed_keys,
+                "flush_failures": self.flush_failures, "dropped": self.dropped,
+                "encoding": "msgpack" if msgpack is not None else "json"}
+
+    def close(self):
+        """ Stops the flusher after a final flush """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+
+
+def create_memory_store(backend: str = AGENT_MEMORY_BACKEND) -> AgentMemoryStore:
+    """ Process-wide store for the configured backend ("redis" or "memory"), flushed at interpreter exit """
+    store = AgentMemoryStore(InMemoryBackend() if backend == "memory" else RedisMemoryBackend())
+    atexit.register(store.close)
+    return store
+
+
+class AgentMemoryDB:
+    """ Stores AI Agent Task Execution Memory (shared write-behind store) """
+
+    def __init__(self, store: Optional[AgentMemoryStore] = None):
         logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
-        self.redis_client = redis.Redis(host='localhost', port=6379, decode_responses=True)
+        self.store = store if store is not None else registry.get("agent_memory")
 
-    def store_memory(self, agent_name, event_id, memory_data):
+    def store_memory(self, agent_name, event_id, memory_data, ttl=None):
         """ Stores AI agent memory for future learning """
         key = f"{agent_name}:{event_id}"
-        self.redis_client.set(key, json.dumps(memory_data))
+        self.store.put(key, memory_data, ttl)
         logging.info(f"Memory Stored for {key}")
 
     def get_memory(self, agent_name, event_id):
         """ Retrieves past memory logs for AI agent """
         key = f"{agent_name}:{event_id}"
-        return json.loads(self.redis_client.get(key) or "{}")
+        memory = self.store.get(key)
+        return memory if memory is not None else {}
+
+    def get_memories(self, agent_name, event_ids):
+        """ Retrieves memory for many events in one round trip """
+        memories = self.store.get_many(f"{agent_name}:{event_id}" for event_id in event_ids)
+        return {event_id: memories[f"{agent_name}:{event_id}"] or {} for event_id in event_ids}
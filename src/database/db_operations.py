@@ -1,12 +1,63 @@
+import hashlib
+import logging
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
+from src.config.settings import INDEX_BUILD_CHUNK_SIZE, SHIPMENT_LOOKUP_CHUNK_SIZE
 from src.database.db_config import SessionLocal
+from src.database.shipment_cache import shipment_cache, shipment_snapshot
 from src.models.database_models import Shipment, Inventory, ComplianceRule
 
+def _shipment_upserts(shipments: List[Dict], dialect: str) -> Tuple[list, int]:
+    """ (statement, rows) pairs for one batch - one executemany per column set - and the number of distinct shipments """
+    primary_key = [column.name for column in Shipment.__table__.primary_key]
+    latest = {tuple(record[key] for key in primary_key): record for record in shipments}  # last event per shipment wins
+
+    by_columns: Dict[tuple, List[Dict]] = {}
+    for record in latest.values():
+        by_columns.setdefault(tuple(sorted(record)), []).append(record)
+    return [(_upsert_statement(columns, primary_key, dialect), rows) for columns, rows in by_columns.items()], len(latest)
+
+def _chunks(shipment_ids: Sequence[str], chunk_size: int) -> Iterator[List[str]]:
+    """ Distinct IDs (first-seen order) in slices that each fit one IN query """
+    shipment_ids = list(dict.fromkeys(shipment_ids))
+    for start in range(0, len(shipment_ids), chunk_size):
+        yield shipment_ids[start:start + chunk_size]
+
+def _shipment_ids(statements: list) -> List[str]:
+    return [row["id"] for _, rows in statements for row in rows]
+
+def _rule_record(rule: ComplianceRule) -> Dict:
+    """ Index-build form of a compliance rule (the JSON metadata column is mapped as rule_metadata) """
+    return {"id": rule.id, "text": rule.text, "metadata": getattr(rule, "rule_metadata", None) or {}}
+
+def _upsert_statement(columns, primary_key, dialect: str):
+    """ INSERT ... ON CONFLICT DO UPDATE (ON DUPLICATE KEY UPDATE on MySQL / MariaDB) of the given columns """
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        statement = mysql_insert(Shipment)
+        updates = {column: statement.inserted[column] for column in columns if column not in primary_key}
+        return statement.on_duplicate_key_update(updates or {primary_key[0]: statement.inserted[primary_key[0]]})  # no-op update: keep existing rows
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        # A plain INSERT would fail on the first existing shipment, aborting the whole batch
+        raise ValueError(f"Shipment Upserts Are Not Supported on the {dialect} Dialect (use PostgreSQL, SQLite or MySQL)")
+
+    statement = dialect_insert(Shipment)
+    updates = {column: statement.excluded[column] for column in columns if column not in primary_key}
+    if not updates:
+        return statement.on_conflict_do_nothing(index_elements=primary_key)
+    return statement.on_conflict_do_update(index_elements=primary_key, set_=updates)
+
+
 class DatabaseOperations:
     """ Handles CRUD Operations for Logistics AI """
 
-    def __init__(self):
-        self.db: Session = SessionLocal()
+    def __init__(self, db: Optional[Session] = None):
+        self.db: Session = db if db is not None else SessionLocal()  # API routes pass a request-scoped session
 
     def add_shipment(self, shipment_data):
         """ Adds a new shipment record """
@@ -15,16 +66,39 @@ class DatabaseOperations:
         self.db.commit()
         return shipment
 
+    def upsert_shipments(self, shipments: List[Dict]) -> int:
+        """ Inserts or updates a batch of shipment records in one transaction (executemany per column set) """
+        statements, written = _shipment_upserts(shipments, self.db.get_bind().dialect.name)
+        try:
+            for statement, rows in statements:
+                self.db.execute(statement, rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        shipment_cache.invalidate(_shipment_ids(statements))
+        return written
+
     def get_shipment(self, shipment_id):
         """ Retrieves a shipment by ID """
         return self.db.query(Shipment).filter(Shipment.id == shipment_id).first()
 
+    def get_inventory(self, product_id):
+        """ Retrieves a product's inventory record """
+        return self.db.query(Inventory).filter(Inventory.product_id == product_id).first()
+
+    def get_shipments(self, shipment_ids: Sequence[str], chunk_size: int = SHIPMENT_LOOKUP_CHUNK_SIZE) -> Iterator[Dict[str, Shipment]]:
+        """ Retrieves many shipments with one IN query per chunk; yields {id: shipment} per chunk (missing IDs absent) """
+        for chunk in _chunks(shipment_ids, chunk_size):
+            yield {shipment.id: shipment for shipment in self.db.query(Shipment).filter(Shipment.id.in_(chunk))}
+
     def update_shipment_status(self, shipment_id, new_status):
         """ Updates shipment delivery status """
         shipment = self.get_shipment(shipment_id)
         if shipment:
             shipment.status = new_status
             self.db.commit()
+            shipment_cache.invalidate([shipment_id])
             return shipment
         return None
 
@@ -34,9 +108,109 @@ class DatabaseOperations:
         if shipment:
             self.db.delete(shipment)
             self.db.commit()
+            shipment_cache.invalidate([shipment_id])
             return True
         return False
 
+    def iter_compliance_rules(self, chunk_size: int = INDEX_BUILD_CHUNK_SIZE) -> Iterator[List[Dict]]:
+        """ Streams compliance rules in chunks through a server-side cursor (yield_per), so callers never hold the table """
+        result = self.db.execute(select(ComplianceRule).order_by(ComplianceRule.id).execution_options(yield_per=chunk_size))
+        for rules in result.scalars().partitions():
+            yield [_rule_record(rule) for rule in rules]  # ORM objects are weakly held: released with the chunk
+
+    def count_compliance_rules(self) -> int:
+        """ Number of compliance rules (lets index builders preallocate) """
+        return self.db.execute(select(func.count()).select_from(ComplianceRule)).scalar_one()
+
+    def compliance_rules_fingerprint(self, chunk_size: int = INDEX_BUILD_CHUNK_SIZE) -> str:
+        """ Cheap fingerprint of the compliance rules an index is built from: row count & latest updated_at
+        (a digest of the streamed IDs & texts when the table has no updated_at column) """
+        updated_at = getattr(ComplianceRule, "updated_at", None)
+        if updated_at is not None:
+            count, latest = self.db.execute(select(func.count(), func.max(updated_at)).select_from(ComplianceRule)).one()
+            return f"{count}:{latest}"
+
+        digest = hashlib.sha1()
+        result = self.db.execute(select(ComplianceRule.id, ComplianceRule.text).order_by(ComplianceRule.id)
+                                 .execution_options(yield_per=chunk_size))
+        for rule_id, text in result:
+            digest.update(f"{rule_id}\x00{text}\x00".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_all_compliance_rules(self) -> List[Dict]:
+        """ All compliance rules as dicts (prefer iter_compliance_rules for index builds) """
+        return [rule for rules in self.iter_compliance_rules() for rule in rules]
+
     def close(self):
         """ Closes database session """
         self.db.close()
+
+
+def compliance_rules_fingerprint() -> Optional[str]:
+    """ Fingerprint of the current compliance rules (None when the database is unreachable: snapshots load unchecked) """
+    db = DatabaseOperations()
+    try:
+        return db.compliance_rules_fingerprint()
+    except Exception as e:
+        logging.error(f"Compliance Rules Fingerprint Failed: {e}")
+        return None
+    finally:
+        db.close()
+
+
+class AsyncDatabaseOperations:
+    """ Async CRUD Operations for API Routes (one AsyncSession per request) """
+
+    def __init__(self, db):
+        self.db = db  # sqlalchemy.ext.asyncio.AsyncSession
+
+    async def add_shipment(self, shipment_data):
+        """ Adds a new shipment record """
+        shipment = Shipment(**shipment_data)
+        self.db.add(shipment)
+        await self.db.commit()
+        return shipment
+
+    async def upsert_shipments(self, shipments: List[Dict]) -> int:
+        """ Inserts or updates a batch of shipment records in one transaction """
+        statements, written = _shipment_upserts(shipments, self.db.get_bind().dialect.name)
+        try:
+            for statement, rows in statements:
+                await self.db.execute(statement, rows)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        await shipment_cache.ainvalidate(_shipment_ids(statements))
+        return written
+
+    async def get_shipment(self, shipment_id):
+        """ Retrieves a shipment by ID """
+        result = await self.db.execute(select(Shipment).where(Shipment.id == shipment_id))
+        return result.scalars().first()
+
+    async def get_shipments(self, shipment_ids: Sequence[str], chunk_size: int = SHIPMENT_LOOKUP_CHUNK_SIZE) -> AsyncIterator[Dict[str, Shipment]]:
+        """ Retrieves many shipments with one IN query per chunk; yields {id: shipment} per chunk (missing IDs absent) """
+        for chunk in _chunks(shipment_ids, chunk_size):
+            result = await self.db.execute(select(Shipment).where(Shipment.id.in_(chunk)))
+            yield {shipment.id: shipment for shipment in result.scalars()}
+
+    async def update_shipment_status(self, shipment_id, new_status):
+        """ Updates shipment delivery status """
+        shipment = await self.get_shipment(shipment_id)
+        if shipment:
+            shipment.status = new_status
+            await self.db.commit()
+            await shipment_cache.aput(shipment_id, shipment_snapshot(shipment))
+            return shipment
+        return None
+
+    async def delete_shipment(self, shipment_id):
+        """ Deletes a shipment record """
+        shipment = await self.get_shipment(shipment_id)
+        if shipment:
+            await self.db.delete(shipment)
+            await self.db.commit()
+            await shipment_cache.ainvalidate([shipment_id])
+            return True
+        return False
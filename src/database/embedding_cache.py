@@ -0,0 +1,133 @@
+import os
+import hashlib
+import logging
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from src.config.settings import EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME
+
+def content_hash(text: str) -> bytes:
+    """ Stable content key for a document text """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest().encode("ascii")
+
+
+class EmbeddingCache:
+    """ Content-Hash Keyed On-Disk Cache of Document Embeddings (one file per model) """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, cache_dir: str = EMBEDDING_CACHE_DIR):
+        safe_name = model_name.replace("/", "__")
+        self.path = os.path.join(cache_dir, f"{safe_name}.npz")
+        self.vectors: Dict[bytes, np.ndarray] = {}
+        self.dirty = False
+        self.load()
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def load(self):
+        """ Loads cached vectors from disk (a missing or unreadable cache starts empty) """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                self.vectors = dict(zip(data["hashes"].tolist(), data["vectors"]))
+            logging.info(f"Embedding Cache Loaded: {len(self.vectors)} Vectors from {self.path}")
+        except Exception as e:
+            logging.error(f"Embedding Cache Load Failed: {e}")
+            self.vectors = {}
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        return self.vectors.get(key)
+
+    def put(self, key: bytes, vector: np.ndarray):
+        self.vectors[key] = vector
+        self.dirty = True
+
+    def prune(self, live_keys: Sequence[bytes]):
+        """ Drops vectors for texts that no longer exist in the corpus """
+        live_keys = set(live_keys)
+        stale = [key for key in self.vectors if key not in live_keys]
+        for key in stale:
+            del self.vectors[key]
+        self.dirty = self.dirty or bool(stale)
+
+    def save(self):
+        """ Atomically writes the cache (only when it changed) """
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        hashes = np.array(list(self.vectors.keys()), dtype="S40")
+        vectors = np.stack(list(self.vectors.values())).astype("float32") if self.vectors else np.zeros((0, 0), dtype="float32")
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"  # per writer: workers saving at once never share a partial file
+        np.savez(tmp_path, hashes=hashes, vectors=vectors)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        logging.info(f"Embedding Cache Saved: {len(self.vectors)} Vectors to {self.path}")
+
+
+class EmbeddingBuilder:
+    """ Encodes Documents in Batches into a Preallocated float32 Matrix, Reusing Cached Vectors """
+
+    def __init__(self, model, batch_size: int = EMBEDDING_BATCH_SIZE, cache: Optional[EmbeddingCache] = None):
+        self.model = model
+        self.batch_size = batch_size
+        self.cache = cache
+
+    def build(self, texts: Sequence[str], prune: bool = False) -> np.ndarray:
+        """ Returns an (n_texts, dim) float32 matrix; only texts missing from the cache are encoded.
+        Pass prune=True when texts is the full corpus to evict vectors of deleted/edited rules. """
+        return self.build_chunks([texts], len(texts), prune=prune)
+
+    def build_chunks(self, text_chunks: Iterable[Sequence[str]], expected_rows: int = 0, prune: bool = False) -> np.ndarray:
+        """ build() over texts that arrive in chunks (e.g. streamed from the database): each chunk is encoded
+        into one preallocated matrix of expected_rows rows (grown if more arrive), so only one chunk of texts is held """
+        dim = self.model.get_sentence_embedding_dimension()
+        embeddings = np.empty((expected_rows, dim), dtype="float32")
+        keys: List[bytes] = []
+        cached_rows = encoded = 0
+
+        for texts in text_chunks:
+            row = len(keys)
+            if row + len(texts) > len(embeddings):
+                grown = np.empty((max(row + len(texts), 2 * len(embeddings)), dim), dtype="float32")
+                grown[:row] = embeddings[:row]
+                embeddings = grown
+            chunk_keys, chunk_cached, chunk_encoded = self._encode_into(texts, embeddings[row:row + len(texts)])
+            keys.extend(chunk_keys)
+            cached_rows += chunk_cached
+            encoded += chunk_encoded
+
+        if self.cache is not None:
+            if prune:
+                self.cache.prune(keys)
+            self.cache.save()
+
+        logging.info(f"Embeddings Built: {len(keys)} Texts, {cached_rows} Cached, {encoded} Encoded")
+        return embeddings[:len(keys)]
+
+    def _encode_into(self, texts: Sequence[str], embeddings: np.ndarray) -> Tuple[List[bytes], int, int]:
+        """ Fills one row per text (cache hits copied, misses encoded in batches) -> (keys, cached rows, encoded texts) """
+        dim = embeddings.shape[1]
+        keys = [content_hash(text) for text in texts]
+
+        # Fill cache hits, group misses by key so duplicate texts are encoded once
+        pending: Dict[bytes, List[int]] = {}
+        for row, key in enumerate(keys):
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None and cached.shape == (dim,):
+                embeddings[row] = cached
+            else:
+                pending.setdefault(key, []).append(row)
+
+        pending_keys = list(pending)
+        for start in range(0, len(pending_keys), self.batch_size):
+            batch_keys = pending_keys[start:start + self.batch_size]
+            batch_texts = [texts[pending[key][0]] for key in batch_keys]
+            vectors = self.model.encode(batch_texts, batch_size=self.batch_size, convert_to_numpy=True)
+
+            for key, vector in zip(batch_keys, vectors):
+                embeddings[pending[key]] = vector
+                if self.cache is not None:
+                    self.cache.put(key, embeddings[pending[key][0]].copy())
+
+        return keys, len(texts) - sum(len(rows) for rows in pending.values()), len(pending_keys)
@@ -1,6 +1,8 @@
 import logging
-import rank_bm25
+from src.config.settings import INDEX_SNAPSHOT_ENABLED
 from src.database.db_operations import DatabaseOperations
+from src.retrieval.bm25_engine import BM25Engine
+from src.retrieval.index_snapshot import IndexSnapshot
 
 class BM25Index:
     """ BM25 Index for Fast Compliance Rule Retrieval """
@@ -8,25 +10,41 @@ class BM25Index:
     def __init__(self):
         logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
         self.db = DatabaseOperations()
-        self.rules, self.corpus, self.bm25 = self.load_index()
+        self.snapshot = IndexSnapshot("compliance_rules_bm25")
+        self.bm25 = None
+        if INDEX_SNAPSHOT_ENABLED:
+            self.bm25 = self.snapshot.load_bm25(self.source_fingerprint())  # rebuilt below when the rules changed
+        if self.bm25 is None:
+            self.bm25 = self.load_index()
+
+    def source_fingerprint(self):
+        """ Fingerprint of the rules in the database (None when it cannot be read: the snapshot loads unchecked) """
+        try:
+            return self.db.compliance_rules_fingerprint()
+        except Exception as e:
+            logging.error(f"Compliance Rules Fingerprint Failed: {e}")
+            return None
 
     def load_index(self):
-        """ Loads compliance rules into BM25 model """
+        """ Loads compliance rules into BM25 model (streamed chunk by chunk: peak memory tracks the chunk size) """
         try:
-            rules = self.db.get_all_compliance_rules()
-            corpus = [rule["text"].split() for rule in rules]
-            bm25 = rank_bm25.BM25Okapi(corpus)
-            logging.info(f"BM25 Index Loaded with {len(rules)} Rules")
-            return rules, corpus, bm25
+            source = self.source_fingerprint() if INDEX_SNAPSHOT_ENABLED else None  # taken before streaming: a concurrent edit forces the next rebuild
+            chunks = (([rule["id"] for rule in rules], [rule["text"].split() for rule in rules], [rule["metadata"] for rule in rules])
+                      for rules in self.db.iter_compliance_rules())
+            bm25 = BM25Engine.from_chunks(chunks)
+            logging.info(f"BM25 Index Loaded with {len(bm25)} Rules")
+
+            if INDEX_SNAPSHOT_ENABLED:
+                self.snapshot.save_bm25(bm25, source)
+            return bm25
 
         except Exception as e:
             logging.error(f"BM25 Index Load Failed: {e}")
-            return [], [], None
+            return None
 
-    def search(self, query_text, top_n=5):
-        """ Retrieves top compliance rules based on keyword similarity """
+    def search(self, query_text, top_n=5, filters=None):
+        """ Retrieves top compliance rules based on keyword similarity (optionally restricted by metadata filters) """
         query_tokens = query_text.split()
-        scores = self.bm25.get_scores(query_tokens)
-        ranked_results = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:top_n]
+        ranked_results = self.bm25.top_k(query_tokens, top_n, filters=filters)
 
-        return [{"id": self.rules[i]["id"], "score": score} for i, score in ranked_results]
+        return [{"id": doc_id, "score": score} for doc_id, score in ranked_results]
@@ -0,0 +1,222 @@
+import json
+import uuid
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+from src.config.settings import SHIPMENT_CACHE_SIZE, SHIPMENT_CACHE_TTL, SHIPMENT_CACHE_REDIS_URL, SHIPMENT_CACHE_REDIS_TTL
+from src.retrieval.query_cache import LRUCache
+
+REDIS_KEY_PREFIX = "shipment:status:"
+REDIS_INVALIDATION_CHANNEL = "shipment:invalidated"  # writes published to every worker's in-process tier
+
+def shipment_snapshot(shipment) -> Dict:
+    """ Cached (JSON-safe) form of a shipment's status & ETA """
+    eta = shipment.eta.isoformat() if hasattr(shipment.eta, "isoformat") else shipment.eta
+    return {"id": shipment.id, "status": shipment.status, "eta": eta}
+
+
+class _Load:
+    """ One in-flight database load; concurrent misses for the same ID await its future """
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.stale = False  # set by a write while loading: the result is returned but not cached
+
+
+class ShipmentCache:
+    """ Read-Through Shipment Status Cache: In-Process LRU -> Optional Redis -> Database
+
+    Concurrent misses for the same shipment share one database query. Writes go through aput() /
+    invalidate(), which also keep a load that was in flight during the write from caching its result.
+    With Redis, writes are published so the other workers drop their in-process copies as well (their
+    tier is cleared whenever the subscription is re-established, since notifications may have been missed).
+    """
+
+    def __init__(self, maxsize: int = SHIPMENT_CACHE_SIZE, ttl: float = SHIPMENT_CACHE_TTL,
+                 redis_url: str = SHIPMENT_CACHE_REDIS_URL, redis_ttl: int = SHIPMENT_CACHE_REDIS_TTL):
+        self.local = LRUCache(maxsize, ttl)
+        self.redis_url = redis_url
+        self.redis_ttl = redis_ttl
+        self._redis = None  # redis.asyncio client, created on first use
+        self._sync_redis = None  # for writes from sync code (ingestion, DatabaseOperations)
+        self._inflight: Dict[str, _Load] = {}
+        self._lock = threading.Lock()
+        self.origin = uuid.uuid4().hex  # skips this cache's own invalidation messages
+        self._subscriber: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self.redis_hits = 0
+        self.db_loads = 0
+        self.coalesced = 0
+        self.redis_errors = 0
+        self.remote_invalidations = 0
+
+    def _aredis(self):
+        self._subscribe()
+        if self._redis is None and self.redis_url:
+            import redis.asyncio
+            self._redis = redis.asyncio.Redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    def _redis_sync(self):
+        self._subscribe()
+        if self._sync_redis is None and self.redis_url:
+            import redis
+            self._sync_redis = redis.Redis.from_url(self.redis_url, decode_responses=True)
+        return self._sync_redis
+
+    def _subscribe(self):
+        """ Starts the invalidation listener once Redis is in use """
+        if self._subscriber is not None or not self.redis_url:
+            return
+        with self._lock:
+            if self._subscriber is None:
+                self._subscriber = threading.Thread(target=self._listen, name="shipment-cache-invalidations", daemon=True)
+                self._subscriber.start()
+
+    def _listen(self):
+        """ Drops local entries (and in-flight loads) written by other workers """
+        while not self._closed.is_set():
+            pubsub = None
+            try:
+                pubsub = self._redis_sync().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REDIS_INVALIDATION_CHANNEL)
+                self.local.clear()  # anything cached before (re)subscribing may have missed a write
+                while not self._closed.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    notice = json.loads(message["data"])
+                    if notice["origin"] != self.origin:
+                        self._mark_stale(notice["ids"])
+                        self.remote_invalidations += len(notice["ids"])
+            except Exception as e:
+                self._redis_failed("Subscribe", e)
+                self._closed.wait(1.0)  # retry; the local TTL bounds staleness meanwhile
+            finally:
+                if pubsub is not None:
+                    pubsub.close()
+
+    def _notice(self, shipment_ids: list) -> str:
+        return json.dumps({"origin": self.origin, "ids": shipment_ids})
+
+    async def aget(self, shipment_id: str, loader: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """ Cached snapshot, else Redis, else loader() (one call per ID however many requests miss at once) """
+        value = self.local.get(shipment_id)
+        if value is not None:
+            return value
+
+        load = self._inflight.get(shipment_id)
+        if load is not None:
+            self.coalesced += 1
+            return await asyncio.shield(load.future)
+
+        load = _Load(asyncio.get_running_loop().create_future())
+        self._inflight[shipment_id] = load
+        try:
+            value = await self._remote_get(shipment_id)
+            if value is None:
+                self.db_loads += 1
+                value = await loader()
+                if value is not None and not load.stale:
+                    await self._remote_set(shipment_id, value, only_if_absent=True)  # never overwrite a newer write
+            if value is not None and not load.stale:
+                self.local.put(shipment_id, value)
+            load.future.set_result(value)
+            return value
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                load.future.cancel()
+            else:
+                load.future.set_exception(e)
+                load.future.exception()  # waiters get it; don't warn when there are none
+            raise
+        finally:
+            if self._inflight.get(shipment_id) is load:
+                del self._inflight[shipment_id]
+
+    async def aput(self, shipment_id: str, value: Dict):
+        """ Write-through after a status update """
+        self._mark_stale([shipment_id])
+        self.local.put(shipment_id, value)
+        await self._remote_set(shipment_id, value)
+        client = self._aredis()
+        if client is not None:
+            try:
+                await client.publish(REDIS_INVALIDATION_CHANNEL, self._notice([str(shipment_id)]))
+            except Exception as e:
+                self._redis_failed("Publish", e)
+
+    async def ainvalidate(self, shipment_ids: Iterable[str]):
+        """ Drops entries after deletes / bulk upserts """
+        shipment_ids = self._mark_stale(shipment_ids)
+        client = self._aredis()
+        if client is not None and shipment_ids:
+            try:
+                await client.delete(*(REDIS_KEY_PREFIX + shipment_id for shipment_id in shipment_ids))
+                await client.publish(REDIS_INVALIDATION_CHANNEL, self._notice(shipment_ids))
+            except Exception as e:
+                self._redis_failed("Invalidate", e)
+
+    def invalidate(self, shipment_ids: Iterable[str]):
+        """ ainvalidate() for sync callers """
+        shipment_ids = self._mark_stale(shipment_ids)
+        client = self._redis_sync()
+        if client is not None and shipment_ids:
+            try:
+                client.delete(*(REDIS_KEY_PREFIX + shipment_id for shipment_id in shipment_ids))
+                client.publish(REDIS_INVALIDATION_CHANNEL, self._notice(shipment_ids))
+            except Exception as e:
+                self._redis_failed("Invalidate", e)
+
+    def _mark_stale(self, shipment_ids: Iterable[str]) -> list:
+        shipment_ids = [str(shipment_id) for shipment_id in shipment_ids]
+        for shipment_id in shipment_ids:
+            self.local.pop(shipment_id)
+            load = self._inflight.get(shipment_id)
+            if load is not None:
+                load.stale = True
+        return shipment_ids
+
+    async def _remote_get(self, shipment_id: str) -> Optional[Dict]:
+        client = self._aredis()
+        if client is None:
+            return None
+        try:
+            cached = await client.get(REDIS_KEY_PREFIX + shipment_id)
+        except Exception as e:
+            self._redis_failed("Read", e)  # fall through to the database
+            return None
+        if cached is None:
+            return None
+        self.redis_hits += 1
+        return json.loads(cached)
+
+    async def _remote_set(self, shipment_id: str, value: Dict, only_if_absent: bool = False):
+        client = self._aredis()
+        if client is None:
+            return
+        try:
+            await client.set(REDIS_KEY_PREFIX + shipment_id, json.dumps(value), ex=self.redis_ttl, nx=only_if_absent)
+        except Exception as e:
+            self._redis_failed("Write", e)
+
+    def _redis_failed(self, operation: str, error: Exception):
+        with self._lock:
+            self.redis_errors += 1
+        logging.error(f"Shipment Cache Redis {operation} Failed: {error}")
+
+    def stats(self) -> dict:
+        return {"local": self.local.stats(), "redis_enabled": bool(self.redis_url), "redis_hits": self.redis_hits,
+                "redis_errors": self.redis_errors, "db_loads": self.db_loads, "coalesced_misses": self.coalesced,
+                "remote_invalidations": self.remote_invalidations, "loads_in_flight": len(self._inflight)}
+
+    def close(self):
+        """ Stops the invalidation listener """
+        self._closed.set()
+        if self._subscriber is not None:
+            self._subscriber.join(timeout=5)
+
+
+# Process-wide cache shared by the shipment routes and database write paths
+shipment_cache = ShipmentCache()
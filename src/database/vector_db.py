@@ -1,37 +1,64 @@
 import logging
-import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from src.database.db_operations import DatabaseOperations
+from src.database.embedding_cache import EmbeddingBuilder, EmbeddingCache
+from src.retrieval.index_snapshot import IndexSnapshot
+from src.retrieval.ann_index import apply_search_params, default_index_config
+from src.retrieval.vector_index import VectorIndex
+from src.config.registry import registry
+from src.config.settings import EMBEDDING_MODEL_NAME, INDEX_SNAPSHOT_ENABLED
 
 class VectorDatabase:
     """ FAISS / ChromaDB-Based Vector Search for Compliance Rules """
 
     def __init__(self):
         logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")  
+        self.model = registry.get("embedding_model")  # Same instance as VectorSearch
+        self.embedding_builder = EmbeddingBuilder(self.model, cache=EmbeddingCache(EMBEDDING_MODEL_NAME))
+        self.encoder = registry.get("query_encoder")  # Micro-batches concurrent query encodes
         self.db = DatabaseOperations()
-        self.index, self.doc_map = self.load_vector_index()
+        self.index_config = default_index_config()
+        self.snapshot = IndexSnapshot("compliance_rules_faiss")
+        loaded = self.snapshot.load_faiss(self.index_config.build_params(), self.source_fingerprint()) if INDEX_SNAPSHOT_ENABLED else None
+        if loaded is not None:
+            apply_search_params(loaded.base, self.index_config)  # nprobe / efSearch can change without a rebuild
+        self.index = loaded if loaded is not None else self.load_vector_index()
+
+    def source_fingerprint(self):
+        """ Fingerprint of the rules in the database (None when it cannot be read: the snapshot loads unchecked) """
+        try:
+            return self.db.compliance_rules_fingerprint()
+        except Exception as e:
+            logging.error(f"Compliance Rules Fingerprint Failed: {e}")
+            return None
 
     def load_vector_index(self):
-        """ Loads FAISS index with vector embeddings """
+        """ Loads FAISS index with vector embeddings (rules streamed chunk by chunk into one preallocated matrix) """
         try:
-            rules = self.db.get_all_compliance_rules()
-            embeddings = np.array([self.model.encode(rule["text"]).tolist() for rule in rules]).astype("float32")
+            source = self.source_fingerprint() if INDEX_SNAPSHOT_ENABLED else None  # taken before streaming: a concurrent edit forces the next rebuild
+            doc_ids, metadata = [], []
+
+            def text_chunks():
+                for rules in self.db.iter_compliance_rules():
+                    doc_ids.extend(rule["id"] for rule in rules)
+                    metadata.extend(rule["metadata"] for rule in rules)
+                    yield [rule["text"] for rule in rules]
 
-            index = faiss.IndexFlatL2(embeddings.shape[1])  
-            index.add(embeddings)
+            embeddings = self.embedding_builder.build_chunks(text_chunks(), self.db.count_compliance_rules(), prune=True)
+            index = VectorIndex.from_embeddings(doc_ids, embeddings, self.index_config, metadata)
 
-            logging.info(f"FAISS Index Loaded with {len(rules)} Rules")
-            return index, {i: rule["id"] for i, rule in enumerate(rules)}
+            logging.info(f"FAISS Index Loaded with {len(doc_ids)} Rules")
+            if INDEX_SNAPSHOT_ENABLED:
+                self.snapshot.save_faiss(index, self.index_config.build_params(), source)
+            return index
 
         except Exception as e:
             logging.error(f"FAISS Index Load Failed: {e}")
-            return None, {}
+            return None
 
-    def search(self, query_text, top_n=5):
-        """ Searches FAISS for nearest semantic matches """
-        query_vector = self.model.encode(query_text).astype("float32")
-        distances, indices = self.index.search(np.array([query_vector]), top_n)
+    def search(self, query_text, top_n=5, filters=None):
+        """ Searches FAISS for nearest semantic matches (optionally restricted by metadata filters) """
+        query_vector = self.encoder.encode(query_text)
+        matches = self.index.search(np.array([query_vector]), top_n, filters=filters)[0]
 
-        return [{"id": self.doc_map[i], "score": 1 - distances[0][j]} for j, i in enumerate(indices[0])]
+        return [{"id": doc_id, "score": 1 - distance} for doc_id, distance in matches]
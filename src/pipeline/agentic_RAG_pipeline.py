@@ -1,9 +1,7 @@
+import asyncio
 import logging
-from src.retrieval.hybrid_search import hybrid_search
-from src.models.compliance_rag import ComplianceRAG
-
-# Load RAG-Based Compliance System
-rag_compliance = ComplianceRAG()
+from src.config.registry import registry
+from src.retrieval.hybrid_search import hybrid_search, ahybrid_search
 
 class AgenticRAGPipeline:
     """ AI Agentic RAG Pipeline for Compliance Fixes """
@@ -15,10 +13,21 @@ class AgenticRAGPipeline:
         """ Fetches Compliance Rules Using Hybrid Search """
         try:
             retrieved_docs = hybrid_search(query_text)
-            compliance_fix = rag_compliance.generate_fix(retrieved_docs)
+            compliance_fix = registry.get("compliance_rag").generate_fix(retrieved_docs)  # RAG-Based Compliance System
             logging.info(f"Compliance Fix: {compliance_fix}")
             return compliance_fix
         except Exception as e:
             logging.error(f"Compliance Query Failed: {e}")
             return None
 
+    async def aquery_compliance_rules(self, query_text):
+        """ Async Variant: Awaits Hybrid Search and Runs Fix Generation Off the Event Loop """
+        try:
+            retrieved_docs = await ahybrid_search(query_text)
+            rag_compliance = await registry.aget("compliance_rag")
+            compliance_fix = await asyncio.to_thread(rag_compliance.generate_fix, retrieved_docs)
+            logging.info(f"Compliance Fix: {compliance_fix}")
+            return compliance_fix
+        except Exception as e:
+            logging.error(f"Compliance Query Failed: {e}")
+            return None
@@ -1,25 +1,45 @@
 import logging
-from src.models.transformer_model import DelayPredictionModel
-from src.models.route_optimizer import RouteOptimizer
-from src.models.warehouse_ai import WarehouseAI
-from src.models.predictive_maintenance import MaintenanceAI
+import multiprocessing
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence
+from src.config.registry import registry
+from src.config.settings import AI_BATCH_CHUNK_SIZE, AI_BATCH_PROCESSES
+
+# Columnar input: column name -> one value per entity (lists, arrays or pandas columns of equal length)
+Columns = Mapping[str, Sequence[Any]]
+
+def _infer_chunk(component: str, batch_method: str, row_method: str, columns: Dict[str, np.ndarray]) -> List[Any]:
+    """ One vectorized model call for a chunk; models without a batch method are called row by row (a failed row gives None) """
+    model = registry.get(component)  # loaded once per process (also inside pool workers)
+    if hasattr(model, batch_method):
+        return list(getattr(model, batch_method)(columns))
+    lists = {name: column.tolist() for name, column in columns.items()}
+    predict = getattr(model, row_method)
+    results = []
+    for values in zip(*lists.values()):
+        try:
+            results.append(predict(dict(zip(lists, values))))
+        except Exception as e:
+            logging.error(f"Row Inference Failed ({component}): {e}")
+            results.append(None)
+    return results
 
-# Initialize AI models
-delay_model = DelayPredictionModel()
-route_optimizer = RouteOptimizer()
-warehouse_ai = WarehouseAI()
-maintenance_ai = MaintenanceAI()
 
 class AIPipeline:
     """ Central AI Pipeline - Manages Execution of AI Models """
 
-    def __init__(self):
+    def __init__(self, processes: int = AI_BATCH_PROCESSES):
         logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
+        self.processes = processes
+        self._pool: Optional[ProcessPoolExecutor] = None  # started on the first batch that asks for it
+        self._pool_size = 0
 
     def predict_shipment_delay(self, shipment_data):
         """ Uses Transformer Model to Predict Shipment Delays """
         try:
-            prediction = delay_model.predict(shipment_data)
+            prediction = registry.get("delay_model").predict(shipment_data)
             logging.info(f"Delay Prediction: {prediction}")
             return prediction
         except Exception as e:
@@ -29,7 +49,7 @@ class AIPipeline:
     def optimize_route(self, shipment_data):
         """ Uses AI Model to Optimize Delivery Routes """
         try:
-            optimized_route = route_optimizer.find_best_route(shipment_data)
+            optimized_route = registry.get("route_optimizer").find_best_route(shipment_data)
             logging.info(f"Optimized Route: {optimized_route}")
             return optimized_route
         except Exception as e:
@@ -39,7 +59,7 @@ class AIPipeline:
     def optimize_inventory(self, warehouse_data):
         """ Uses Warehouse AI to Optimize Stock Levels """
         try:
-            inventory_plan = warehouse_ai.optimize_stock(warehouse_data)
+            inventory_plan = registry.get("warehouse_ai").optimize_stock(warehouse_data)
             logging.info(f"Optimized Inventory Plan: {inventory_plan}")
             return inventory_plan
         except Exception as e:
@@ -49,9 +69,86 @@ class AIPipeline:
     def detect_maintenance_issues(self, equipment_data):
         """ Uses Predictive Maintenance AI to Detect Failures """
         try:
-            maintenance_plan = maintenance_ai.detect_failures(equipment_data)
+            maintenance_plan = registry.get("maintenance_ai").detect_failures(equipment_data)
             logging.info(f"Predictive Maintenance Result: {maintenance_plan}")
             return maintenance_plan
         except Exception as e:
             logging.error(f"Predictive Maintenance Failed: {e}")
             return None
+
+    def predict_shipment_delays(self, columns: Columns, id_column: str = "shipment_id", chunk_size: int = AI_BATCH_CHUNK_SIZE,
+                                processes: Optional[int] = None) -> Iterator[Dict]:
+        """ Delay predictions for many shipments, streamed per chunk """
+        return self._run_batch("delay_model", "predict_batch", "predict", columns, id_column, chunk_size, processes)
+
+    def optimize_routes(self, columns: Columns, id_column: str = "shipment_id", chunk_size: int = AI_BATCH_CHUNK_SIZE,
+                        processes: Optional[int] = None) -> Iterator[Dict]:
+        """ Optimized routes for many shipments, streamed per chunk """
+        return self._run_batch("route_optimizer", "find_best_routes", "find_best_route", columns, id_column, chunk_size, processes)
+
+    def optimize_inventories(self, columns: Columns, id_column: str = "sku", chunk_size: int = AI_BATCH_CHUNK_SIZE,
+                             processes: Optional[int] = None) -> Iterator[Dict]:
+        """ Stock plans for many SKUs, streamed per chunk """
+        return self._run_batch("warehouse_ai", "optimize_stock_batch", "optimize_stock", columns, id_column, chunk_size, processes)
+
+    def detect_maintenance_issues_batch(self, columns: Columns, id_column: str = "equipment_id", chunk_size: int = AI_BATCH_CHUNK_SIZE,
+                                        processes: Optional[int] = None) -> Iterator[Dict]:
+        """ Failure predictions for many equipment units, streamed per chunk """
+        return self._run_batch("maintenance_ai", "detect_failures_batch", "detect_failures", columns, id_column, chunk_size, processes)
+
+    def _run_batch(self, component: str, batch_method: str, row_method: str, columns: Columns, id_column: str,
+                   chunk_size: int, processes: Optional[int]) -> Iterator[Dict]:
+        """ Slices the columns into chunks and yields {chunk, offset, ids, results} per chunk, in input order
+
+        With processes > 0 chunks run in a spawned process pool (a bounded window of chunks in flight);
+        otherwise in this process. A failed chunk yields results of None plus the error.
+        """
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns Have Different Lengths: {sorted(lengths)}")
+        total = lengths.pop() if lengths else 0
+        processes = self.processes if processes is None else processes
+        pool = self._process_pool(processes) if processes > 0 else None
+        in_flight: "deque[tuple]" = deque()
+
+        def collect(index: int, offset: int, chunk: Dict[str, np.ndarray], future: Future) -> Dict:
+            ids = chunk[id_column].tolist() if id_column in chunk else list(range(offset, offset + len(next(iter(chunk.values())))))
+            try:
+                return {"chunk": index, "offset": offset, "ids": ids, "results": future.result()}
+            except Exception as e:
+                logging.error(f"Batch Inference Failed ({component}, Rows {offset}-{offset + len(ids)}): {e}")
+                return {"chunk": index, "offset": offset, "ids": ids, "results": [None] * len(ids), "error": str(e)}
+
+        for index, offset in enumerate(range(0, total, chunk_size)):
+            chunk = {name: np.asarray(values[offset:offset + chunk_size]) for name, values in columns.items()}
+            if pool is None:
+                future = Future()
+                try:
+                    future.set_result(_infer_chunk(component, batch_method, row_method, chunk))
+                except Exception as e:
+                    future.set_exception(e)
+                yield collect(index, offset, chunk, future)
+                continue
+            in_flight.append((index, offset, chunk, pool.submit(_infer_chunk, component, batch_method, row_method, chunk)))
+            if len(in_flight) >= 2 * processes:  # bounds memory: only a few chunks wait for the consumer
+                yield collect(*in_flight.popleft())
+        while in_flight:
+            yield collect(*in_flight.popleft())
+        logging.info(f"Batch Inference Complete: {component}, {total} Rows")
+
+    def _process_pool(self, processes: int) -> ProcessPoolExecutor:
+        """ The worker pool, restarted when a batch asks for a different number of processes """
+        if self._pool is not None and self._pool_size != processes:
+            self._pool.shutdown(wait=False)  # chunks already submitted still finish
+            self._pool = None
+        if self._pool is None:
+            # spawn: workers load their own model copy, no forked torch threads
+            self._pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+            self._pool_size = processes
+        return self._pool
+
+    def close(self):
+        """ Stops the inference worker processes """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
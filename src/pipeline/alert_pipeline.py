@@ -1,26 +1,31 @@
 import logging
-from src.alerts.email_alerts import send_email
-from src.alerts.sms_alerts import send_sms
+from src.alerts.alert_dispatcher import DROPPED
+from src.config.registry import registry
+
+# Alert data keys that identify the entity an alert is about (alerts are grouped per type & entity)
+ENTITY_KEYS = ("entity_id", "shipment_id", "equipment_id", "product_id", "sku", "warehouse_id")
 
 class AlertPipeline:
     """ AI-Based Alert System for Shipment Delays, Compliance, and Maintenance """
 
-    def __init__(self):
+    def __init__(self, dispatcher=None):
         logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
+        self.dispatcher = dispatcher if dispatcher is not None else registry.get("alert_dispatcher")  # shared background delivery
 
-    def trigger_alert(self, alert_type, alert_data):
-        """ Triggers Alerts Based on AI Decisions """
+    def trigger_alert(self, alert_type, alert_data, entity_id=None):
+        """ Triggers Alerts Based on AI Decisions (queued; email & SMS are delivered in the background) """
         try:
+            if entity_id is None and isinstance(alert_data, dict):
+                entity_id = next((alert_data[key] for key in ENTITY_KEYS if alert_data.get(key) is not None), None)
+            outcome = self.dispatcher.enqueue(alert_type, str(alert_data), entity_id)
             message = f"🚨 Alert: {alert_type} - Details: {alert_data}"
-            logging.info(message)
-
-            # Send Email Alert
-            send_email("logistics@company.com", "Logistics Alert", message)
+            logging.info(f"{message} ({outcome})")
 
-            # Send SMS Alert
-            send_sms("+1234567890", message)
-
-            return {"status": "Alert Sent", "details": message}
+            return {"status": "Alert Dropped" if outcome == DROPPED else "Alert Queued", "outcome": outcome, "details": message}
         except Exception as e:
             logging.error(f"Failed to send alert: {e}")
             return None
+
+    def alert_stats(self):
+        """ Dispatch outcomes, digests and per-channel delivery latency / failures """
+        return self.dispatcher.stats()
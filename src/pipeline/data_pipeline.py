@@ -1,26 +1,114 @@
-import requests
+import time
+import asyncio
 import logging
+import httpx
+import requests
+from typing import Dict, List, Optional, Sequence, Tuple
 from src.database.db_operations import fetch_shipment_data, fetch_inventory_data
+from src.retrieval.query_cache import LRUCache
+from src.config.settings import (MAPS_API_BASE_URL, GOOGLE_MAPS_API_KEY, MAPS_API_TIMEOUT, MAPS_API_MAX_CONCURRENCY,
+                                 MAPS_CACHE_BUCKET_SECONDS, MAPS_CACHE_SIZE)
 
 class DataPipeline:
     """ Fetches Real-Time Data for AI Processing """
 
-    def __init__(self):
+    def __init__(self, base_url: str = MAPS_API_BASE_URL, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 max_concurrency: int = MAPS_API_MAX_CONCURRENCY, bucket_seconds: int = MAPS_CACHE_BUCKET_SECONDS):
         logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
+        self.directions_url = f"{base_url.rstrip('/')}/directions/json"
+        self.transport = transport  # e.g. httpx.MockTransport in tests; default is a real pooled connection
+        self.max_concurrency = max_concurrency
+        self.bucket_seconds = bucket_seconds
+        self.session = requests.Session()  # keep-alive for the sync path
+        self.route_cache = LRUCache(MAPS_CACHE_SIZE, ttl=bucket_seconds)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _route_key(self, origin, destination) -> Tuple[str, str, int]:
+        """ Cache key: the same pair within one time bucket reuses the response (traffic changes slowly) """
+        return (origin, destination, int(time.time() // self.bucket_seconds))
+
+    def _params(self, origin, destination) -> Dict[str, str]:
+        return {"origin": origin, "destination": destination, "key": GOOGLE_MAPS_API_KEY}
 
     def fetch_google_maps_data(self, origin, destination):
         """ Fetches Traffic & ETA Data from Google Maps API """
+        key = self._route_key(origin, destination)
+        cached = self.route_cache.get(key)
+        if cached is not None:
+            return cached
         try:
-            api_url = f"https://maps.googleapis.com/maps/api/directions/json?origin={origin}&destination={destination}&key=YOUR_GOOGLE_MAPS_API_KEY"
-            response = requests.get(api_url)
+            response = self.session.get(self.directions_url, params=self._params(origin, destination), timeout=MAPS_API_TIMEOUT)
             response.raise_for_status()
             data = response.json()
-            logging.info(f"Fetched Google Maps Data: {data}")
+            logging.info(f"Fetched Google Maps Data: {origin} -> {destination} ({data.get('status')})")
+            if data.get("status") == "OK":  # quota / request errors come back as HTTP 200 too: never reuse them
+                self.route_cache.put(key, data)
             return data
         except Exception as e:
             logging.error(f"Failed to fetch Google Maps Data: {e}")
             return None
 
+    def _async_client(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        """ One pooled client per event loop (connections and the concurrency cap are loop-bound) """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            self._client = httpx.AsyncClient(timeout=MAPS_API_TIMEOUT, limits=limits, transport=self.transport)
+            self._client_loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client, self._semaphore
+
+    async def afetch_google_maps_data(self, origin, destination):
+        """ Async Traffic & ETA Lookup over the pooled client (cached per time bucket) """
+        key = self._route_key(origin, destination)
+        cached = self.route_cache.get(key)
+        if cached is not None:
+            return cached
+        client, semaphore = self._async_client()
+        try:
+            async with semaphore:
+                response = await client.get(self.directions_url, params=self._params(origin, destination))
+            response.raise_for_status()
+            data = response.json()
+            if data.get("status") == "OK":  # quota / request errors come back as HTTP 200 too: never reuse them
+                self.route_cache.put(key, data)
+            else:
+                logging.error(f"Google Maps Data Not Cached ({origin} -> {destination}): {data.get('status')}")
+            return data
+        except Exception as e:
+            logging.error(f"Failed to fetch Google Maps Data ({origin} -> {destination}): {e}")
+            return None
+
+    async def afetch_routes(self, pairs: Sequence[Tuple[str, str]]) -> List[Optional[dict]]:
+        """ Fleet-wide lookup: unique pairs fetched concurrently (at most max_concurrency requests open); results in input order """
+        unique = list(dict.fromkeys(pairs))
+        started = time.perf_counter()
+        results = dict(zip(unique, await asyncio.gather(*(self.afetch_google_maps_data(origin, destination) for origin, destination in unique))))
+        failed = sum(result is None for result in results.values())
+        logging.info(f"Fetched {len(unique)} Routes ({len(pairs)} Requested, {failed} Failed) in {time.perf_counter() - started:.2f}s")
+        return [results[pair] for pair in pairs]
+
+    def fetch_routes(self, pairs: Sequence[Tuple[str, str]]) -> List[Optional[dict]]:
+        """ Sync entry point for afetch_routes (runs its own event loop; not for use inside one) """
+        async def run():
+            try:
+                return await self.afetch_routes(pairs)
+            finally:
+                await self.aclose()
+        return asyncio.run(run())
+
+    async def aclose(self):
+        """ Closes the pooled async client """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
+    def route_cache_stats(self):
+        return self.route_cache.stats()
+
     def fetch_shipment_status(self, shipment_id):
         """ Fetches Real-Time Shipment Tracking Data """
         try:
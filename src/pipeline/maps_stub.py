@@ -0,0 +1,94 @@
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+def directions_response(origin: str, destination: str) -> dict:
+    """ Deterministic Directions API-shaped response for an origin / destination pair """
+    seed = int(hashlib.sha1(f"{origin}|{destination}".encode("utf-8")).hexdigest()[:8], 16)
+    distance = 5000 + seed % 500000
+    duration = distance // 15
+    return {
+        "status": "OK",
+        "routes": [{
+            "summary": f"{origin} to {destination}",
+            "legs": [{
+                "start_address": origin, "end_address": destination,
+                "distance": {"value": distance, "text": f"{distance / 1000:.1f} km"},
+                "duration": {"value": duration, "text": f"{duration // 60} mins"},
+                "duration_in_traffic": {"value": int(duration * (1 + seed % 40 / 100)), "text": f"{duration // 60} mins"},
+            }],
+        }],
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """ Serves GET /directions/json?origin=..&destination=.. (any path prefix, key ignored) """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients' connection pooling is exercised
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if not url.path.endswith("/directions/json") or "origin" not in params or "destination" not in params:
+            self.send_error(404)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests += 1
+        body = json.dumps(directions_response(params["origin"][0], params["destination"][0])).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MapsStubServer(ThreadingHTTPServer):
+    """ Local Stand-In for the Maps API (offline runs & load tests; set MAPS_API_BASE_URL to base_url) """
+
+    daemon_threads = True
+    request_queue_size = 1024  # concurrent clients connect at once; the default backlog of 5 drops SYNs
+
+    def __init__(self, port: int = 0, latency_ms: float = 0):
+        super().__init__(("127.0.0.1", port), _StubHandler)
+        self.latency = latency_ms / 1000
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/maps/api"
+
+
+def start_stub_server(port: int = 0, latency_ms: float = 0) -> Tuple[MapsStubServer, str]:
+    """ Starts the stub in a background thread; returns the server (call shutdown() when done) and its base URL """
+    server = MapsStubServer(port, latency_ms)
+    threading.Thread(target=server.serve_forever, name="maps-stub", daemon=True).start()
+    return server, server.base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Maps API stub server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated per-request latency")
+    args = parser.parse_args()
+
+    server = MapsStubServer(args.port, args.latency_ms)
+    logging.info(f"Maps Stub Serving at {server.base_url}")
+    print(f"MAPS_API_BASE_URL={server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import csv
+import json
+import time
+import asyncio
+import logging
+import argparse
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+from src.config.settings import SHIPMENT_INGEST_BATCH_SIZE
+from src.database.db_operations import DatabaseOperations
+from src.models.database_models import Shipment
+
+def _parse_line(line) -> Optional[Dict]:
+    """ One JSON record; None for a malformed line (counted as rejected instead of aborting the load) """
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        logging.error(f"Malformed Shipment Record Skipped: {e}")
+        return None
+
+def read_jsonl(path: str) -> Iterator[Optional[Dict]]:
+    """ Streams shipment records from a JSON Lines file (one object per line) """
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield _parse_line(line)
+
+def read_csv(path: str) -> Iterator[Dict]:
+    """ Streams shipment records from a CSV file with a header row (empty cells are left out) """
+    with open(path, encoding="utf-8", newline="") as file:
+        for row in csv.DictReader(file):
+            yield {column: value for column, value in row.items() if value != ""}
+
+async def aread_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[Optional[Dict]]:
+    """ Parses newline-delimited JSON from a streamed request body without buffering the whole body """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if pending.strip():
+        yield _parse_line(pending)
+
+
+class ShipmentIngestor:
+    """ Bulk Shipment Ingestion - Writes Streamed Records as Batched Insert-or-Update Transactions """
+
+    def __init__(self, batch_size: int = SHIPMENT_INGEST_BATCH_SIZE):
+        logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
+        self.batch_size = batch_size
+        self.columns = {column.name for column in Shipment.__table__.columns}
+        self.primary_key = [column.name for column in Shipment.__table__.primary_key]
+
+    def _clean(self, record: Dict) -> Optional[Dict]:
+        """ Keeps known columns; None when the record can't be keyed """
+        if not isinstance(record, dict):
+            return None
+        cleaned = {column: value for column, value in record.items() if column in self.columns}
+        if any(cleaned.get(key) in (None, "") for key in self.primary_key):
+            return None
+        return cleaned
+
+    def _new_report(self) -> Dict:
+        return {"received": 0, "written": 0, "rejected": 0, "failed": 0, "batches": [], "started": time.perf_counter()}
+
+    def _write_batch(self, db: DatabaseOperations, batch: List[Dict], report: Dict):
+        """ One transaction per batch; a failed batch is logged and counted, later batches still run """
+        started = time.perf_counter()
+        try:
+            written, error = db.upsert_shipments(batch), None
+        except Exception as e:
+            written, error = 0, str(e)
+            report["failed"] += len(batch)
+            logging.error(f"Shipment Batch {len(report['batches']) + 1} Failed ({len(batch)} Records): {e}")
+        seconds = time.perf_counter() - started
+        report["written"] += written
+        report["batches"].append({"records": len(batch), "written": written, "seconds": round(seconds, 4),
+                                  "records_per_second": round(len(batch) / seconds, 1) if seconds else None, "error": error})
+        logging.info(f"Shipment Batch {len(report['batches'])}: {written}/{len(batch)} Records in {seconds:.3f}s")
+
+    def _accept(self, record, batch: List[Dict], report: Dict):
+        report["received"] += 1
+        cleaned = self._clean(record)
+        if cleaned is None:
+            report["rejected"] += 1
+        else:
+            batch.append(cleaned)
+
+    def _finish(self, report: Dict) -> Dict:
+        seconds = time.perf_counter() - report.pop("started")
+        report["seconds"] = round(seconds, 4)
+        report["records_per_second"] = round(report["written"] / seconds, 1) if seconds else None
+        logging.info(f"Shipment Ingestion: {report['written']} Written, {report['rejected']} Rejected, "
+                     f"{report['failed']} Failed in {len(report['batches'])} Batches ({seconds:.2f}s)")
+        return report
+
+    def ingest(self, records: Iterable[Dict]) -> Dict:
+        """ Consumes any iterator of shipment dicts (e.g. read_jsonl / read_csv) in batch_size transactions """
+        report, batch = self._new_report(), []
+        db = DatabaseOperations()
+        try:
+            for record in records:
+                self._accept(record, batch, report)
+                if len(batch) >= self.batch_size:
+                    self._write_batch(db, batch, report)
+                    batch = []
+            if batch:
+                self._write_batch(db, batch, report)
+        finally:
+            db.close()
+        return self._finish(report)
+
+    async def aingest(self, records: AsyncIterable[Dict]) -> Dict:
+        """ ingest() for async sources (e.g. a streamed request body); each batch is written in a worker thread """
+        report, batch = self._new_report(), []
+        db = DatabaseOperations()
+        try:
+            async for record in records:
+                self._accept(record, batch, report)
+                if len(batch) >= self.batch_size:
+                    await asyncio.to_thread(self._write_batch, db, batch, report)
+                    batch = []
+            if batch:
+                await asyncio.to_thread(self._write_batch, db, batch, report)
+        finally:
+            db.close()
+        return self._finish(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load shipment records from JSON Lines or CSV files")
+    parser.add_argument("paths", nargs="+", help=".jsonl / .ndjson / .csv files")
+    parser.add_argument("--batch-size", type=int, default=SHIPMENT_INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    ingestor = ShipmentIngestor(batch_size=args.batch_size)
+    for path in args.paths:
+        records = read_csv(path) if path.endswith(".csv") else read_jsonl(path)
+        report = ingestor.ingest(records)
+        print(f"{path}: {report['written']} written, {report['rejected']} rejected, {report['failed']} failed "
+              f"in {len(report['batches'])} batches, {report['seconds']:.2f}s ({report['records_per_second']} records/s)")
+
+
+if __name__ == "__main__":
+    main()
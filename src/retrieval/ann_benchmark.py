@@ -0,0 +1,95 @@
+import time
+import argparse
+import logging
+import faiss
+import numpy as np
+from typing import Dict, List, Sequence
+from src.retrieval.ann_index import ANNIndexConfig, build_index
+
+def benchmark_configs(embeddings: np.ndarray, queries: np.ndarray, configs: Sequence[ANNIndexConfig], k: int = 10) -> List[Dict]:
+    """ Reports recall@k against the exact Flat index, p50/p99 latency and memory size per configuration """
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    queries = np.ascontiguousarray(queries, dtype="float32")
+
+    exact = faiss.IndexFlatL2(embeddings.shape[1])
+    exact.add(embeddings)
+    _, ground_truth = exact.search(queries, k)
+
+    report = []
+    for config in configs:
+        build_start = time.perf_counter()
+        index = build_index(embeddings, config)
+        build_seconds = time.perf_counter() - build_start
+
+        # Single-query latency, the way the API calls it
+        latencies, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, indices = index.search(query[None, :], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found.append(indices[0])
+
+        hits = sum(len(set(row[row != -1].tolist()) & set(truth.tolist())) for row, truth in zip(found, ground_truth))
+        report.append({
+            "config": config.label(),
+            f"recall@{k}": hits / (len(queries) * k),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "memory_mb": faiss.serialize_index(index).nbytes / 2 ** 20,
+            "build_s": build_seconds,
+        })
+        logging.info(f"ANN Benchmark: {report[-1]}")
+    return report
+
+
+def load_embeddings(path: str) -> np.ndarray:
+    """ Loads vectors from a .npy matrix or an embedding cache .npz """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return data["vectors"].astype("float32")
+    return np.load(path).astype("float32")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall / latency / memory comparison of FAISS index types")
+    parser.add_argument("--embeddings", help="Path to .npy vectors or an embedding cache .npz")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of --embeddings")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension for --synthetic")
+    parser.add_argument("--queries", type=int, default=500, help="Held-out corpus vectors used as queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-types", default="flat,ivf_flat,ivf_pq,hnsw")
+    parser.add_argument("--nlist", type=int, nargs="+", default=[1024])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        vectors = rng.standard_normal((args.synthetic, args.dim)).astype("float32")
+    elif args.embeddings:
+        vectors = load_embeddings(args.embeddings)
+    else:
+        parser.error("either --embeddings or --synthetic is required")
+
+    order = rng.permutation(len(vectors))
+    queries, corpus = vectors[order[:args.queries]], vectors[order[args.queries:]]
+
+    configs = []
+    for index_type in args.index_types.split(","):
+        if index_type in ("ivf_flat", "ivf_pq"):
+            configs += [ANNIndexConfig(index_type=index_type, nlist=nlist, nprobe=nprobe, pq_m=args.pq_m)
+                        for nlist in args.nlist for nprobe in args.nprobe]
+        elif index_type == "hnsw":
+            configs += [ANNIndexConfig(index_type="hnsw", hnsw_m=args.hnsw_m, ef_search=ef) for ef in args.ef_search]
+        else:
+            configs.append(ANNIndexConfig(index_type=index_type))
+
+    print(f"{'config':<40} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8} {'mem MB':>8} {'build s':>8}")
+    for row in benchmark_configs(corpus, queries, configs, args.k):
+        print(f"{row['config']:<40} {row[f'recall@{args.k}']:>10.3f} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['memory_mb']:>8.1f} {row['build_s']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import logging
+import faiss
+import numpy as np
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from src.config.settings import (
+    FAISS_INDEX_TYPE, FAISS_NLIST, FAISS_NPROBE, FAISS_PQ_M, FAISS_PQ_NBITS,
+    FAISS_HNSW_M, FAISS_EF_CONSTRUCTION, FAISS_EF_SEARCH,
+)
+
+# FAISS recommends ~39 training points per IVF centroid
+MIN_POINTS_PER_CENTROID = 39
+
+#Define Pydantic Model for FAISS Index Configuration
+class ANNIndexConfig(BaseModel):
+    index_type: Literal["flat", "ivf_flat", "ivf_pq", "hnsw"] = Field(default="flat", description="FAISS index family")
+    nlist: int = Field(default=1024, gt=0, description="IVF: number of inverted lists (coarse centroids)")
+    nprobe: int = Field(default=16, gt=0, description="IVF: lists visited per query (search-time)")
+    pq_m: int = Field(default=48, gt=0, description="IVF-PQ: sub-quantizers, must divide the dimension")
+    pq_nbits: int = Field(default=8, gt=0, description="IVF-PQ: bits per sub-quantizer code")
+    hnsw_m: int = Field(default=32, gt=0, description="HNSW: graph neighbours per node")
+    ef_construction: int = Field(default=200, gt=0, description="HNSW: candidate list size while building")
+    ef_search: int = Field(default=64, gt=0, description="HNSW: candidate list size per query (search-time)")
+
+    def build_params(self) -> dict:
+        """ Parameters baked into the index at build time (a change requires a rebuild) """
+        return self.dict(exclude={"nprobe", "ef_search"})
+
+    def label(self) -> str:
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            return f"{self.index_type}(nlist={self.nlist}, nprobe={self.nprobe})"
+        if self.index_type == "hnsw":
+            return f"hnsw(M={self.hnsw_m}, efSearch={self.ef_search})"
+        return "flat"
+
+
+def default_index_config() -> ANNIndexConfig:
+    """ Index configuration from environment settings """
+    return ANNIndexConfig(
+        index_type=FAISS_INDEX_TYPE, nlist=FAISS_NLIST, nprobe=FAISS_NPROBE,
+        pq_m=FAISS_PQ_M, pq_nbits=FAISS_PQ_NBITS,
+        hnsw_m=FAISS_HNSW_M, ef_construction=FAISS_EF_CONSTRUCTION, ef_search=FAISS_EF_SEARCH,
+    )
+
+
+def build_index(embeddings: np.ndarray, config: ANNIndexConfig, ids: Optional[np.ndarray] = None) -> faiss.Index:
+    """ Creates, trains (IVF) and fills a FAISS L2 index of the configured type (ID-mapped when ids are given) """
+    n, dim = embeddings.shape
+    index_type = config.index_type
+
+    if index_type == "ivf_pq" and n < 2 ** config.pq_nbits:
+        logging.warning(f"IVF-PQ needs >= {2 ** config.pq_nbits} training vectors, got {n}; falling back to IVF-Flat")
+        index_type = "ivf_flat"
+    if index_type in ("ivf_flat", "ivf_pq") and n < MIN_POINTS_PER_CENTROID:
+        logging.warning(f"Too few vectors ({n}) to train IVF; falling back to Flat")
+        index_type = "flat"
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config.hnsw_m)
+        index.hnsw.efConstruction = config.ef_construction
+    else:
+        nlist = max(1, min(config.nlist, n // MIN_POINTS_PER_CENTROID))
+        if nlist != config.nlist:
+            logging.warning(f"IVF nlist reduced from {config.nlist} to {nlist} for {n} training vectors")
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf_pq":
+            if dim % config.pq_m:
+                raise ValueError(f"pq_m={config.pq_m} must divide the embedding dimension {dim}")
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, config.pq_m, config.pq_nbits)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        index.train(embeddings)
+
+    if ids is not None:
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(embeddings, np.asarray(ids, dtype=np.int64))
+    else:
+        index.add(embeddings)
+    apply_search_params(index, config)
+    logging.info(f"FAISS {index_type} Index Built with {n} Vectors")
+    return index
+
+
+def unwrap_index(index: faiss.Index) -> faiss.Index:
+    """ Returns the concrete index behind an IndexIDMap / IndexIDMap2 wrapper """
+    index = faiss.downcast_index(index)
+    if hasattr(index, "id_map"):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def apply_search_params(index: faiss.Index, config: ANNIndexConfig):
+    """ Applies search-time knobs (nprobe / efSearch); also used after loading a snapshot """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(config.nprobe, ivf.nlist)
+    hnsw = getattr(unwrap_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = config.ef_search
+
+
+def search_parameters(index: faiss.Index, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """ Search parameters restricting results to an ID selector, keeping the index's nprobe / efSearch """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    hnsw = getattr(unwrap_index(index), "hnsw", None)
+    if hnsw is not None:
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
@@ -0,0 +1,442 @@
+import copy
+import math
+import logging
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from src.retrieval.metadata_filter import AttributeBitmaps, Filters, Metadata
+
+class BM25Engine:
+    """ Inverted-Index BM25 (Okapi) Engine with Sparse Scoring & Partial Top-K Selection
+
+    Built documents live in immutable CSR posting lists (possibly memory-mapped). Later inserts go to
+    a small delta segment and deletes clear a liveness mask, while document frequencies, IDF and length
+    norms are kept global. Mutators must only be called on a private copy() that is then published.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        # Same defaults as rank_bm25.BM25Okapi so scores are interchangeable
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.doc_ids: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.int64)
+        self.term_freqs = np.zeros(0, dtype=np.int32)
+        self.doc_len = np.zeros(0, dtype=np.int64)
+        self.doc_norms = np.zeros(0, dtype=np.float64)
+        self.idf = np.zeros(0, dtype=np.float64)
+        self.avgdl = 0.0
+        self.attributes = AttributeBitmaps()  # metadata bitmaps over doc indices
+        self._reset_delta()
+
+    def _reset_delta(self):
+        """ Marks every document as part of the CSR base with no pending inserts or deletes """
+        self.doc_freqs = np.diff(self.indptr)
+        self.base_doc_count = len(self.doc_len)
+        self.num_live = len(self.doc_len)
+        self.live: Optional[np.ndarray] = None  # None = all documents live
+        self.delta_vocabulary: Dict[str, int] = {}
+        self.delta_postings: Dict[int, Dict[int, int]] = {}
+        self.delta_doc_terms: Dict[int, Dict[int, int]] = {}
+        self._doc_index: Optional[Dict[str, int]] = None
+        self._forward: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_corpus(cls, doc_ids: Sequence[str], corpus: Iterable[Sequence[str]], metadata: Optional[Sequence[Metadata]] = None, **params) -> "BM25Engine":
+        """ Builds an engine from document IDs, their tokenized texts and optional filterable metadata """
+        engine = cls(**params)
+        engine.build(doc_ids, corpus)
+        if metadata is not None:
+            engine.attributes = AttributeBitmaps.build(metadata)
+        return engine
+
+    @classmethod
+    def from_arrays(cls, doc_ids, vocabulary, indptr, postings, term_freqs, doc_len, doc_norms, idf, avgdl, attributes=None, **params) -> "BM25Engine":
+        """ Restores an engine from precomputed statistics (e.g. memory-mapped snapshot arrays) """
+        engine = cls(**params)
+        engine.doc_ids = doc_ids
+        engine.vocabulary = vocabulary
+        engine.indptr = indptr
+        engine.postings = postings
+        engine.term_freqs = term_freqs
+        engine.doc_len = doc_len
+        engine.doc_norms = doc_norms
+        engine.idf = idf
+        engine.avgdl = avgdl
+        engine.attributes = attributes if attributes is not None else AttributeBitmaps()
+        engine._reset_delta()
+        return engine
+
+    def __len__(self):
+        return self.num_live
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Tuple[Sequence[str], Iterable[Sequence[str]], Optional[Sequence[Metadata]]]], **params) -> "BM25Engine":
+        """ Builds an engine from (IDs, tokenized texts, metadata) chunks, e.g. streamed from the database.
+        Each chunk is reduced to compact posting arrays before the next is read, so its tokens can be freed. """
+        engine = cls(**params)
+        engine.build_chunks(chunks)
+        return engine
+
+    def build(self, doc_ids: Sequence[str], corpus: Iterable[Sequence[str]]):
+        """ Builds posting lists (CSR layout), IDF table and document length norms """
+        self.build_chunks([(doc_ids, corpus, None)])
+
+    def build_chunks(self, chunks: Iterable[Tuple[Sequence[str], Iterable[Sequence[str]], Optional[Sequence[Metadata]]]]):
+        """ build() over a corpus that arrives in chunks (metadata, when given, is indexed per chunk) """
+        vocabulary: Dict[str, int] = {}
+        term_chunks, doc_chunks, tf_chunks, len_chunks = [], [], [], []
+        doc_ids: List[str] = []
+        attributes = AttributeBitmaps()
+
+        for chunk_ids, chunk_corpus, chunk_metadata in chunks:
+            offset = len(doc_ids)
+            term_rows, doc_rows, tf_rows, doc_len = [], [], [], []
+            for doc_idx, tokens in enumerate(chunk_corpus, start=offset):
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    term_rows.append(vocabulary.setdefault(token, len(vocabulary)))
+                    doc_rows.append(doc_idx)
+                    tf_rows.append(tf)
+                doc_len.append(len(tokens))
+
+            doc_ids.extend(chunk_ids)
+            if len(doc_ids) != offset + len(doc_len):
+                raise ValueError(f"Got {len(doc_ids) - offset} document IDs for {len(doc_len)} documents")
+            if chunk_metadata is not None:
+                attributes.add(range(offset, len(doc_ids)), chunk_metadata)
+            term_chunks.append(np.asarray(term_rows, dtype=np.int64))
+            doc_chunks.append(np.asarray(doc_rows, dtype=np.int64))
+            tf_chunks.append(np.asarray(tf_rows, dtype=np.int32))
+            len_chunks.append(np.asarray(doc_len, dtype=np.int64))
+
+        term_rows = np.concatenate(term_chunks) if term_chunks else np.zeros(0, dtype=np.int64)
+        order = np.argsort(term_rows, kind="stable")  # Keeps doc indices ascending within each posting list
+
+        self.doc_ids = doc_ids
+        self.vocabulary = vocabulary
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(term_rows, minlength=len(vocabulary))))).astype(np.int64)
+        self.postings = (np.concatenate(doc_chunks) if doc_chunks else np.zeros(0, dtype=np.int64))[order]
+        self.term_freqs = (np.concatenate(tf_chunks) if tf_chunks else np.zeros(0, dtype=np.int32))[order]
+        self.doc_len = np.concatenate(len_chunks) if len_chunks else np.zeros(0, dtype=np.int64)
+        if len(attributes):
+            self.attributes = attributes
+
+        self._reset_delta()
+        self._compute_statistics()
+        logging.info(f"BM25 Engine Built: {len(self.doc_ids)} Documents, {len(vocabulary)} Terms, {len(self.postings)} Postings")
+
+    def _compute_statistics(self):
+        """ Precomputes IDF per term and the length normalisation per document (over live documents) """
+        live_len = self.doc_len if self.live is None else self.doc_len[self.live]
+        corpus_size = len(live_len)
+        if corpus_size == 0:
+            self.avgdl = 0.0
+            self.doc_norms = np.zeros(len(self.doc_len), dtype=np.float64)
+            self.idf = np.zeros(len(self.doc_freqs), dtype=np.float64)
+            return
+
+        self.avgdl = int(live_len.sum()) / corpus_size
+        self.doc_norms = self.k1 * (1 - self.b + self.b * self.doc_len / self.avgdl)
+
+        self.idf = np.array(self.idf_values(self.doc_freqs.tolist(), corpus_size, self.epsilon), dtype=np.float64)
+
+    @staticmethod
+    def idf_values(doc_freqs: Sequence[int], corpus_size: int, epsilon: float) -> List[float]:
+        """ IDF per term from document frequencies given in first-seen term order """
+        # Mirrors BM25Okapi._calc_idf (math.log, summed in first-seen term order) for bit-identical scores;
+        # terms whose documents were all deleted no longer count towards the average
+        idf = [math.log(corpus_size - freq + 0.5) - math.log(freq + 0.5) if freq else 0.0 for freq in doc_freqs]
+        present = sum(1 for freq in doc_freqs if freq)
+        average_idf = sum(value for value, freq in zip(idf, doc_freqs) if freq) / present if present else 0.0
+        eps = epsilon * average_idf
+        return [eps if value < 0 else value for value in idf]
+
+    def use_global_statistics(self, idf: Dict[str, float], avgdl: float):
+        """ Replaces corpus-local IDF and average length with corpus-wide values (this engine holds one shard) """
+        self.avgdl = avgdl
+        self.doc_norms = self.k1 * (1 - self.b + self.b * self.doc_len / self.avgdl)
+        self.idf = np.zeros(len(self.doc_freqs), dtype=np.float64)
+        for token, term in self.vocabulary_items():
+            self.idf[term] = idf[token]
+
+    def _term_id(self, token: str) -> Optional[int]:
+        term = self.vocabulary.get(token)
+        return self.delta_vocabulary.get(token) if term is None else term
+
+    def _postings(self, term: int, eligible: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """ Live (doc indices, term frequencies) for a term across the CSR base and the delta segment,
+        restricted to the eligible mask (live & filter-matching) when one is given """
+        eligible = self.live if eligible is None else eligible
+        if term < len(self.indptr) - 1:
+            start, end = self.indptr[term], self.indptr[term + 1]
+            docs, q_freq = self.postings[start:end], self.term_freqs[start:end]
+        else:
+            docs, q_freq = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+
+        delta = self.delta_postings.get(term)
+        if delta:
+            docs = np.concatenate((docs, np.fromiter(delta.keys(), dtype=np.int64, count=len(delta))))
+            q_freq = np.concatenate((q_freq, np.fromiter(delta.values(), dtype=np.int32, count=len(delta))))
+        if eligible is not None and len(docs):
+            keep = eligible[docs]
+            docs, q_freq = docs[keep], q_freq[keep]
+        return docs, q_freq
+
+    def filter_mask(self, filters: Optional[Filters]) -> Optional[np.ndarray]:
+        """ Documents that are live and match the metadata filters (None = no filters) """
+        if not filters:
+            return None
+        mask = self.attributes.mask(filters, len(self.doc_len))
+        return mask if self.live is None else mask & self.live
+
+    def get_scores(self, query_tokens: Sequence[str], eligible: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """ Scores only (eligible) documents that contain at least one query term -> (doc indices, scores) """
+        doc_chunks, score_chunks = [], []
+
+        for token in query_tokens:
+            term = self._term_id(token)
+            if term is None:
+                continue
+            docs, q_freq = self._postings(term, eligible)
+            doc_chunks.append(docs)
+            score_chunks.append(self.idf[term] * (q_freq * (self.k1 + 1) / (q_freq + self.doc_norms[docs])))
+
+        if not doc_chunks:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        # Sum per-term contributions per document (same accumulation order as a dense score vector)
+        candidates, inverse = np.unique(np.concatenate(doc_chunks), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_chunks), minlength=len(candidates))
+        return candidates, scores
+
+    def top_k(self, query_tokens: Sequence[str], k: int = 5, filters: Optional[Filters] = None) -> List[Tuple[str, float]]:
+        """ Returns the k best (doc_id, score) pairs, ordered like sorted(enumerate(scores)) over the full corpus.
+        Metadata filters restrict scoring itself: postings of non-matching documents are dropped up front. """
+        eligible = self.filter_mask(filters)
+        k = min(k, self.num_live if eligible is None else int(np.count_nonzero(eligible)))
+        if k <= 0:
+            return []
+
+        matched, matched_scores = self.get_scores(query_tokens, eligible)
+        return self._ranked(matched, matched_scores, k, eligible)
+
+    def top_k_batch(self, queries: Sequence[Sequence[str]], k: int = 5, filters: Optional[Filters] = None) -> List[List[Tuple[str, float]]]:
+        """ top_k() for many queries at once: one pass over the shared posting lists, scored as a single array """
+        eligible = self.filter_mask(filters)
+        k = min(k, self.num_live if eligible is None else int(np.count_nonzero(eligible)))
+        if k <= 0:
+            return [[] for _ in queries]
+
+        # Gather each distinct term's postings once, then lay out (query, term) contributions back to back
+        postings: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        key_chunks, score_chunks = [], []
+        stride = len(self.doc_len)
+        for row, query_tokens in enumerate(queries):
+            for token in query_tokens:
+                term = self._term_id(token)
+                if term is None:
+                    continue
+                if term not in postings:
+                    postings[term] = self._postings(term, eligible)
+                docs, q_freq = postings[term]
+                key_chunks.append(docs + row * stride)
+                score_chunks.append(self.idf[term] * (q_freq * (self.k1 + 1) / (q_freq + self.doc_norms[docs])))
+
+        if key_chunks:
+            # Keys are (query row, doc index) packed into one int64, so one unique/bincount sums every query
+            keys, inverse = np.unique(np.concatenate(key_chunks), return_inverse=True)
+            all_scores = np.bincount(inverse, weights=np.concatenate(score_chunks), minlength=len(keys))
+        else:
+            keys, all_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        bounds = np.searchsorted(keys, np.arange(len(queries) + 1, dtype=np.int64) * stride)
+        return [self._ranked(keys[start:end] - row * stride, all_scores[start:end], k, eligible)
+                for row, (start, end) in enumerate(zip(bounds[:-1].tolist(), bounds[1:].tolist()))]
+
+    def _ranked(self, matched: np.ndarray, matched_scores: np.ndarray, k: int, eligible: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        candidates, scores = self._select(matched, matched_scores, k)
+
+        # Documents without any query term score 0: they fill the tail and tie-break by index against scores <= 0
+        if len(candidates) < k or (len(scores) and scores[-1] <= 0):
+            candidates, scores = self._pad_with_zero_scores(matched, candidates, scores, k, eligible)
+
+        return [(self.doc_ids[i], float(score)) for i, score in zip(candidates.tolist(), scores.tolist())]
+
+    @staticmethod
+    def _select(candidates: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Partial top-k via np.partition, keeping every tie at the cut-off so ordering stays stable """
+        if len(scores) > k:
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            keep = scores >= kth
+            candidates, scores = candidates[keep], scores[keep]
+
+        order = np.lexsort((candidates, -scores))[:k]
+        return candidates[order], scores[order]
+
+    def _pad_with_zero_scores(self, matched: np.ndarray, candidates: np.ndarray, scores: np.ndarray, k: int,
+                              eligible: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """ Merges the lowest-index unmatched eligible documents (score 0) into the selection """
+        matched = set(matched.tolist())
+        eligible = self.live if eligible is None else eligible
+        filler = []
+        for doc_idx in (range(len(self.doc_len)) if eligible is None else np.flatnonzero(eligible).tolist()):
+            if len(filler) == k:
+                break
+            if doc_idx not in matched:
+                filler.append(doc_idx)
+
+        candidates = np.concatenate((candidates, np.asarray(filler, dtype=np.int64)))
+        scores = np.concatenate((scores, np.zeros(len(filler), dtype=np.float64)))
+        return self._select(candidates, scores, k)
+
+    # -- Incremental updates (apply to a copy(), then publish the copy) --
+
+    def copy(self) -> "BM25Engine":
+        """ Next-generation copy: shares the CSR base, copies the per-document / per-term state and the delta """
+        clone = copy.copy(self)
+        clone.doc_ids = list(self.doc_ids)
+        clone.doc_freqs = self.doc_freqs.copy()
+        clone.live = self.live.copy() if self.live is not None else None
+        clone.attributes = self.attributes.copy()
+        clone.delta_vocabulary = dict(self.delta_vocabulary)
+        clone.delta_postings = {term: dict(docs) for term, docs in self.delta_postings.items()}
+        clone.delta_doc_terms = dict(self.delta_doc_terms)
+        clone._doc_index = dict(self._doc_index) if self._doc_index is not None else None
+        return clone
+
+    def pending_changes(self) -> int:
+        """ Documents inserted or deleted since the CSR base was built """
+        return len(self.delta_doc_terms) + len(self.doc_len) - self.num_live
+
+    def _doc_indices(self) -> Dict[str, int]:
+        """ Live document ID -> doc index (built lazily: read-only workers never pay for it) """
+        if self._doc_index is None:
+            self._doc_index = {doc_id: doc_idx for doc_idx, doc_id in enumerate(self.doc_ids)
+                               if self.live is None or self.live[doc_idx]}
+        return self._doc_index
+
+    def _base_doc_terms(self, doc_idx: int) -> np.ndarray:
+        """ Term IDs of a CSR base document, via a lazily built forward index """
+        if self._forward is None:
+            term_of_posting = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+            order = np.argsort(self.postings, kind="stable")
+            doc_ptr = np.concatenate(([0], np.cumsum(np.bincount(self.postings, minlength=self.base_doc_count)))).astype(np.int64)
+            self._forward = (doc_ptr, term_of_posting[order])
+        doc_ptr, terms = self._forward
+        return terms[doc_ptr[doc_idx]:doc_ptr[doc_idx + 1]]
+
+    def add_documents(self, doc_ids: Sequence[str], corpus: Iterable[Sequence[str]], metadata: Optional[Sequence[Metadata]] = None):
+        """ Inserts tokenized documents (with optional filterable metadata) into the delta segment; existing IDs are replaced """
+        metadata = metadata if metadata is not None else [None] * len(doc_ids)
+        batch = dict(zip(doc_ids, zip(corpus, metadata)))  # last write wins within a batch
+        self.remove_documents(list(batch), refresh=False)
+        doc_index = self._doc_indices()
+
+        first_doc, first_term = len(self.doc_len), len(self.doc_freqs)
+        df_increments: Dict[int, int] = {}
+        doc_len = []
+        for offset, (doc_id, (tokens, _)) in enumerate(batch.items()):
+            doc_idx = first_doc + offset
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+
+            doc_terms = {}
+            for token, tf in counts.items():
+                term = self._term_id(token)
+                if term is None:
+                    term = len(self.indptr) - 1 + len(self.delta_vocabulary)
+                    self.delta_vocabulary[token] = term
+                self.delta_postings.setdefault(term, {})[doc_idx] = tf
+                doc_terms[term] = tf
+                df_increments[term] = df_increments.get(term, 0) + 1
+
+            self.delta_doc_terms[doc_idx] = doc_terms
+            self.doc_ids.append(doc_id)
+            doc_index[doc_id] = doc_idx
+            doc_len.append(len(tokens))
+
+        num_terms = len(self.indptr) - 1 + len(self.delta_vocabulary)
+        self.doc_freqs = np.concatenate((self.doc_freqs, np.zeros(num_terms - first_term, dtype=self.doc_freqs.dtype)))
+        if df_increments:
+            np.add.at(self.doc_freqs, np.fromiter(df_increments.keys(), dtype=np.int64), np.fromiter(df_increments.values(), dtype=np.int64))
+        self.doc_len = np.concatenate((self.doc_len, np.asarray(doc_len, dtype=np.int64)))
+        if self.live is not None:
+            self.live = np.concatenate((self.live, np.ones(len(doc_len), dtype=bool)))
+        self.num_live += len(doc_len)
+        self.attributes.add(range(first_doc, first_doc + len(doc_len)), [attributes for _, attributes in batch.values()])
+        self._compute_statistics()
+
+    def remove_documents(self, doc_ids: Sequence[str], refresh: bool = True) -> int:
+        """ Deletes documents by ID (unknown IDs are ignored); returns how many were removed """
+        doc_index = self._doc_indices()
+        removed = [doc_index.pop(doc_id) for doc_id in doc_ids if doc_id in doc_index]
+        if not removed:
+            return 0
+
+        if self.live is None:
+            self.live = np.ones(len(self.doc_len), dtype=bool)
+        for doc_idx in removed:
+            self.live[doc_idx] = False
+            doc_terms = self.delta_doc_terms.pop(doc_idx, None)
+            if doc_terms is None:
+                terms = self._base_doc_terms(doc_idx)
+            else:
+                for term in doc_terms:
+                    postings = self.delta_postings[term]
+                    del postings[doc_idx]
+                    if not postings:
+                        del self.delta_postings[term]
+                terms = np.fromiter(doc_terms.keys(), dtype=np.int64, count=len(doc_terms))
+            np.subtract.at(self.doc_freqs, terms, 1)
+
+        self.num_live -= len(removed)
+        if refresh:
+            self._compute_statistics()
+        return len(removed)
+
+    def vocabulary_items(self) -> Iterator[Tuple[str, int]]:
+        """ (term, term ID) pairs across the base vocabulary and the delta segment """
+        if isinstance(self.vocabulary, dict):
+            yield from self.vocabulary.items()
+        else:
+            yield from ((term, term_id) for term_id, term in enumerate(self.vocabulary))
+        yield from self.delta_vocabulary.items()
+
+    def compact(self):
+        """ Merges the delta segment into new CSR posting lists and drops deleted documents / unused terms """
+        term_rows = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        doc_rows, tf_rows = np.asarray(self.postings), np.asarray(self.term_freqs)
+        if self.live is not None:
+            keep = self.live[doc_rows]
+            term_rows, doc_rows, tf_rows = term_rows[keep], doc_rows[keep], tf_rows[keep]
+
+        delta = [(term, doc_idx, tf) for term, docs in self.delta_postings.items() for doc_idx, tf in docs.items()]
+        if delta:
+            delta_terms, delta_docs, delta_tfs = (np.asarray(column, dtype=np.int64) for column in zip(*delta))
+            term_rows = np.concatenate((term_rows, delta_terms))
+            doc_rows = np.concatenate((doc_rows, delta_docs))
+            tf_rows = np.concatenate((tf_rows, delta_tfs.astype(np.int32)))
+
+        live = self.live if self.live is not None else np.ones(len(self.doc_len), dtype=bool)
+        used_terms = self.doc_freqs > 0
+        new_doc = np.cumsum(live) - 1
+        new_term = np.cumsum(used_terms) - 1
+        term_rows, doc_rows = new_term[term_rows], new_doc[doc_rows]
+        order = np.lexsort((doc_rows, term_rows))
+
+        self.vocabulary = {term: int(new_term[term_id]) for term, term_id in self.vocabulary_items() if used_terms[term_id]}
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(term_rows, minlength=len(self.vocabulary))))).astype(np.int64)
+        self.postings = doc_rows[order]
+        self.term_freqs = tf_rows[order].astype(np.int32)
+        self.doc_ids = [self.doc_ids[doc_idx] for doc_idx in np.flatnonzero(live).tolist()]
+        self.doc_len = self.doc_len[live]
+        self.attributes = self.attributes.remap(live)
+
+        self._reset_delta()
+        self._compute_statistics()
+        logging.info(f"BM25 Engine Compacted: {len(self.doc_ids)} Documents, {len(self.vocabulary)} Terms")
@@ -0,0 +1,125 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+from typing import List
+from src.config.settings import EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_MAX_BATCH_SIZE
+
+# Recent queueing-delay samples kept for percentile reporting
+DELAY_SAMPLES = 4096
+
+class EmbeddingService:
+    """ In-Process Micro-Batching Encoder: Coalesces Concurrent Encode Calls into One Model Batch
+
+    Callers enqueue texts and block on a future. A single worker thread takes the first waiting text,
+    keeps collecting for up to batch_window_ms or until max_batch_size texts are queued, runs one
+    batched model.encode and hands each caller its row.
+    """
+
+    def __init__(self, model, batch_window_ms: float = EMBEDDING_BATCH_WINDOW_MS, max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE):
+        self.model = model
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.failures = 0
+        self.encode_seconds = 0.0
+        self.batch_sizes = {}  # power-of-two bucket upper bound -> batches
+        self.queue_delays = deque(maxlen=DELAY_SAMPLES)
+
+        self._worker = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """ Queues one text; the future resolves to its float32 embedding """
+        if self._closed:
+            raise RuntimeError("Embedding service is closed")
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    async def aencode(self, text: str) -> np.ndarray:
+        """ Awaits an embedding without blocking the event loop """
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect(self) -> List[tuple]:
+        """ Blocks for the first request, then gathers more until the window closes or the batch is full """
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            collected = self._collect()
+            batch = [request for request in collected if request is not None]
+            if batch:
+                self._encode(batch)
+            if len(batch) < len(collected):  # close() sentinel
+                return
+
+    def _encode(self, batch: List[tuple]):
+        started = time.perf_counter()
+        try:
+            vectors = self.model.encode([text for text, _, _ in batch], batch_size=len(batch), convert_to_numpy=True).astype("float32")
+            for (_, future, _), vector in zip(batch, vectors):
+                if not future.done():  # the caller may have been cancelled while queued
+                    future.set_result(vector)
+        except Exception as e:
+            logging.error(f"Embedding Batch Failed ({len(batch)} Texts): {e}")
+            self.failures += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        self._record(batch, started)
+
+    def _record(self, batch: List[tuple], started: float):
+        finished = time.perf_counter()
+        bucket = 1 << (len(batch) - 1).bit_length()
+        with self._lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self.encode_seconds += finished - started
+            self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
+            self.queue_delays.extend(started - enqueued for _, _, enqueued in batch)
+
+    def stats(self) -> dict:
+        """ Batch-size distribution, queueing delay (ms) and encode time of recent traffic """
+        with self._lock:
+            delays = np.array(self.queue_delays) * 1000
+            return {
+                "requests": self.requests, "batches": self.batches, "failures": self.failures,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "batch_size_histogram": {f"<={bucket}": count for bucket, count in sorted(self.batch_sizes.items())},
+                "queue_delay_ms": {
+                    "p50": float(np.percentile(delays, 50)) if len(delays) else 0.0,
+                    "p99": float(np.percentile(delays, 99)) if len(delays) else 0.0,
+                    "max": float(delays.max()) if len(delays) else 0.0,
+                },
+                "mean_encode_ms": self.encode_seconds * 1000 / self.batches if self.batches else 0.0,
+                "queued": self._queue.qsize(),
+                "batch_window_ms": self.batch_window * 1000, "max_batch_size": self.max_batch_size,
+            }
+
+    def close(self):
+        """ Stops the worker once already-queued texts are encoded """
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
@@ -1,48 +1,242 @@
+import time
+import asyncio
 import logging
-from pydantic import BaseModel, Field
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pydantic import BaseModel, Field, constr
+from typing import Dict, List, Optional
+from src.config.registry import registry
 from src.retrieval.keyword_search import BM25Search
 from src.retrieval.vector_search import VectorSearch
+from src.retrieval.index_updates import IndexUpdater, ShardedIndexes
+from src.retrieval.query_cache import LRUCache, normalize_query
+from src.retrieval.metadata_filter import filter_key
+from src.retrieval.sharded_search import ShardedBM25, ShardedRetriever, ShardedVectors
+from src.config.settings import (
+    HYBRID_RESULT_CACHE_SIZE, HYBRID_RESULT_CACHE_TTL,
+    HYBRID_SEARCH_WORKERS, HYBRID_BM25_TIMEOUT, HYBRID_VECTOR_TIMEOUT, HYBRID_BATCH_CHUNK_SIZE, RETRIEVAL_SHARDS,
+)
 
 #Define Pydantic Model for Search Query
 class SearchQuery(BaseModel):
     query_text: str = Field(..., min_length=3, description="User query for searching compliance rules")
     top_n: int = Field(default=5, gt=0, description="Number of results to return")
+    filters: Dict[str, List[str]] = Field(default_factory=dict, description="Metadata predicates: attribute -> allowed values (OR within, AND across attributes)")
+
+#Define Pydantic Model for Batch Search Queries
+class BatchSearchQuery(BaseModel):
+    query_texts: List[constr(min_length=3)] = Field(..., min_length=1, description="User queries searched together in one batch")
+    top_n: int = Field(default=5, gt=0, description="Number of results to return per query")
+    filters: Dict[str, List[str]] = Field(default_factory=dict, description="Metadata predicates applied to every query in the batch")
 
 #Define Pydantic Model for Search Results
 class SearchResult(BaseModel):
     id: str
     score: float
 
+#Define Pydantic Model for Hybrid Search Responses
+class HybridSearchResponse(BaseModel):
+    results: List[SearchResult]
+    degraded: List[str] = Field(default_factory=list, description="Legs that failed or timed out ('bm25', 'vector')")
+    index_generation: int = 0
+
 class HybridSearch:
     """ Combines BM25 (Keyword Search) + FAISS (Vector Search) for optimized retrieval """
 
-    def __init__(self):
+    def __init__(self, num_shards: int = RETRIEVAL_SHARDS):
         logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
-        self.bm25_search = BM25Search()
-        self.vector_search = VectorSearch()
+        self.bm25_search = BM25Search(load_index=not num_shards)
+        self.vector_search = VectorSearch(load_index=not num_shards)
+        self.shards = self.load_shards(num_shards) if num_shards else None
+        if self.shards is not None:
+            self.indexes = ShardedIndexes(self.shards, self.bm25_search.bm25, self.vector_search.index)  # Rules change by rebuilding the shards
+        else:
+            self.indexes = IndexUpdater(self.bm25_search, self.vector_search)  # Incremental rule updates
+        self.result_cache = LRUCache(HYBRID_RESULT_CACHE_SIZE, HYBRID_RESULT_CACHE_TTL)
+        self.executor = ThreadPoolExecutor(max_workers=HYBRID_SEARCH_WORKERS, thread_name_prefix="hybrid-search")
+        self.bm25_timeout = HYBRID_BM25_TIMEOUT
+        self.vector_timeout = HYBRID_VECTOR_TIMEOUT
+        self.batch_chunk_size = HYBRID_BATCH_CHUNK_SIZE
+
+    def load_shards(self, num_shards: int) -> ShardedRetriever:
+        """ Partitions the corpus across worker processes; both legs then scatter-gather over the shards """
+        shards = ShardedRetriever(num_shards, self.vector_search.index_config)
+        bm25_ids, corpus, bm25_metadata = self.bm25_search.load_corpus()
+        vector_ids, embeddings, vector_metadata = self.vector_search.load_vectors()
+        shards.build(bm25_ids, corpus, vector_ids, embeddings, bm25_metadata, vector_metadata)
+
+        # Read-only views with the BM25Engine / VectorIndex search interface
+        self.bm25_search.bm25 = ShardedBM25(shards)
+        self.vector_search.index = ShardedVectors(shards)
+        return shards
 
     def retrieve_documents(self, query: SearchQuery) -> List[SearchResult]:
         """ Hybrid search combining BM25 keyword search and FAISS vector search """
+        return self.retrieve(query).results
+
+    async def aretrieve_documents(self, query: SearchQuery) -> List[SearchResult]:
+        """ Async hybrid search: awaits both legs without blocking the event loop """
+        return (await self.aretrieve(query)).results
+
+    def retrieve(self, query: SearchQuery) -> HybridSearchResponse:
+        """ Runs the BM25 and vector legs concurrently on the thread pool, each with its own timeout """
         try:
             #Validate input using Pydantic
             query = SearchQuery(**query.dict())
+            generation, cache_key, cached = self._begin(query)
+            if cached is not None:
+                return cached
 
-            # Run BM25 keyword search
-            bm25_results = self.bm25_search.search(query.query_text, query.top_n)
+            # FAISS and the transformer encode release the GIL, so the two legs overlap
+            started = time.monotonic()
+            bm25_future = self.executor.submit(self._bm25_leg, query, generation)
+            vector_future = self.executor.submit(self._vector_leg, query, generation)
+            # Both deadlines count from submission, so waiting on one leg does not extend the other's budget
+            remaining = lambda timeout: max(0.0, started + timeout - time.monotonic())
+            bm25_results = self._leg_result("bm25", bm25_future.result, remaining(self.bm25_timeout))
+            vector_results = self._leg_result("vector", vector_future.result, remaining(self.vector_timeout))
 
-            # Run Vector search (Semantic Search)
-            vector_results = self.vector_search.search(query.query_text, query.top_n)
+            return self._finish(generation, cache_key, bm25_results, vector_results)
 
-            #Combine & Rank Results (BM25 + Vector)
-            combined_results = self.rank_results(bm25_results, vector_results)
-            logging.info(f"Hybrid Search Results: {combined_results}")
+        except Exception as e:
+            logging.error(f"Hybrid Search Failed: {e}")
+            return HybridSearchResponse(results=[], degraded=["bm25", "vector"])
+
+    async def aretrieve(self, query: SearchQuery) -> HybridSearchResponse:
+        """ Async variant of retrieve() for FastAPI routes """
+        try:
+            query = SearchQuery(**query.dict())
+            generation, cache_key, cached = self._begin(query)
+            if cached is not None:
+                return cached
 
-            return combined_results
+            loop = asyncio.get_running_loop()
+            bm25_future = loop.run_in_executor(self.executor, self._bm25_leg, query, generation)
+            vector_future = loop.run_in_executor(self.executor, self._vector_leg, query, generation)
+            bm25_results, vector_results = await asyncio.gather(
+                self._aleg_result("bm25", bm25_future, self.bm25_timeout),
+                self._aleg_result("vector", vector_future, self.vector_timeout),
+            )
+
+            return self._finish(generation, cache_key, bm25_results, vector_results)
 
         except Exception as e:
             logging.error(f"Hybrid Search Failed: {e}")
-            return []
+            return HybridSearchResponse(results=[], degraded=["bm25", "vector"])
+
+    def _begin(self, query: SearchQuery, generation=None):
+        """ Pins one index generation (both legs see the same rule set) and checks the result cache """
+        generation = self.indexes.current if generation is None else generation
+
+        # Fused results are keyed on the index generation, so any rule update invalidates them
+        cache_key = (normalize_query(query.query_text), query.top_n, filter_key(query.filters), generation.number)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            cached = HybridSearchResponse(results=list(cached), index_generation=generation.number)
+        return generation, cache_key, cached
+
+    def _bm25_leg(self, query: SearchQuery, generation):
+        # Run BM25 keyword search
+        return self.bm25_search.search(query.query_text, query.top_n, engine=generation.bm25, raise_errors=True, filters=query.filters)
+
+    def _vector_leg(self, query: SearchQuery, generation):
+        # Run Vector search (Semantic Search)
+        return self.vector_search.search(query.query_text, query.top_n, index=generation.vectors, raise_errors=True, filters=query.filters)
+
+    @staticmethod
+    def _leg_result(leg: str, result, timeout: float) -> Optional[list]:
+        try:
+            return result(timeout=timeout)
+        except FutureTimeoutError:
+            logging.warning(f"Hybrid Search: {leg} leg timed out after {timeout}s, returning degraded results")
+        except Exception as e:
+            logging.warning(f"Hybrid Search: {leg} leg failed ({e}), returning degraded results")
+        return None
+
+    @staticmethod
+    async def _aleg_result(leg: str, future, timeout: float) -> Optional[list]:
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Hybrid Search: {leg} leg timed out after {timeout}s, returning degraded results")
+        except Exception as e:
+            logging.warning(f"Hybrid Search: {leg} leg failed ({e}), returning degraded results")
+        return None
+
+    def _finish(self, generation, cache_key, bm25_results: Optional[list], vector_results: Optional[list], log_results: bool = True) -> HybridSearchResponse:
+        degraded = [leg for leg, results in (("bm25", bm25_results), ("vector", vector_results)) if results is None]
+
+        #Combine & Rank Results (BM25 + Vector)
+        combined_results = self.rank_results(bm25_results or [], vector_results or [])
+        if log_results:
+            logging.info(f"Hybrid Search Results: {combined_results}")
+
+        # Only complete results are cached; a degraded answer is retried on the next call
+        if not degraded:
+            self.result_cache.put(cache_key, tuple(combined_results))
+        return HybridSearchResponse(results=combined_results, degraded=degraded, index_generation=generation.number)
+
+    def retrieve_batch(self, query: BatchSearchQuery) -> List[HybridSearchResponse]:
+        """ Hybrid search for many queries: batched encode + one matrix FAISS search and one vectorized BM25 pass per chunk
+        (a failed leg degrades the affected responses; any other failure is raised) """
+        try:
+            #Validate input using Pydantic (each query under the single-query rules)
+            query = BatchSearchQuery(**query.dict())
+            queries = [SearchQuery(query_text=query_text, top_n=query.top_n, filters=query.filters) for query_text in query.query_texts]
+            generation = self.indexes.current  # the whole batch sees one rule set
+
+            responses: List[Optional[HybridSearchResponse]] = [None] * len(queries)
+            pending = {}  # cache key -> (query text, rows); repeated queries are searched once
+            for row, single in enumerate(queries):
+                _, cache_key, cached = self._begin(single, generation)
+                if cached is not None:
+                    responses[row] = cached
+                else:
+                    pending.setdefault(cache_key, (single.query_text, []))[1].append(row)
+
+            misses = [(cache_key, query_text, rows) for cache_key, (query_text, rows) in pending.items()]
+            for start in range(0, len(misses), self.batch_chunk_size):
+                chunk = misses[start:start + self.batch_chunk_size]
+                query_texts = [query_text for _, query_text, _ in chunk]
+
+                # Both legs run concurrently; batch jobs are not latency-bound, so no per-leg timeout
+                bm25_future = self.executor.submit(self.bm25_search.search_batch, query_texts, query.top_n, generation.bm25, True, query.filters)
+                vector_future = self.executor.submit(self.vector_search.search_batch, query_texts, query.top_n, generation.vectors, True, query.filters)
+                bm25_rows = self._leg_result("bm25", bm25_future.result, None)
+                vector_rows = self._leg_result("vector", vector_future.result, None)
+
+                for offset, (cache_key, _, rows) in enumerate(chunk):
+                    response = self._finish(generation, cache_key,
+                                            bm25_rows[offset] if bm25_rows is not None else None,
+                                            vector_rows[offset] if vector_rows is not None else None,
+                                            log_results=False)
+                    for row in rows:
+                        responses[row] = response
+
+            logging.info(f"Hybrid Batch Search: {len(queries)} Queries, {len(misses)} Searched, {len(queries) - sum(len(rows) for _, _, rows in misses)} Cache Hits")
+            return responses
+
+        except Exception as e:
+            logging.error(f"Hybrid Batch Search Failed: {e}")
+            raise  # an empty list would read as "no rules matched" for every query
+
+    async def aretrieve_batch(self, query: BatchSearchQuery) -> List[HybridSearchResponse]:
+        """ Async variant of retrieve_batch(); the batch is driven from a worker thread, off the event loop """
+        return await asyncio.to_thread(self.retrieve_batch, query)
+
+    def cache_stats(self) -> dict:
+        """ Hit-rate statistics of the query embedding and fused result caches, plus encoder batching metrics """
+        return {
+            "index_generation": self.indexes.generation,
+            "query_embeddings": self.vector_search.embedding_cache.stats(),
+            "query_encoder": self.vector_search.encoder.stats(),
+            "hybrid_results": self.result_cache.stats(),
+        }
+
+    def close(self):
+        """ Stops the search threads and the shard processes """
+        self.executor.shutdown(wait=True)
+        if self.shards is not None:
+            self.shards.close()
 
     def rank_results(self, bm25_results: List[SearchResult], vector_results: List[SearchResult]) -> List[SearchResult]:
         """ Merges BM25 & Vector Search results using a ranking function """
@@ -57,3 +251,24 @@ class HybridSearch:
         # Sort by highest ranking score
         sorted_results = sorted(combined.items(), key=lambda x: x[1], reverse=True)
         return [SearchResult(id=doc_id, score=score) for doc_id, score in sorted_results]
+
+
+def get_hybrid_search() -> HybridSearch:
+    """ Process-wide instance used by agents, pipelines and routes (loaded on first use or during warmup) """
+    return registry.get("hybrid_search")
+
+def hybrid_search(query_text: str, top_n: int = 5, filters: Optional[Dict[str, List[str]]] = None) -> List[SearchResult]:
+    """ Hybrid search over the shared index (sync, legs run concurrently) """
+    return get_hybrid_search().retrieve_documents(SearchQuery(query_text=query_text, top_n=top_n, filters=filters or {}))
+
+async def ahybrid_search(query_text: str, top_n: int = 5, filters: Optional[Dict[str, List[str]]] = None) -> List[SearchResult]:
+    """ Hybrid search over the shared index for async callers """
+    return await (await registry.aget("hybrid_search")).aretrieve_documents(SearchQuery(query_text=query_text, top_n=top_n, filters=filters or {}))
+
+def hybrid_search_batch(query_texts: List[str], top_n: int = 5, filters: Optional[Dict[str, List[str]]] = None) -> List[HybridSearchResponse]:
+    """ Batched hybrid search over the shared index, results per query in input order """
+    return get_hybrid_search().retrieve_batch(BatchSearchQuery(query_texts=query_texts, top_n=top_n, filters=filters or {}))
+
+async def ahybrid_search_batch(query_texts: List[str], top_n: int = 5, filters: Optional[Dict[str, List[str]]] = None) -> List[HybridSearchResponse]:
+    """ Batched hybrid search over the shared index for async callers """
+    return await (await registry.aget("hybrid_search")).aretrieve_batch(BatchSearchQuery(query_texts=query_texts, top_n=top_n, filters=filters or {}))
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import shutil
+import logging
+import faiss
+import numpy as np
+from typing import Optional, Sequence, Tuple
+from src.config.settings import INDEX_SNAPSHOT_DIR, INDEX_SNAPSHOT_REBUILD
+from src.retrieval.bm25_engine import BM25Engine
+from src.retrieval.vector_index import VectorIndex
+from src.retrieval.metadata_filter import AttributeBitmaps
+
+# Metadata filter bitmaps, stored alongside both index kinds
+ATTRIBUTE_ARRAYS = ("attribute_names", "attribute_values", "attribute_bitmaps")
+
+# Bump whenever the on-disk layout changes; older snapshots are ignored and rebuilt
+SNAPSHOT_FORMAT_VERSION = 3
+
+# Builds are written under this prefix and renamed into place when complete
+BUILDING_PREFIX = "tmp-"
+
+# Memory-map FAISS flat codes where supported so workers share the same pages
+FAISS_MMAP_FLAGS = ("IO_FLAG_MMAP_IFC", "IO_FLAG_MMAP")
+
+
+class PackedStrings:
+    """ Read-Only String Array Stored as a UTF-8 Blob + Offsets (mmap friendly, no per-item objects) """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @staticmethod
+    def pack(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        encoded = [value.encode("utf-8") for value in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return blob, offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _bytes(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0 or i >= len(self):
+            raise IndexError(i)
+        return self._bytes(i).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SortedVocabulary(PackedStrings):
+    """ Term -> Term-ID Lookup over Byte-Sorted Packed Terms (binary search, dict-like .get) """
+
+    def get(self, token: str, default=None):
+        key = token.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._bytes(lo) == key:
+            return lo
+        return default
+
+
+class IndexSnapshot:
+    """ Versioned On-Disk Snapshot Store for One Retrieval Index (FAISS + ID Map, or BM25 Statistics) """
+
+    def __init__(self, name: str, root_dir: str = INDEX_SNAPSHOT_DIR, keep: int = 2):
+        self.root = os.path.join(root_dir, name)
+        self.keep = keep
+
+    def current_path(self) -> Optional[str]:
+        """ Returns the directory of the published build, if any """
+        pointer = os.path.join(self.root, "CURRENT")
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            build_dir = os.path.join(self.root, f.read().strip())
+        return build_dir if os.path.isdir(build_dir) else None
+
+    def _read_manifest(self, kind: str, source: Optional[str] = None) -> Optional[Tuple[str, dict]]:
+        """ The published build's manifest, unless it has another format, or was built from other source data
+        than the given fingerprint (None skips that check), or INDEX_SNAPSHOT_REBUILD forces a rebuild """
+        if INDEX_SNAPSHOT_REBUILD:
+            logging.info(f"Ignoring Index Snapshots for {self.root}: INDEX_SNAPSHOT_REBUILD Is Set")
+            return None
+        build_dir = self.current_path()
+        if build_dir is None:
+            return None
+        with open(os.path.join(build_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION or manifest.get("kind") != kind:
+            logging.info(f"Ignoring Index Snapshot {build_dir}: format {manifest.get('format_version')}/{manifest.get('kind')}")
+            return None
+        if source is not None and manifest.get("source") != source:
+            logging.info(f"Ignoring Index Snapshot {build_dir}: Source Data Changed ({manifest.get('source')} -> {source})")
+            return None
+        return build_dir, manifest
+
+    def _publish(self, build_dir: str, manifest: dict):
+        """ Writes the manifest, renames the finished build into place, then atomically repoints CURRENT
+        so readers never see a partial build """
+        manifest.update(format_version=SNAPSHOT_FORMAT_VERSION, created_at=time.time())
+        with open(os.path.join(build_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+        finished_dir = os.path.join(self.root, os.path.basename(build_dir)[len(BUILDING_PREFIX):])
+        os.rename(build_dir, finished_dir)
+        build_dir = finished_dir
+
+        pointer_tmp = os.path.join(self.root, f"CURRENT.{os.getpid()}.tmp")
+        with open(pointer_tmp, "w") as f:
+            f.write(os.path.basename(build_dir))
+        os.replace(pointer_tmp, os.path.join(self.root, "CURRENT"))
+        self._cleanup(build_dir)
+        logging.info(f"Index Snapshot Published: {build_dir} ({manifest['doc_count']} Documents)")
+
+    def _new_build_dir(self) -> str:
+        """ Private working directory; only renamed to build-<time_ns>-<pid> once complete """
+        build_dir = os.path.join(self.root, f"{BUILDING_PREFIX}build-{time.time_ns()}-{os.getpid()}")
+        os.makedirs(build_dir)
+        return build_dir
+
+    def _cleanup(self, current_dir: str):
+        """ Removes completed builds older than the current one, keeping keep - 1 of them (already-mapped files stay
+        valid for running workers until they reload); builds still being written by other workers are never touched """
+        def started_at(entry: str) -> int:
+            return int(entry.split("-")[1])
+
+        current = started_at(os.path.basename(current_dir))
+        previous = sorted((entry for entry in os.listdir(self.root)
+                           if entry.startswith("build-") and started_at(entry) < current), key=started_at)
+        for entry in previous[:max(len(previous) - (self.keep - 1), 0)]:
+            shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
+
+    def save_bm25(self, engine: BM25Engine, source: Optional[str] = None) -> bool:
+        """ Saves BM25 postings & statistics with the vocabulary re-sorted so it can be binary-searched in place;
+        source is the fingerprint of the data the engine was built from (checked on load) """
+        try:
+            self._save_bm25(engine, source)
+            return True
+        except Exception as e:
+            logging.error(f"BM25 Snapshot Save Failed: {e}")
+            return False
+
+    def _save_bm25(self, engine: BM25Engine, source: Optional[str]):
+        if engine.pending_changes():
+            engine = engine.copy()
+            engine.compact()
+        build_dir = self._new_build_dir()
+
+        vocabulary = dict(engine.vocabulary_items())
+        terms = sorted(vocabulary, key=lambda term: term.encode("utf-8"))
+        old_ids = np.fromiter((vocabulary[term] for term in terms), dtype=np.int64, count=len(terms))
+        lengths = np.diff(engine.indptr)[old_ids]
+        indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        gather = np.repeat(engine.indptr[old_ids] - indptr[:-1], lengths) + np.arange(indptr[-1], dtype=np.int64)
+
+        vocab_blob, vocab_offsets = PackedStrings.pack(terms)
+        id_blob, id_offsets = PackedStrings.pack(engine.doc_ids)
+        arrays = {
+            "vocab_blob": vocab_blob, "vocab_offsets": vocab_offsets,
+            "id_blob": id_blob, "id_offsets": id_offsets,
+            "indptr": indptr, "postings": engine.postings[gather], "term_freqs": engine.term_freqs[gather],
+            "doc_len": engine.doc_len, "doc_norms": engine.doc_norms, "idf": engine.idf[old_ids],
+            **engine.attributes.to_arrays(),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(build_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+        self._publish(build_dir, {
+            "kind": "bm25", "doc_count": len(engine.doc_ids), "term_count": len(terms), "avgdl": engine.avgdl,
+            "params": {"k1": engine.k1, "b": engine.b, "epsilon": engine.epsilon}, "source": source,
+        })
+
+    def load_bm25(self, source: Optional[str] = None) -> Optional[BM25Engine]:
+        """ Loads a BM25 engine whose arrays are memory-mapped from the published build (None when it was built
+        from other source data than the given fingerprint) """
+        try:
+            found = self._read_manifest("bm25", source)
+            if found is None:
+                return None
+            build_dir, manifest = found
+            arrays = {name: np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode="r") for name in (
+                "vocab_blob", "vocab_offsets", "id_blob", "id_offsets",
+                "indptr", "postings", "term_freqs", "doc_len", "doc_norms", "idf") + ATTRIBUTE_ARRAYS}
+
+            engine = BM25Engine.from_arrays(
+                doc_ids=PackedStrings(arrays["id_blob"], arrays["id_offsets"]),
+                vocabulary=SortedVocabulary(arrays["vocab_blob"], arrays["vocab_offsets"]),
+                indptr=arrays["indptr"], postings=arrays["postings"], term_freqs=arrays["term_freqs"],
+                doc_len=arrays["doc_len"], doc_norms=arrays["doc_norms"], idf=arrays["idf"],
+                avgdl=manifest["avgdl"], attributes=AttributeBitmaps.from_arrays(*(arrays[name] for name in ATTRIBUTE_ARRAYS)),
+                **manifest["params"])
+            logging.info(f"BM25 Snapshot Loaded (mmap): {manifest['doc_count']} Documents from {build_dir}")
+            return engine
+
+        except Exception as e:
+            logging.error(f"BM25 Snapshot Load Failed: {e}")
+            return None
+
+    def save_faiss(self, vectors: VectorIndex, build_params: Optional[dict] = None, source: Optional[str] = None) -> bool:
+        """ Saves an ID-mapped FAISS index with its label -> document ID table and tombstones (source as in save_bm25) """
+        try:
+            self._save_faiss(vectors, build_params, source)
+            return True
+        except Exception as e:
+            logging.error(f"FAISS Snapshot Save Failed: {e}")
+            return False
+
+    def _save_faiss(self, vectors: VectorIndex, build_params: Optional[dict], source: Optional[str]):
+        if vectors.delta.ntotal or vectors.tombstones:
+            vectors = vectors.copy()
+            vectors.compact()
+        build_dir = self._new_build_dir()
+        faiss.write_index(vectors.base, os.path.join(build_dir, "faiss.index"))
+        id_blob, id_offsets = PackedStrings.pack(vectors.label_table())
+        np.save(os.path.join(build_dir, "id_blob.npy"), id_blob)
+        np.save(os.path.join(build_dir, "id_offsets.npy"), id_offsets)
+        np.save(os.path.join(build_dir, "tombstones.npy"), np.fromiter(sorted(vectors.tombstones), dtype=np.int64))
+        for name, array in vectors.attributes.to_arrays().items():
+            np.save(os.path.join(build_dir, f"{name}.npy"), array)
+
+        self._publish(build_dir, {"kind": "faiss", "doc_count": len(vectors), "dimension": vectors.dimension, "build_params": build_params,
+                                  "source": source})
+
+    def load_faiss(self, build_params: Optional[dict] = None, source: Optional[str] = None) -> Optional[VectorIndex]:
+        """ Loads the vector index with the FAISS codes and the label table memory-mapped (source as in load_bm25) """
+        try:
+            found = self._read_manifest("faiss", source)
+            if found is None:
+                return None
+            build_dir, manifest = found
+            if build_params is not None and manifest.get("build_params") != build_params:
+                logging.info(f"Ignoring FAISS Snapshot {build_dir}: built with {manifest.get('build_params')}")
+                return None
+
+            flags = faiss.IO_FLAG_READ_ONLY
+            for flag in FAISS_MMAP_FLAGS:
+                if hasattr(faiss, flag):
+                    flags |= getattr(faiss, flag)
+                    break
+            base = faiss.read_index(os.path.join(build_dir, "faiss.index"), flags)
+            label_ids = PackedStrings(np.load(os.path.join(build_dir, "id_blob.npy"), mmap_mode="r"),
+                                      np.load(os.path.join(build_dir, "id_offsets.npy"), mmap_mode="r"))
+            tombstones = set(np.load(os.path.join(build_dir, "tombstones.npy")).tolist())
+            attributes = AttributeBitmaps.from_arrays(*(np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode="r") for name in ATTRIBUTE_ARRAYS))
+            logging.info(f"FAISS Snapshot Loaded (mmap): {manifest['doc_count']} Vectors from {build_dir}")
+            return VectorIndex(base, label_ids, tombstones, attributes)
+
+        except Exception as e:
+            logging.error(f"FAISS Snapshot Load Failed: {e}")
+            return None
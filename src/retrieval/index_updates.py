@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import threading
+import numpy as np
+from pydantic import BaseModel, Field
+from typing import List, NamedTuple, Optional, Sequence
+from src.config.settings import INDEX_COMPACT_THRESHOLD, INDEX_SNAPSHOT_ENABLED
+from src.retrieval.bm25_engine import BM25Engine
+from src.retrieval.vector_index import VectorIndex
+from src.retrieval.metadata_filter import Metadata
+from src.retrieval.sharded_search import ShardedBM25, ShardedVectors
+
+#Define Pydantic Model for Rule Inserts / Edits
+class IndexedDocument(BaseModel):
+    id: str
+    text: str
+    vector: Optional[List[float]] = None  # Encoded with the search model when missing
+    metadata: Metadata = Field(default_factory=dict, description="Filterable attributes, e.g. jurisdiction, transport_mode")
+
+class IndexGeneration(NamedTuple):
+    """ One consistent, immutable version of both retrieval indexes """
+    number: int
+    bm25: BM25Engine
+    vectors: VectorIndex
+
+def _bm25_digest(bm25: BM25Engine) -> str:
+    """ Digest of an engine's indexed content: live (document ID, term, frequency) triples in a canonical order,
+    so a freshly built engine and the same rules loaded from a snapshot (re-sorted vocabulary) agree """
+    if bm25.pending_changes():
+        bm25 = bm25.copy()
+        bm25.compact()  # folds the delta in and drops deleted documents
+    terms = [None] * (len(bm25.indptr) - 1)
+    for term, term_id in bm25.vocabulary_items():
+        terms[term_id] = term
+    doc_ids = list(bm25.doc_ids)
+    counts = np.diff(bm25.indptr)
+    term_order = sorted(np.flatnonzero(counts).tolist(), key=terms.__getitem__)  # a term without postings is not content
+    doc_order = sorted(range(len(doc_ids)), key=doc_ids.__getitem__)
+    term_rank, doc_rank = np.zeros(len(terms), dtype=np.int64), np.zeros(len(doc_ids), dtype=np.int64)
+    term_rank[term_order], doc_rank[doc_order] = np.arange(len(term_order)), np.arange(len(doc_ids))
+
+    term_rows = term_rank[np.repeat(np.arange(len(terms), dtype=np.int64), counts)]
+    doc_rows = doc_rank[np.asarray(bm25.postings, dtype=np.int64)]
+    order = np.lexsort((term_rows, doc_rows))
+
+    digest = hashlib.sha1()
+    digest.update("\n".join(doc_ids[i] for i in doc_order).encode("utf-8"))
+    digest.update("\n".join(terms[i] for i in term_order).encode("utf-8"))
+    digest.update(np.ascontiguousarray(np.stack((doc_rows[order], term_rows[order], np.asarray(bm25.term_freqs, dtype=np.int64)[order]))).tobytes())
+    return digest.hexdigest()
+
+class ShardedIndexes:
+    """ Fixed Index Generation over Sharded Indexes: Rules Change Only by Rebuilding the Shards (No Incremental Updates) """
+
+    def __init__(self, shards, bm25: ShardedBM25, vectors: ShardedVectors):
+        self.shards = shards
+        self.current = IndexGeneration(0, bm25, vectors)
+
+    @property
+    def generation(self) -> int:
+        return self.current.number
+
+    def content_version(self) -> str:
+        """ Digest of the rules the shards were built from """
+        return self.shards.content_digest
+
+
+class IndexUpdater:
+    """ Applies Compliance Rule Inserts, Edits & Deletes to BM25 + FAISS Without Rebuilding
+
+    Each batch is applied to copy-on-write copies of both indexes and published as a new generation
+    with a single reference swap, so a reader that pinned a generation never sees a half-applied update.
+    """
+
+    def __init__(self, bm25_search, vector_search, compact_threshold: int = INDEX_COMPACT_THRESHOLD):
+        if isinstance(bm25_search.bm25, ShardedBM25) or isinstance(vector_search.index, ShardedVectors):
+            raise ValueError("Incremental Rule Updates Need Unsharded Indexes: Set RETRIEVAL_SHARDS=0, or Rebuild the Shards to Change Rules")
+        self.bm25_search = bm25_search
+        self.vector_search = vector_search
+        self.compact_threshold = compact_threshold
+        self._write_lock = threading.Lock()
+
+        if self.bm25_search.bm25 is None:
+            self.bm25_search.bm25 = BM25Engine()
+        if self.vector_search.index is None:
+            dimension = self.vector_search.model.get_sentence_embedding_dimension()
+            self.vector_search.index = VectorIndex.from_embeddings([], np.zeros((0, dimension), dtype="float32"), self.vector_search.index_config)
+        self.current = IndexGeneration(0, self.bm25_search.bm25, self.vector_search.index)
+        self._loaded_bm25: Optional[BM25Engine] = self.current.bm25  # digested lazily, on the first content_version()
+        self._loaded_digest: Optional[str] = None
+        self._update_digest = ""  # chained over every applied batch
+
+    @property
+    def generation(self) -> int:
+        return self.current.number
+
+    def content_version(self) -> str:
+        """ Content-derived rule set version: equal in every process holding the same rules (built or loaded from a
+        snapshot) that applied the same updates (unlike generation numbers, which restart at 0), different after
+        any insert, edit or delete """
+        with self._write_lock:
+            if self._loaded_digest is None:
+                self._loaded_digest = _bm25_digest(self._loaded_bm25)
+                self._loaded_bm25 = None
+            return hashlib.sha1(f"{self._loaded_digest}:{self._update_digest}".encode("utf-8")).hexdigest()
+
+    def upsert(self, documents: Sequence[IndexedDocument]) -> int:
+        return self.apply(upserts=documents)
+
+    def delete(self, doc_ids: Sequence[str]) -> int:
+        return self.apply(deletes=doc_ids)
+
+    def apply(self, upserts: Sequence[IndexedDocument] = (), deletes: Sequence[str] = ()) -> int:
+        """ Applies one batch of changes atomically and returns the new generation number """
+        upserts = list({doc.id: doc for doc in upserts}.values())  # last edit per rule wins
+        deletes = [doc_id for doc_id in deletes if doc_id not in {doc.id for doc in upserts}]
+        vectors = self._embed(upserts) if upserts else None
+
+        with self._write_lock:
+            previous = self.current
+            bm25 = previous.bm25.copy()
+            bm25.remove_documents(deletes)
+            bm25.add_documents([doc.id for doc in upserts], [doc.text.split() for doc in upserts], [doc.metadata for doc in upserts])
+
+            index = previous.vectors.copy()
+            index.remove(deletes)
+            if upserts:
+                index.upsert([doc.id for doc in upserts], vectors, [doc.metadata for doc in upserts])
+
+            # Fold large deltas back into the base so query cost stays flat
+            if bm25.pending_changes() >= self.compact_threshold:
+                bm25.compact()
+            if index.delta.ntotal + len(index.tombstones) >= self.compact_threshold:
+                index.compact()
+
+            self.bm25_search.bm25 = bm25
+            self.vector_search.index = index
+            changes = repr(([(doc.id, doc.text) for doc in upserts], list(deletes))).encode("utf-8")
+            self._update_digest = hashlib.sha1(self._update_digest.encode("utf-8") + changes).hexdigest()
+            self.current = IndexGeneration(previous.number + 1, bm25, index)
+
+        logging.info(f"Index Generation {self.current.number}: {len(upserts)} Upserts, {len(deletes)} Deletes")
+        return self.current.number
+
+    def _embed(self, documents: Sequence[IndexedDocument]) -> np.ndarray:
+        """ Uses supplied vectors and batch-encodes the rest """
+        vectors = np.empty((len(documents), self.current.vectors.dimension), dtype="float32")
+        missing = [i for i, doc in enumerate(documents) if doc.vector is None]
+        for i, doc in enumerate(documents):
+            if doc.vector is not None:
+                vectors[i] = doc.vector
+        if missing:
+            vectors[missing] = self.vector_search.model.encode([documents[i].text for i in missing], convert_to_numpy=True)
+        return vectors
+
+    def save_snapshots(self, source: Optional[str] = None) -> bool:
+        """ Persists the current generation so restarted workers start from it; source is the fingerprint of the rules
+        it reflects (compliance_rules_fingerprint() once the applied changes are committed) - without one, restarted
+        workers rebuild from the database instead of trusting the snapshot """
+        if not INDEX_SNAPSHOT_ENABLED:
+            return False
+        generation = self.current
+        saved_bm25 = self.bm25_search.snapshot.save_bm25(generation.bm25, source)
+        saved_vectors = self.vector_search.snapshot.save_faiss(generation.vectors, self.vector_search.index_config.build_params(), source)
+        return saved_bm25 and saved_vectors
@@ -1,13 +1,18 @@
 import logging
-from pydantic import BaseModel
-from typing import List
-import rank_bm25
+from pydantic import BaseModel, Field
+from typing import List, Optional, Tuple
+from src.config.settings import INDEX_SNAPSHOT_ENABLED
+from src.database.db_operations import compliance_rules_fingerprint
 from src.database.keyword_db import get_all_documents
+from src.retrieval.bm25_engine import BM25Engine
+from src.retrieval.index_snapshot import IndexSnapshot
+from src.retrieval.metadata_filter import Filters, Metadata
 
 #Define Pydantic Model for Compliance Documents
 class ComplianceDocument(BaseModel):
     id: str
     text: str
+    metadata: Metadata = Field(default_factory=dict, description="Filterable attributes, e.g. jurisdiction, transport_mode")
 
 #Define Pydantic Model for Search Results
 class BM25SearchResult(BaseModel):
@@ -17,32 +22,64 @@ class BM25SearchResult(BaseModel):
 class BM25Search:
     """ BM25 Keyword Search for Compliance Documents """
 
-    def __init__(self):
+    def __init__(self, load_index: bool = True):
         logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
-        self.documents, self.corpus, self.bm25 = self.load_documents()
+        self.snapshot = IndexSnapshot("keyword_search")
+        self.bm25 = None  # Left unset when the index lives in shard processes
+        if load_index:
+            source = compliance_rules_fingerprint() if INDEX_SNAPSHOT_ENABLED else None
+            self.bm25 = self.snapshot.load_bm25(source) if INDEX_SNAPSHOT_ENABLED else None  # mmap, no re-tokenizing
+            if self.bm25 is None:
+                self.bm25 = self.load_documents(source)
 
-    def load_documents(self) -> List[ComplianceDocument]:
-        """ Loads all compliance documents into BM25 search model """
+    def load_corpus(self) -> Tuple[List[str], List[List[str]], List[Metadata]]:
+        """ Fetches all compliance documents as (IDs, tokenized texts, metadata) """
+        documents = [ComplianceDocument(**doc) for doc in get_all_documents()]
+        return [doc.id for doc in documents], [doc.text.split() for doc in documents], [doc.metadata for doc in documents]  # Tokenize text
+
+    def load_documents(self, source: Optional[str] = None) -> Optional[BM25Engine]:
+        """ Loads all compliance documents into BM25 search model (snapshotted under the rules' fingerprint) """
         try:
-            documents = [ComplianceDocument(**doc) for doc in get_all_documents()]
-            corpus = [doc.text.split() for doc in documents]  # Tokenize text
-            bm25 = rank_bm25.BM25Okapi(corpus)
-            logging.info(f"BM25 Index Loaded with {len(documents)} Documents")
-            return documents, corpus, bm25
+            doc_ids, corpus, metadata = self.load_corpus()
+            bm25 = BM25Engine.from_corpus(doc_ids, corpus, metadata)
+            logging.info(f"BM25 Index Loaded with {len(doc_ids)} Documents")
+
+            if INDEX_SNAPSHOT_ENABLED:
+                self.snapshot.save_bm25(bm25, source)
+            return bm25
 
         except Exception as e:
             logging.error(f"BM25 Index Load Failed: {e}")
-            return [], [], None
+            return None
 
-    def search(self, query_text: str, top_n: int = 5) -> List[BM25SearchResult]:
-        """ Searches BM25 index and returns top matching documents """
+    def search(self, query_text: str, top_n: int = 5, engine: Optional[BM25Engine] = None, raise_errors: bool = False,
+               filters: Optional[Filters] = None) -> List[BM25SearchResult]:
+        """ Searches BM25 index and returns top matching documents (on a pinned index generation when given),
+        scoring only documents whose metadata matches the filters """
         try:
+            engine = self.bm25 if engine is None else engine
             query_tokens = query_text.split()
-            scores = self.bm25.get_scores(query_tokens)
-            ranked_results = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:top_n]
+            ranked_results = engine.top_k(query_tokens, top_n, filters=filters)
 
-            return [BM25SearchResult(id=self.documents[i].id, score=score) for i, score in ranked_results]
+            return [BM25SearchResult(id=doc_id, score=score) for doc_id, score in ranked_results]
 
         except Exception as e:
             logging.error(f"BM25 Search Failed: {e}")
+            if raise_errors:
+                raise
             return []
+
+    def search_batch(self, query_texts: List[str], top_n: int = 5, engine: Optional[BM25Engine] = None, raise_errors: bool = False,
+                     filters: Optional[Filters] = None) -> List[List[BM25SearchResult]]:
+        """ Scores many queries in one vectorized pass; returns results per query, in input order """
+        try:
+            engine = self.bm25 if engine is None else engine
+            ranked_batch = engine.top_k_batch([query_text.split() for query_text in query_texts], top_n, filters=filters)
+
+            return [[BM25SearchResult(id=doc_id, score=score) for doc_id, score in ranked_results] for ranked_results in ranked_batch]
+
+        except Exception as e:
+            logging.error(f"BM25 Batch Search Failed: {e}")
+            if raise_errors:
+                raise
+            return [[] for _ in query_texts]
@@ -0,0 +1,104 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Document metadata: attribute -> value, or several values (e.g. a rule covering road and rail)
+Metadata = Dict[str, Union[str, List[str]]]
+# Filter predicates: attribute -> allowed values (OR within an attribute, AND across attributes)
+Filters = Dict[str, List[str]]
+
+def filter_key(filters: Optional[Filters]) -> Tuple:
+    """ Canonical hashable form of filter predicates (for cache keys) """
+    if not filters:
+        return ()
+    return tuple(sorted((attribute, tuple(sorted(set(values)))) for attribute, values in filters.items()))
+
+def _values(value) -> Iterable[str]:
+    return value if isinstance(value, (list, tuple, set)) else (value,)
+
+
+class AttributeBitmaps:
+    """ Per-(Attribute, Value) Packed Bitmaps over an Index's ID Space
+
+    Bit i of a bitmap is set when document / label i carries that value (little-endian bit order, the
+    layout faiss.IDSelectorBitmap expects). Bitmaps are never modified in place: add() replaces the
+    touched ones, so a copy() shares every untouched bitmap with the generation it was taken from.
+    """
+
+    def __init__(self, bitmaps: Optional[Dict[Tuple[str, str], np.ndarray]] = None):
+        self.bitmaps = bitmaps or {}
+
+    def __len__(self):
+        return len(self.bitmaps)
+
+    @classmethod
+    def build(cls, metadata: Sequence[Optional[Metadata]]) -> "AttributeBitmaps":
+        """ Bitmaps for IDs 0..n-1, where metadata[i] describes ID i """
+        bitmaps = cls()
+        bitmaps.add(range(len(metadata)), metadata)
+        return bitmaps
+
+    def copy(self) -> "AttributeBitmaps":
+        return AttributeBitmaps(dict(self.bitmaps))
+
+    def add(self, positions: Iterable[int], metadata: Sequence[Optional[Metadata]]):
+        """ Sets the bits of newly assigned IDs (one new array per touched value) """
+        touched: Dict[Tuple[str, str], List[int]] = {}
+        for position, attributes in zip(positions, metadata):
+            for attribute, value in (attributes or {}).items():
+                for item in _values(value):
+                    touched.setdefault((attribute, str(item)), []).append(position)
+
+        for key, key_positions in touched.items():
+            key_positions = np.asarray(key_positions, dtype=np.int64)
+            old = self.bitmaps.get(key, np.zeros(0, dtype=np.uint8))
+            bitmap = np.zeros(max(len(old), int(key_positions.max()) // 8 + 1), dtype=np.uint8)
+            bitmap[:len(old)] = old
+            np.bitwise_or.at(bitmap, key_positions >> 3, (1 << (key_positions & 7)).astype(np.uint8))
+            self.bitmaps[key] = bitmap
+
+    def select(self, filters: Filters, size: int) -> np.ndarray:
+        """ Packed bitmap (ceil(size / 8) bytes) of the IDs matching every attribute predicate """
+        nbytes = (size + 7) // 8
+        selected = None
+        for attribute, values in filters.items():
+            allowed = np.zeros(nbytes, dtype=np.uint8)
+            for value in set(values):
+                bitmap = self.bitmaps.get((attribute, str(value)))
+                if bitmap is not None:
+                    allowed[:len(bitmap)] |= bitmap[:nbytes]
+            selected = allowed if selected is None else selected & allowed
+        return selected if selected is not None else np.full(nbytes, 0xFF, dtype=np.uint8)
+
+    def mask(self, filters: Filters, size: int) -> np.ndarray:
+        """ Boolean mask of length size of the IDs matching the filters """
+        return np.unpackbits(self.select(filters, size), count=size, bitorder="little").astype(bool)
+
+    def remap(self, keep: np.ndarray) -> "AttributeBitmaps":
+        """ Bitmaps after renumbering IDs to the positions of the kept ones (used by compaction) """
+        remapped = {}
+        for key, bitmap in self.bitmaps.items():
+            unpacked = np.unpackbits(bitmap, bitorder="little")[:len(keep)].astype(bool)
+            bits = np.zeros(len(keep), dtype=bool)
+            bits[:len(unpacked)] = unpacked
+            bits = bits[keep]
+            if bits.any():
+                remapped[key] = np.packbits(bits, bitorder="little")
+        return AttributeBitmaps(remapped)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """ Keys and one zero-padded bitmap matrix, for snapshots """
+        keys = list(self.bitmaps)
+        width = max((len(bitmap) for bitmap in self.bitmaps.values()), default=0)
+        matrix = np.zeros((len(keys), width), dtype=np.uint8)
+        for row, key in enumerate(keys):
+            matrix[row, :len(self.bitmaps[key])] = self.bitmaps[key]
+        return {
+            "attribute_names": np.array([attribute for attribute, _ in keys], dtype=object).astype(str),
+            "attribute_values": np.array([value for _, value in keys], dtype=object).astype(str),
+            "attribute_bitmaps": matrix,
+        }
+
+    @classmethod
+    def from_arrays(cls, names: np.ndarray, values: np.ndarray, matrix: np.ndarray) -> "AttributeBitmaps":
+        """ Restores bitmaps as row views of a (possibly memory-mapped) matrix """
+        return cls({(str(name), str(value)): matrix[row] for row, (name, value) in enumerate(zip(names.tolist(), values.tolist()))})
@@ -0,0 +1,167 @@
+import zlib
+import hashlib
+import logging
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.config.settings import RETRIEVAL_SHARDS, SHARD_START_METHOD
+from src.retrieval.ann_index import ANNIndexConfig
+from src.retrieval.bm25_engine import BM25Engine
+from src.retrieval.vector_index import VectorIndex
+from src.retrieval.metadata_filter import Filters, Metadata
+
+def shard_of(doc_id: str, num_shards: int) -> int:
+    """ Stable shard assignment (the same document lands on the same shard in every process) """
+    return zlib.crc32(doc_id.encode("utf-8")) % num_shards
+
+
+# -- Worker process side: one shard per process, held in module state --
+
+_shard: Dict[str, object] = {}
+
+def _init_shard(bm25_ids, corpus, positions, idf, avgdl, vector_ids, embeddings, index_config, bm25_metadata=None, vector_metadata=None):
+    bm25 = BM25Engine.from_corpus(bm25_ids, corpus, bm25_metadata)
+    if len(bm25_ids):
+        bm25.use_global_statistics(idf, avgdl)  # scores match the unsharded engine
+    _shard["bm25"] = bm25
+    _shard["positions"] = dict(zip(bm25_ids, positions))
+    _shard["vectors"] = VectorIndex.from_embeddings(vector_ids, embeddings, ANNIndexConfig(**index_config), vector_metadata)
+
+def _shard_sizes() -> Tuple[int, int]:
+    return len(_shard["bm25"]), len(_shard["vectors"])
+
+def _shard_bm25(queries: List[List[str]], k: int, filters: Optional[Filters] = None) -> List[List[Tuple[str, float, int]]]:
+    positions = _shard["positions"]
+    return [[(doc_id, score, positions[doc_id]) for doc_id, score in ranked]
+            for ranked in _shard["bm25"].top_k_batch(queries, k, filters=filters)]
+
+def _shard_vectors(query_vectors: np.ndarray, k: int, filters: Optional[Filters] = None) -> List[List[Tuple[str, float]]]:
+    return _shard["vectors"].search(query_vectors, k, filters=filters)
+
+
+# -- Coordinator side --
+
+class ShardedRetriever:
+    """ Scatter-Gather BM25 + FAISS over Document Shards Held by Worker Processes
+
+    Documents are hash-partitioned; each worker process builds and owns one BM25 shard and one FAISS
+    shard. IDF and average document length are computed once over the whole corpus and pushed to every
+    shard, so merged BM25 scores (and their tie order) are identical to a single unsharded engine.
+    """
+
+    def __init__(self, num_shards: int = RETRIEVAL_SHARDS, index_config: Optional[ANNIndexConfig] = None, start_method: str = SHARD_START_METHOD):
+        self.num_shards = num_shards
+        self.index_config = index_config or ANNIndexConfig()
+        self.context = multiprocessing.get_context(start_method)  # spawn: no forked FAISS / torch threads
+        self.workers: List[ProcessPoolExecutor] = []
+        self.bm25_size = 0
+        self.vector_size = 0
+        self.dimension = 0
+        self.content_digest = ""
+
+    def build(self, bm25_ids: Sequence[str], corpus: Sequence[Sequence[str]], vector_ids: Sequence[str], embeddings: np.ndarray,
+              bm25_metadata: Optional[Sequence[Metadata]] = None, vector_metadata: Optional[Sequence[Metadata]] = None):
+        """ Partitions the corpus (and its filterable metadata), computes global BM25 statistics and starts one worker per shard """
+        self.close()
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+
+        # Global document frequencies in first-seen order (same term order as an unsharded build)
+        doc_freqs: Dict[str, int] = {}
+        total_len = 0
+        for tokens in corpus:
+            total_len += len(tokens)
+            for token in dict.fromkeys(tokens):
+                doc_freqs[token] = doc_freqs.get(token, 0) + 1
+        avgdl = total_len / len(corpus) if len(corpus) else 0.0
+        idf = dict(zip(doc_freqs, BM25Engine.idf_values(list(doc_freqs.values()), len(corpus), BM25Engine().epsilon)))
+
+        bm25_rows: List[List[int]] = [[] for _ in range(self.num_shards)]
+        for position, doc_id in enumerate(bm25_ids):
+            bm25_rows[shard_of(doc_id, self.num_shards)].append(position)
+        vector_rows: List[List[int]] = [[] for _ in range(self.num_shards)]
+        for row, doc_id in enumerate(vector_ids):
+            vector_rows[shard_of(doc_id, self.num_shards)].append(row)
+
+        for shard in range(self.num_shards):
+            shard_corpus = [corpus[position] for position in bm25_rows[shard]]
+            shard_idf = {token: idf[token] for tokens in shard_corpus for token in tokens}
+            initargs = (
+                [bm25_ids[position] for position in bm25_rows[shard]], shard_corpus, bm25_rows[shard], shard_idf, avgdl,
+                [vector_ids[row] for row in vector_rows[shard]], embeddings[vector_rows[shard]], self.index_config.dict(),
+                [bm25_metadata[position] for position in bm25_rows[shard]] if bm25_metadata is not None else None,
+                [vector_metadata[row] for row in vector_rows[shard]] if vector_metadata is not None else None,
+            )
+            self.workers.append(ProcessPoolExecutor(max_workers=1, mp_context=self.context, initializer=_init_shard, initargs=initargs))
+
+        # Workers start lazily: wait for every shard to finish building so the first query doesn't pay for it
+        sizes = self._scatter(_shard_sizes)
+        self.bm25_size, self.vector_size = sum(size for size, _ in sizes), sum(size for _, size in sizes)
+        self.dimension = embeddings.shape[1]
+        digest = hashlib.sha1("\n".join(bm25_ids).encode("utf-8"))
+        for tokens in corpus:
+            digest.update(("\n" + " ".join(tokens)).encode("utf-8"))
+        self.content_digest = digest.hexdigest()
+        logging.info(f"Sharded Retrieval: {len(bm25_ids)} BM25 Docs, {len(vector_ids)} Vectors across {self.num_shards} Shards "
+                     f"(BM25 Shard Sizes {[size for size, _ in sizes]})")
+
+    def _scatter(self, fn, *args) -> list:
+        """ Sends one request to every shard and gathers the per-shard answers """
+        futures = [worker.submit(fn, *args) for worker in self.workers]
+        return [future.result() for future in futures]
+
+    def top_k_batch(self, queries: Sequence[Sequence[str]], k: int, filters: Optional[Filters] = None) -> List[List[Tuple[str, float]]]:
+        """ Per-query BM25 top-k merged across shards, ordered by (score desc, corpus position) like the unsharded engine """
+        queries = [list(tokens) for tokens in queries]
+        shard_results = self._scatter(_shard_bm25, queries, k, filters)
+        merged = []
+        for row in range(len(queries)):
+            candidates = [hit for results in shard_results for hit in results[row]]
+            candidates.sort(key=lambda hit: (-hit[1], hit[2]))
+            merged.append([(doc_id, score) for doc_id, score, _ in candidates[:k]])
+        return merged
+
+    def search_vectors(self, query_vectors: np.ndarray, k: int, filters: Optional[Filters] = None) -> List[List[Tuple[str, float]]]:
+        """ Per-query nearest neighbours merged across shards by L2 distance """
+        query_vectors = np.ascontiguousarray(query_vectors, dtype="float32")
+        shard_results = self._scatter(_shard_vectors, query_vectors, k, filters)
+        return [sorted((hit for results in shard_results for hit in results[row]), key=lambda hit: hit[1])[:k]
+                for row in range(len(query_vectors))]
+
+    def close(self):
+        for worker in self.workers:
+            worker.shutdown(wait=True)
+        self.workers = []
+
+
+class ShardedBM25:
+    """ BM25Engine-Compatible Read-Only View over a ShardedRetriever """
+
+    def __init__(self, retriever: ShardedRetriever):
+        self.retriever = retriever
+
+    def __len__(self):
+        return self.retriever.bm25_size
+
+    def top_k(self, query_tokens: Sequence[str], k: int = 5, filters: Optional[Filters] = None) -> List[Tuple[str, float]]:
+        return self.retriever.top_k_batch([query_tokens], k, filters)[0]
+
+    def top_k_batch(self, queries: Sequence[Sequence[str]], k: int = 5, filters: Optional[Filters] = None) -> List[List[Tuple[str, float]]]:
+        return self.retriever.top_k_batch(queries, k, filters)
+
+
+class ShardedVectors:
+    """ VectorIndex-Compatible Read-Only View over a ShardedRetriever """
+
+    def __init__(self, retriever: ShardedRetriever):
+        self.retriever = retriever
+
+    @property
+    def dimension(self) -> int:
+        return self.retriever.dimension
+
+    def __len__(self):
+        return self.retriever.vector_size
+
+    def search(self, query_vectors: np.ndarray, k: int, filters: Optional[Filters] = None) -> List[List[Tuple[str, float]]]:
+        return self.retriever.search_vectors(query_vectors, k, filters)
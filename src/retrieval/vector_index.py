@@ -0,0 +1,176 @@
+import copy
+import logging
+import faiss
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from src.retrieval.ann_index import ANNIndexConfig, build_index, search_parameters, unwrap_index
+from src.retrieval.metadata_filter import AttributeBitmaps, Filters, Metadata
+
+def _rebuild_without(base: faiss.Index, labels: np.ndarray) -> faiss.Index:
+    """ Copy of an ID-mapped IVF index without the given labels: live vectors are reconstructed and re-added
+    under their own labels to an emptied clone (same trained quantizer), so the label map stays consistent """
+    inner = faiss.clone_index(unwrap_index(base))
+    ivf = faiss.extract_index_ivf(inner)
+    ivf.make_direct_map()
+    vectors = inner.reconstruct_n(0, inner.ntotal)
+    base_labels = faiss.vector_to_array(faiss.downcast_index(base).id_map).astype(np.int64)
+    keep = ~np.isin(base_labels, labels)
+    ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+    inner.reset()
+    rebuilt = faiss.IndexIDMap2(inner)
+    rebuilt.add_with_ids(np.ascontiguousarray(vectors[keep]), base_labels[keep])
+    return rebuilt
+
+
+class VectorIndex:
+    """ ID-Mapped FAISS Index: Shared Base + Small Delta Index + Tombstones, Updated Copy-on-Write
+
+    Labels are int64 keys into the label -> document ID table. The base index is never mutated in
+    place (it may be memory-mapped): inserts go to a flat delta index, and deleted base vectors become
+    tombstones excluded through an ID selector, so results stay exact without over-fetching.
+    """
+
+    def __init__(self, base: faiss.Index, label_ids: Sequence[str], tombstones: Optional[Set[int]] = None,
+                 attributes: Optional[AttributeBitmaps] = None):
+        self.base = base
+        self.label_ids = label_ids  # base label -> document ID ("" = unused)
+        self.overrides: Dict[int, str] = {}  # labels issued or retired since the base table was written
+        self.delta = faiss.IndexIDMap2(faiss.IndexFlatL2(base.d))
+        self.delta_labels: Set[int] = set()
+        self.tombstones: Set[int] = set(tombstones or ())
+        self.next_label = len(label_ids)
+        self.attributes = attributes if attributes is not None else AttributeBitmaps()  # metadata bitmaps over labels
+        self._labels: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_embeddings(cls, doc_ids: Sequence[str], embeddings: np.ndarray, config: ANNIndexConfig,
+                        metadata: Optional[Sequence[Metadata]] = None) -> "VectorIndex":
+        """ Builds the base index with labels 0..n-1 (and filterable metadata bitmaps when given) """
+        base = build_index(embeddings, config, ids=np.arange(len(doc_ids), dtype=np.int64))
+        return cls(base, list(doc_ids), attributes=AttributeBitmaps.build(metadata) if metadata is not None else None)
+
+    @property
+    def dimension(self) -> int:
+        return self.base.d
+
+    def __len__(self):
+        return self.base.ntotal + self.delta.ntotal - len(self.tombstones)
+
+    def document_id(self, label: int) -> Optional[str]:
+        if label in self.overrides:
+            return self.overrides[label] or None
+        if label < len(self.label_ids):
+            return self.label_ids[label] or None
+        return None
+
+    def labels(self) -> Dict[str, int]:
+        """ Live document ID -> label map (built lazily: read-only workers never pay for it) """
+        if self._labels is None:
+            labels = {doc_id: label for label, doc_id in enumerate(self.label_ids) if doc_id and label not in self.overrides}
+            labels.update({doc_id: label for label, doc_id in self.overrides.items() if doc_id})
+            self._labels = labels
+        return self._labels
+
+    def search(self, query_vectors: np.ndarray, k: int, filters: Optional[Filters] = None) -> List[List[Tuple[str, float]]]:
+        """ Returns, per query row, up to k (document ID, L2 distance) pairs ordered by distance.
+        Metadata filters become an ID selector, so FAISS only scores vectors carrying the allowed values. """
+        query_vectors = np.ascontiguousarray(query_vectors, dtype="float32")
+        params = delta_params = None
+        if filters:
+            # One bitmap selector (filters minus tombstones) covers both the base and the delta labels
+            bitmap = self.attributes.select(filters, self.next_label)
+            if self.tombstones:
+                tombstones = np.fromiter(self.tombstones, dtype=np.int64)
+                np.bitwise_and.at(bitmap, tombstones >> 3, ~(1 << (tombstones & 7)).astype(np.uint8))
+            if not bitmap.any():
+                return [[] for _ in range(len(query_vectors))]
+            selector = faiss.IDSelectorBitmap(self.next_label, faiss.swig_ptr(bitmap))
+            params = search_parameters(self.base, selector)
+            delta_params = faiss.SearchParameters(sel=selector)
+        elif self.tombstones:
+            selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(np.fromiter(self.tombstones, dtype=np.int64)))
+            params = search_parameters(self.base, selector)
+
+        distances, labels = self.base.search(query_vectors, k, params=params)
+        if self.delta.ntotal:
+            delta_distances, delta_labels = self.delta.search(query_vectors, min(k, self.delta.ntotal), params=delta_params)
+            distances = np.hstack((distances, delta_distances))
+            labels = np.hstack((labels, delta_labels))
+            order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+            distances = np.take_along_axis(distances, order, axis=1)
+            labels = np.take_along_axis(labels, order, axis=1)
+
+        return [[(self.document_id(label), distance) for label, distance in zip(row_labels.tolist(), row_distances.tolist()) if label != -1]
+                for row_labels, row_distances in zip(labels, distances)]
+
+    def copy(self) -> "VectorIndex":
+        """ Next-generation copy: shares the base, clones only the (small) delta and the bookkeeping """
+        clone = copy.copy(self)
+        clone.overrides = dict(self.overrides)
+        clone.delta = faiss.clone_index(self.delta)
+        clone.delta_labels = set(self.delta_labels)
+        clone.tombstones = set(self.tombstones)
+        clone.attributes = self.attributes.copy()
+        clone._labels = dict(self._labels) if self._labels is not None else None
+        return clone
+
+    def upsert(self, doc_ids: Sequence[str], vectors: np.ndarray, metadata: Optional[Sequence[Metadata]] = None):
+        """ Inserts documents; an existing ID is replaced (old vector removed, new one added under a new label) """
+        self.remove(doc_ids)
+        labels = np.arange(self.next_label, self.next_label + len(doc_ids), dtype=np.int64)
+        self.delta.add_with_ids(np.ascontiguousarray(vectors, dtype="float32"), labels)
+        if metadata is not None:
+            self.attributes.add(labels.tolist(), metadata)
+
+        live = self.labels()
+        for doc_id, label in zip(doc_ids, labels.tolist()):
+            self.overrides[label] = doc_id
+            self.delta_labels.add(label)
+            live[doc_id] = label
+        self.next_label += len(doc_ids)
+
+    def remove(self, doc_ids: Sequence[str]) -> int:
+        """ Deletes documents by ID; returns how many were present """
+        live = self.labels()
+        removed = [live.pop(doc_id) for doc_id in doc_ids if doc_id in live]
+
+        from_delta = [label for label in removed if label in self.delta_labels]
+        if from_delta:
+            self.delta.remove_ids(faiss.IDSelectorBatch(np.asarray(from_delta, dtype=np.int64)))
+            self.delta_labels.difference_update(from_delta)
+        self.tombstones.update(label for label in removed if label not in from_delta)
+
+        for label in removed:
+            self.overrides[label] = ""
+        return len(removed)
+
+    def compact(self):
+        """ Folds the delta into a private copy of the base and purges tombstones (Flat: removal, IVF: rebuild, HNSW: kept) """
+        base = faiss.clone_index(self.base)
+        if self.tombstones:
+            inner = unwrap_index(base)
+            tombstones = np.fromiter(self.tombstones, dtype=np.int64)
+            if isinstance(inner, faiss.IndexFlat):
+                # IndexIDMap2.remove_ids is only label-safe when the inner index renumbers on removal (Flat does)
+                base.remove_ids(faiss.IDSelectorBatch(tombstones))
+                self.tombstones = set()
+            elif faiss.try_extract_index_ivf(inner) is not None:
+                base = _rebuild_without(base, tombstones)
+                self.tombstones = set()
+            else:
+                logging.info(f"{type(inner).__name__} cannot remove vectors; keeping {len(self.tombstones)} tombstones")
+        if self.delta.ntotal:
+            delta_labels = faiss.vector_to_array(self.delta.id_map).astype(np.int64)
+            base.add_with_ids(self.delta.index.reconstruct_n(0, self.delta.ntotal), delta_labels)
+
+        self.base = base
+        self.delta = faiss.IndexIDMap2(faiss.IndexFlatL2(base.d))
+        self.delta_labels = set()
+        logging.info(f"Vector Index Compacted: {len(self)} Live Vectors, {len(self.tombstones)} Tombstones")
+
+    def label_table(self) -> List[str]:
+        """ Dense label -> document ID table for snapshots ("" marks retired labels) """
+        table = list(self.label_ids) + [""] * (self.next_label - len(self.label_ids))
+        for label, doc_id in self.overrides.items():
+            table[label] = doc_id
+        return table
@@ -1,15 +1,22 @@
 import logging
-import faiss
 import numpy as np
-from pydantic import BaseModel
-from typing import List
-from sentence_transformers import SentenceTransformer
+from pydantic import BaseModel, Field
+from typing import List, Optional, Tuple
+from src.config.registry import registry
+from src.config.settings import EMBEDDING_BATCH_SIZE, INDEX_SNAPSHOT_ENABLED, QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL
+from src.database.db_operations import compliance_rules_fingerprint
 from src.database.vector_db import get_all_vectors
+from src.retrieval.index_snapshot import IndexSnapshot
+from src.retrieval.ann_index import apply_search_params, default_index_config
+from src.retrieval.vector_index import VectorIndex
+from src.retrieval.query_cache import LRUCache, normalize_query
+from src.retrieval.metadata_filter import Filters, Metadata
 
 #Define Pydantic Model for Vectorized Documents
 class VectorizedDocument(BaseModel):
     id: str
     vector: List[float]
+    metadata: Metadata = Field(default_factory=dict, description="Filterable attributes, e.g. jurisdiction, transport_mode")
 
 # Define Pydantic Model for Search Results
 class VectorSearchResult(BaseModel):
@@ -19,35 +26,102 @@ class VectorSearchResult(BaseModel):
 class VectorSearch:
     """ FAISS / ChromaDB-based Semantic Search """
 
-    def __init__(self):
+    def __init__(self, load_index: bool = True):
         logging.basicConfig(filename="logs/service_logs.log", level=logging.INFO, format="%(asctime)s - %(message)s")
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")  #Lightweight transformer model for embeddings
-        self.index, self.document_map = self.load_faiss_index()
+        self.model = registry.get("embedding_model")  #Lightweight transformer model for embeddings, shared per process
+        self.encoder = registry.get("query_encoder")  # Coalesces concurrent query encodes into batches
+        self.embedding_cache = LRUCache(QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL)
+        self.index_config = default_index_config()
+        self.snapshot = IndexSnapshot("vector_search")
+        self.index = None  # Left unset when the index lives in shard processes
+        if load_index:
+            source = compliance_rules_fingerprint() if INDEX_SNAPSHOT_ENABLED else None
+            loaded = self.snapshot.load_faiss(self.index_config.build_params(), source) if INDEX_SNAPSHOT_ENABLED else None  # mmap, shared across workers
+            if loaded is not None:
+                apply_search_params(loaded.base, self.index_config)  # nprobe / efSearch can change without a rebuild
+            self.index = loaded if loaded is not None else self.load_faiss_index(source)
 
-    def load_faiss_index(self):
-        """ Loads FAISS Index with Pre-Encoded Compliance Rules """
+    def load_vectors(self) -> Tuple[List[str], np.ndarray, List[Metadata]]:
+        """ Fetches all pre-encoded compliance rules as (IDs, float32 embedding matrix, metadata) """
+        documents = [VectorizedDocument(**doc) for doc in get_all_vectors()]
+        return [doc.id for doc in documents], np.array([doc.vector for doc in documents]).astype("float32"), [doc.metadata for doc in documents]
+
+    def load_faiss_index(self, source: Optional[str] = None):
+        """ Loads FAISS Index with Pre-Encoded Compliance Rules (snapshotted under the rules' fingerprint) """
         try:
-            documents = [VectorizedDocument(**doc) for doc in get_all_vectors()]
-            embeddings = np.array([doc.vector for doc in documents]).astype("float32")
+            doc_ids, embeddings, metadata = self.load_vectors()
 
-            index = faiss.IndexFlatL2(embeddings.shape[1])  #L2 Distance for Nearest Neighbor Search
-            index.add(embeddings)
+            #L2 Distance, Flat / IVF / HNSW per settings, ID-mapped for incremental updates
+            index = VectorIndex.from_embeddings(doc_ids, embeddings, self.index_config, metadata)
 
-            logging.info(f"FAISS Index Loaded with {len(documents)} Documents")
-            return index, {i: doc.id for i, doc in enumerate(documents)}
+            logging.info(f"FAISS Index Loaded with {len(doc_ids)} Documents")
+            if INDEX_SNAPSHOT_ENABLED:
+                self.snapshot.save_faiss(index, self.index_config.build_params(), source)
+            return index
 
         except Exception as e:
             logging.error(f"FAISS Index Load Failed: {e}")
-            return None, {}
+            return None
+
+    def encode_query(self, query_text: str) -> np.ndarray:
+        """ Encodes a query, reusing the cached embedding for repeated (normalized) query text """
+        key = normalize_query(query_text)
+        query_vector = self.embedding_cache.get(key)
+        if query_vector is None:
+            query_vector = self.encoder.encode(key)
+            query_vector.setflags(write=False)  # Shared between callers
+            self.embedding_cache.put(key, query_vector)
+        return query_vector
+
+    def encode_queries(self, query_texts: List[str]) -> np.ndarray:
+        """ Encodes many queries as one (n, dim) matrix: cache hits are reused, misses go straight to one model.encode call
+        (the micro-batching encoder is for concurrent single-query callers; its batch cap would split a bulk request) """
+        keys = [normalize_query(query_text) for query_text in query_texts]
+        cached = [self.embedding_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, vector in zip(keys, cached) if vector is None))
+
+        encoded = {}
+        if missing:
+            vectors = self.model.encode(missing, batch_size=EMBEDDING_BATCH_SIZE, convert_to_numpy=True).astype("float32")
+            for key, query_vector in zip(missing, vectors):
+                query_vector.setflags(write=False)
+                self.embedding_cache.put(key, query_vector)
+                encoded[key] = query_vector
+
+        query_vectors = np.empty((len(keys), self.model.get_sentence_embedding_dimension()), dtype="float32")
+        for row, (key, vector) in enumerate(zip(keys, cached)):
+            query_vectors[row] = encoded[key] if vector is None else vector
+        return query_vectors
 
-    def search(self, query_text: str, top_n: int = 5) -> List[VectorSearchResult]:
-        """ Searches FAISS for Semantic Matches """
+    def search(self, query_text: str, top_n: int = 5, index: Optional[VectorIndex] = None, raise_errors: bool = False,
+               filters: Optional[Filters] = None) -> List[VectorSearchResult]:
+        """ Searches FAISS for Semantic Matches (on a pinned index generation when given), restricted to the filters """
         try:
-            query_vector = self.model.encode(query_text).astype("float32")
-            distances, indices = self.index.search(np.array([query_vector]), top_n)
+            index = self.index if index is None else index
+            query_vector = self.encode_query(query_text)
+            matches = index.search(np.array([query_vector]), top_n, filters=filters)[0]
 
-            return [VectorSearchResult(id=self.document_map[i], score=1 - distances[0][j]) for j, i in enumerate(indices[0])]
+            return [VectorSearchResult(id=doc_id, score=1 - distance) for doc_id, distance in matches]
 
         except Exception as e:
             logging.error(f"FAISS Search Failed: {e}")
+            if raise_errors:
+                raise
             return []
+
+    def search_batch(self, query_texts: List[str], top_n: int = 5, index: Optional[VectorIndex] = None, raise_errors: bool = False,
+                     filters: Optional[Filters] = None) -> List[List[VectorSearchResult]]:
+        """ Batched encode + one matrix FAISS search; returns results per query, in input order """
+        try:
+            index = self.index if index is None else index
+            if not query_texts:
+                return []
+            matches = index.search(self.encode_queries(query_texts), top_n, filters=filters)
+
+            return [[VectorSearchResult(id=doc_id, score=1 - distance) for doc_id, distance in row] for row in matches]
+
+        except Exception as e:
+            logging.error(f"FAISS Batch Search Failed: {e}")
+            if raise_errors:
+                raise
+            return [[] for _ in query_texts]
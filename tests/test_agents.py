@@ -0,0 +1,194 @@
+import time
+import pytest
+from concurrent.futures import Future
+from src.agents.agent_memory import AgentMemory
+from src.agents.memoization import AgentResultMemo
+from src.database.agent_memory_db import AgentMemoryStore, InMemoryBackend, decode_value
+
+@pytest.fixture
+def store():
+    store = AgentMemoryStore(InMemoryBackend(), flush_interval_ms=10)
+    yield store
+    store.close()
+
+
+def test_memo_reuses_results_until_inputs_change_or_age_out(store):
+    memo = AgentResultMemo(AgentMemory(store), ttls={"Compliance AI": 0.2})
+    inputs, runs = {"rules": "v1"}, []
+
+    def run():
+        runs.append(1)
+        return memo.run("Compliance AI", "S1", lambda: dict(inputs), lambda: {"status": "fixed", "run": len(runs)})
+
+    assert run() == run() == {"status": "fixed", "run": 1}
+    inputs["rules"] = "v2"
+    assert run()["run"] == 3
+    time.sleep(0.25)
+    assert run()["run"] == 4
+    assert memo.stats()["Compliance AI"] == {"hits": 1, "misses": 2, "stale": 1, "errors": 0}
+
+
+def test_memo_never_stores_errors(store):
+    memo = AgentResultMemo(AgentMemory(store), ttls={"Shipment AI": 60})
+    results = iter([{"status": "error"}, {"status": "rerouted"}])
+    assert memo.run("Shipment AI", "S1", lambda: 1, lambda: next(results)) == {"status": "error"}
+    assert memo.run("Shipment AI", "S1", lambda: 1, lambda: next(results)) == {"status": "rerouted"}
+
+
+def test_checkpoints_survive_restart_per_runner(tmp_path):
+    from src.agents.checkpoint import SQLiteCheckpointBackend, WorkflowCheckpoint
+    path = str(tmp_path / "checkpoints.sqlite")
+    crashed = WorkflowCheckpoint(SQLiteCheckpointBackend(path, runner_id="worker-1"))
+    crashed.begin("E1")
+    crashed.record("E1", "compliance_status", "COMPLETED")
+    crashed.begin("E2")
+    crashed.record("E2", "compliance_status", "COMPLETED")
+    crashed.complete("E2")
+    crashed.close()  # process goes away with E1 unfinished
+
+    other = WorkflowCheckpoint(SQLiteCheckpointBackend(path, runner_id="worker-2"))
+    other.begin("E3")
+    assert other.incomplete() == {"E3": {}}  # never another runner's workflows
+
+    restarted = WorkflowCheckpoint(SQLiteCheckpointBackend(path, runner_id="worker-1"))
+    assert restarted.incomplete() == {"E1": {"compliance_status": "COMPLETED"}}
+    restarted.complete("E1")
+    assert restarted.incomplete() == {}
+    other.close()
+    restarted.close()
+
+
+def test_failed_nodes_are_not_counted_as_completed():
+    from src.agents.dag_executor import DAGExecutor
+
+    def broken(state):
+        raise RuntimeError("agent down")
+
+    executor = DAGExecutor({"check": lambda state: state, "fix": broken}, [("check", "fix")], {})
+    try:
+        executor.run_batch([{}, {}], max_events=2)
+        nodes = executor.stats()["nodes"]
+        assert (nodes["check"]["completed"], nodes["check"]["failed"]) == (2, 0)
+        assert (nodes["fix"]["completed"], nodes["fix"]["failed"]) == (0, 2)
+    finally:
+        executor.shutdown()
+
+
+class FlakyBackend(InMemoryBackend):
+    """ Fails the first `failures` batch writes, recording every batch it is sent """
+
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.batches = []
+
+    def write_many(self, items):
+        self.batches.append([key for key, _, _ in items])
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("backend down")
+        super().write_many(items)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_write_behind_coalesces_and_flushes_by_size():
+    backend = FlakyBackend()
+    store = AgentMemoryStore(backend, flush_size=3, flush_interval_ms=60000)
+    try:
+        store.put("a", 1)
+        store.put("a", 2)  # coalesced: only the latest value is written
+        store.put("b", {"route": ["R1"]})
+        assert backend.batches == [] and store.get("a") == 2  # buffered, and readable before the flush
+        store.put("c", 3)
+        assert _wait_for(lambda: backend.batches == [["a", "b", "c"]])
+        assert store.get_many(["a", "b", "c", "d"]) == {"a": 2, "b": {"route": ["R1"]}, "c": 3, "d": None}
+    finally:
+        store.close()
+
+
+def test_write_behind_retries_failed_flushes_without_losing_newer_writes():
+    backend = FlakyBackend(failures=2)
+    store = AgentMemoryStore(backend, flush_size=1000, flush_interval_ms=5)
+    try:
+        store.put("a", "old")
+        store.put("b", "kept")
+        assert _wait_for(lambda: len(backend.batches) >= 1)
+        store.put("a", "new")  # overwritten while the backend is failing
+        assert _wait_for(lambda: store.stats()["pending"] == 0 and store.stats()["flushes"] >= 1)
+        assert store.stats()["flush_failures"] == 2
+        assert {key: decode_value(raw) for key, (raw, _) in backend.data.items()} == {"a": "new", "b": "kept"}
+    finally:
+        store.close()
+
+
+def test_close_flushes_buffered_writes_and_overflow_drops_oldest():
+    backend = FlakyBackend()
+    store = AgentMemoryStore(backend, flush_size=1000, flush_interval_ms=60000, max_buffer=2)
+    for key in ("a", "b", "c"):
+        store.put(key, key)
+    store.close()
+    assert store.stats()["dropped"] == 1
+    assert sorted(backend.data) == ["b", "c"]
+
+
+class HeldDispatch:
+    """ Workflow stand-in: records dispatched event IDs and leaves each run open until released """
+
+    def __init__(self):
+        self.started = []
+        self.runs = {}
+
+    def __call__(self, event_id):
+        self.started.append(event_id)
+        self.runs[event_id] = Future()
+        return self.runs[event_id]
+
+    def release(self, event_id):
+        self.runs[event_id].set_result(None)
+
+
+def test_intake_coalesces_bursts_per_entity():
+    from src.agents.event_queue import COALESCED, QUEUED, EventIntakeQueue
+    dispatch = HeldDispatch()
+    intake = EventIntakeQueue(dispatch, coalesce_window_ms=50)
+    assert [intake.submit(event_id, "S1") for event_id in ("E1", "E2", "E3")] == [QUEUED, COALESCED, COALESCED]
+    assert intake.submit("E4", "S2") == QUEUED
+    assert _wait_for(lambda: sorted(dispatch.started) == ["E3", "E4"])  # one run per entity, with its latest event
+
+    assert intake.submit("E5", "S1") == QUEUED  # S1 still running: held for one follow-up run
+    time.sleep(0.1)
+    assert "E5" not in dispatch.started
+    dispatch.release("E3")
+    assert _wait_for(lambda: "E5" in dispatch.started)
+    for event_id in ("E4", "E5"):
+        dispatch.release(event_id)
+    intake.close(timeout=5)
+    assert intake.stats()["coalesced"] == 2
+
+
+def test_intake_orders_by_priority_and_rejects_when_full():
+    from src.agents.event_queue import PRIORITY_HIGH, PRIORITY_LOW, QUEUED, REJECTED, EventIntakeQueue
+    dispatch = HeldDispatch()
+    intake = EventIntakeQueue(dispatch, capacity=2, coalesce_window_ms=0, max_in_flight=1)
+    intake.submit("busy", "S0")
+    assert _wait_for(lambda: dispatch.started == ["busy"])
+
+    assert intake.submit("later", "S1", PRIORITY_LOW) == QUEUED
+    assert intake.submit("urgent", "S2", PRIORITY_HIGH) == QUEUED
+    started = time.monotonic()
+    assert intake.submit("overflow", "S3", timeout=0.1) == REJECTED  # two entities waiting: full
+    assert time.monotonic() - started >= 0.1
+
+    dispatch.release("busy")
+    assert _wait_for(lambda: dispatch.started == ["busy", "urgent"])
+    dispatch.release("urgent")
+    assert _wait_for(lambda: dispatch.started == ["busy", "urgent", "later"])
+    dispatch.release("later")
+    intake.close(timeout=5)
+    assert intake.stats()["rejected"] == 1 and intake.stats()["dispatched"] == 3
@@ -0,0 +1,315 @@
+import time
+import pytest
+from src.alerts.alert_dispatcher import DEDUPLICATED, DROPPED, GROUPED, SENT, AlertDispatcher
+from src.alerts.channels import SMSChannel, SMTPEmailChannel
+from src.alerts.local_standins import LocalSMSGateway, LocalSMTPServer
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def smtp():
+    server = LocalSMTPServer().start()
+    yield server
+    server.shutdown()
+
+
+def test_alert_storm_is_deduplicated_into_digests(smtp):
+    gateway = LocalSMSGateway()
+    dispatcher = AlertDispatcher([SMTPEmailChannel(*smtp.address), SMSChannel(gateway)], window_ms=200, workers=2)
+    outcomes = [dispatcher.enqueue("Delay", f"hours={i % 2}", "S1") for i in range(500)]
+    assert outcomes[:2] == [SENT, GROUPED]
+    assert outcomes.count(DEDUPLICATED) == 498
+
+    assert _wait_for(lambda: len(gateway.messages) == 2)  # the first alert, then one digest
+    dispatcher.close()
+    first, digest = [message for _, message in gateway.messages]
+    assert first == "🚨 Alert: Delay - Details: hours=0"
+    assert digest.startswith("🚨 Alert Digest: Delay - S1: 1 New, 498 Repeated")
+    assert "- hours=1" in digest
+    assert len(smtp.messages) == 2
+    assert smtp.messages[0]["Subject"] == "Logistics Alert"
+
+    stats = dispatcher.stats()
+    assert stats["digests"] == 1
+    assert stats["channels"]["sms"]["sent"] == stats["channels"]["email"]["sent"] == 2
+
+
+def test_entities_are_grouped_separately():
+    gateway = LocalSMSGateway()
+    dispatcher = AlertDispatcher([SMSChannel(gateway)], window_ms=10000)
+    assert [dispatcher.enqueue("Delay", "late", entity) for entity in ("S1", "S2", "S1")] == [SENT, SENT, DEDUPLICATED]
+    dispatcher.close()  # flushes the open digest for S1
+    assert len(gateway.messages) == 3
+
+
+def test_failed_deliveries_are_retried(smtp):
+    gateway = LocalSMSGateway(failure_rate=1.0)
+    smtp.failure_rate = 1.0
+    dispatcher = AlertDispatcher([SMTPEmailChannel(*smtp.address), SMSChannel(gateway)], max_retries=2, retry_backoff_ms=1)
+    dispatcher.enqueue("Compliance", "missing docs", "S1")
+    dispatcher.close()
+    for channel in dispatcher.stats()["channels"].values():
+        assert (channel["sent"], channel["retries"], channel["failed"]) == (0, 2, 1)
+
+    smtp.failure_rate = 0.0
+    gateway.failure_rate = 0.0
+    dispatcher = AlertDispatcher([SMTPEmailChannel(*smtp.address), SMSChannel(gateway)], retry_backoff_ms=1)
+    for i in range(20):
+        dispatcher.enqueue("Compliance", "missing docs", f"S{i}")
+    dispatcher.close()
+    assert len(smtp.messages) == len(gateway.messages) == 20
+
+
+def test_alerts_without_queue_room_are_dropped():
+    import threading
+    from src.pipeline.alert_pipeline import AlertPipeline
+
+    class HeldChannel:
+        name = "held"
+        def __init__(self):
+            self.release, self.sent = threading.Event(), []
+        def send(self, subject, body):
+            self.release.wait()
+            self.sent.append(body)
+        def close(self):
+            pass
+
+    channel = HeldChannel()
+    dispatcher = AlertDispatcher([channel], window_ms=30, capacity=1, workers=1)
+    assert dispatcher.enqueue("Delay", "late", "S1") == SENT  # taken by the (held) worker
+    assert _wait_for(lambda: dispatcher.stats()["channels"]["held"]["queued"] == 0 and not dispatcher._groups)
+    assert dispatcher.enqueue("Delay", "late", "S2") == SENT  # fills the queue
+    assert _wait_for(lambda: not dispatcher._groups)
+    result = AlertPipeline(dispatcher).trigger_alert("Delay", {"shipment_id": "S3"})
+    assert (result["status"], result["outcome"]) == ("Alert Dropped", DROPPED)
+    assert dispatcher.enqueue("Delay", str({"shipment_id": "S3"}), "S3") == GROUPED  # retried in the digest, not deduplicated
+    assert dispatcher.stats()["dropped"] == 1 and dispatcher.stats()["channels"]["held"]["dropped"] == 1
+    channel.release.set()
+    dispatcher.close()
+
+def test_long_running_groups_forget_old_details():
+    gateway = LocalSMSGateway()
+    dispatcher = AlertDispatcher([SMSChannel(gateway)], window_ms=300)
+    assert [dispatcher.enqueue("Delay", details, "S1") for details in ("hours=1", "hours=2")] == [SENT, GROUPED]
+    assert _wait_for(lambda: dispatcher.stats()["digests"] == 1)
+    assert [dispatcher.enqueue("Delay", details, "S1") for details in ("hours=2", "hours=1", "hours=3")] == [DEDUPLICATED, GROUPED, GROUPED]
+    assert _wait_for(lambda: dispatcher.stats()["digests"] == 2)
+    assert dispatcher._groups[("Delay", "S1")].seen == {"hours=1", "hours=3"}  # only the last window's details
+    dispatcher.close()
+
+def test_sms_channel_requires_a_gateway():
+    with pytest.raises(ValueError):
+        SMSChannel(gateway_url="")
+
+
+def test_only_ok_directions_responses_are_cached():
+    import httpx
+    DataPipeline = pytest.importorskip("src.pipeline.data_pipeline", exc_type=ImportError).DataPipeline  # needs the database layer
+    statuses, requests_seen = iter(["OVER_QUERY_LIMIT", "OK", "OK"]), []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json={"status": next(statuses), "routes": []})
+
+    pipeline = DataPipeline("http://maps.test/maps/api", transport=httpx.MockTransport(handler))
+    pair = [("Rotterdam", "Hamburg")]
+    assert pipeline.fetch_routes(pair)[0]["status"] == "OVER_QUERY_LIMIT"
+    assert pipeline.fetch_routes(pair)[0]["status"] == "OK"  # the error was not reused
+    assert pipeline.fetch_routes(pair)[0]["status"] == "OK"
+    assert len(requests_seen) == 2
+
+
+def test_row_fallback_isolates_failed_rows():
+    from src.config.registry import registry
+    from src.pipeline.ai_pipeline import AIPipeline
+
+    class RowModel:
+        def predict(self, row):
+            if row["weight"] < 0:
+                raise ValueError("negative weight")
+            return row["weight"] * 2
+
+    registry.register("test_row_model", RowModel, warmup=False)
+    chunks = list(AIPipeline(processes=0)._run_batch("test_row_model", "predict_batch", "predict",
+                                                     {"shipment_id": ["S1", "S2", "S3"], "weight": [1, -1, 3]}, "shipment_id", 2, None))
+    assert [result for chunk in chunks for result in chunk["results"]] == [2, None, 6]
+    assert not any("error" in chunk for chunk in chunks)
+
+
+def test_process_pool_follows_requested_size():
+    from src.pipeline.ai_pipeline import AIPipeline
+    pipeline = AIPipeline(processes=2)
+    try:
+        first = pipeline._process_pool(2)
+        assert pipeline._process_pool(2) is first
+        resized = pipeline._process_pool(3)
+        assert resized is not first and resized._max_workers == 3
+    finally:
+        pipeline.close()
+
+
+def test_shipment_upserts_need_a_supported_dialect():
+    operations = pytest.importorskip("src.database.db_operations", exc_type=ImportError)  # needs the database models
+    from sqlalchemy.dialects import mysql
+    statements, written = operations._shipment_upserts([{"id": "S1", "status": "Delayed"}, {"id": "S1", "status": "Arrived"}], "mysql")
+    assert written == 1
+    assert "ON DUPLICATE KEY UPDATE" in str(statements[0][0].compile(dialect=mysql.dialect()))
+    with pytest.raises(ValueError, match="mssql"):
+        operations._shipment_upserts([{"id": "S1", "status": "Delayed"}], "mssql")
+
+
+def _shipment_cache(broker=None):
+    from src.database.shipment_cache import ShipmentCache
+    cache = ShipmentCache(maxsize=100, ttl=60, redis_url="redis://shared" if broker else "")
+    if broker is not None:
+        cache._sync_redis, cache._redis = broker, broker.async_client()
+    return cache
+
+def test_shipment_cache_coalesces_concurrent_misses():
+    import asyncio
+    cache, loads = _shipment_cache(), []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": "S1", "status": "In Transit", "eta": None}
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.aget("S1", loader) for _ in range(20)))
+        assert all(result["status"] == "In Transit" for result in results)
+        await cache.aget("S1", loader)
+
+    asyncio.run(scenario())
+    assert len(loads) == 1
+    assert cache.stats()["coalesced_misses"] == 19 and cache.stats()["loads_in_flight"] == 0
+
+def test_shipment_cache_drops_entries_on_writes():
+    import asyncio
+    cache, statuses = _shipment_cache(), iter(["In Transit", "Delayed", "Arrived", "Lost"])
+
+    async def loader():
+        await asyncio.sleep(0.02)
+        return {"id": "S1", "status": next(statuses), "eta": None}
+
+    async def scenario():
+        assert (await cache.aget("S1", loader))["status"] == "In Transit"
+        cache.invalidate(["S1"])  # as after upsert_shipments / update_shipment_status
+        assert (await cache.aget("S1", loader))["status"] == "Delayed"
+        await cache.aput("S1", {"id": "S1", "status": "Customs Hold", "eta": None})
+        assert (await cache.aget("S1", loader))["status"] == "Customs Hold"
+
+        # A write while the load is in flight: the loaded (possibly older) row is returned but not cached
+        await cache.ainvalidate(["S1"])
+        pending = asyncio.ensure_future(cache.aget("S1", loader))
+        await asyncio.sleep(0.005)
+        await cache.ainvalidate(["S1"])
+        assert (await pending)["status"] == "Arrived"
+        assert (await cache.aget("S1", loader))["status"] == "Lost"
+
+    asyncio.run(scenario())
+
+def test_shipment_cache_writes_reach_other_workers():
+    import asyncio
+    import json
+    import queue
+
+    class Broker:
+        """ Shared Redis keys & one queue per pub/sub subscriber """
+        def __init__(self):
+            self.data, self.subscribers = {}, []
+
+        def get(self, key):
+            return self.data.get(key)
+
+        def set(self, key, value, ex=None, nx=False):
+            if not (nx and key in self.data):
+                self.data[key] = value
+
+        def delete(self, *keys):
+            for key in keys:
+                self.data.pop(key, None)
+
+        def publish(self, channel, message):
+            for subscriber in list(self.subscribers):
+                subscriber.put({"channel": channel, "data": message})
+
+        def pubsub(self, ignore_subscribe_messages=True):
+            broker, messages = self, queue.Queue()
+
+            class PubSub:
+                def subscribe(self, channel):
+                    broker.subscribers.append(messages)
+
+                def get_message(self, timeout):
+                    try:
+                        return messages.get(timeout=timeout)
+                    except queue.Empty:
+                        return None
+
+                def close(self):
+                    broker.subscribers.remove(messages)
+            return PubSub()
+
+        def async_client(self):
+            broker = self
+
+            class AsyncClient:
+                def __getattr__(self, name):
+                    async def call(*args, **kwargs):
+                        return getattr(broker, name)(*args, **kwargs)
+                    return call
+            return AsyncClient()
+
+    broker = Broker()
+    writer, reader = _shipment_cache(broker), _shipment_cache(broker)
+    row = {"id": "S1", "status": "In Transit", "eta": None}
+
+    async def loader():
+        return dict(row)
+
+    try:
+        assert asyncio.run(reader.aget("S1", loader))["status"] == "In Transit"
+        asyncio.run(writer.aget("S2", loader))
+        assert _wait_for(lambda: len(broker.subscribers) == 2)
+        assert asyncio.run(reader.aget("S1", loader))["status"] == "In Transit"  # served locally again
+
+        row["status"] = "Delayed"
+        writer.invalidate(["S1"])
+        assert _wait_for(lambda: reader.stats()["remote_invalidations"] == 1)
+        assert asyncio.run(reader.aget("S1", loader))["status"] == "Delayed"
+
+        asyncio.run(writer.aput("S1", {"id": "S1", "status": "Arrived", "eta": None}))
+        assert _wait_for(lambda: reader.stats()["remote_invalidations"] == 2)
+        assert json.loads(broker.data["shipment:status:S1"])["status"] == "Arrived"
+        assert asyncio.run(reader.aget("S1", loader))["status"] == "Arrived"  # re-read from Redis
+        assert writer.stats()["remote_invalidations"] == 0  # its own messages are skipped
+    finally:
+        writer.close()
+        reader.close()
+
+def test_registry_closes_loaded_components_in_reverse_order():
+    from src.config.registry import ComponentRegistry
+    closed = []
+
+    class Component:
+        def __init__(self, name):
+            self.name = name
+
+        def close(self):
+            closed.append(self.name)
+
+    components = ComponentRegistry()
+    for name in ("store", "unused", "dispatcher"):
+        components.register(name, lambda name=name: Component(name), warmup=False)
+    components.register("plain", object, warmup=False)
+    first = components.get("store")
+    components.get("dispatcher")
+    components.get("plain")
+    components.close()
+    assert closed == ["dispatcher", "store"]  # never-loaded components are not created just to be closed
+    assert components.get("store") is not first  # reloads after a shutdown
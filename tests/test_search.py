@@ -0,0 +1,334 @@
+import faiss
+import numpy as np
+import pytest
+from src.retrieval.ann_index import ANNIndexConfig
+from src.retrieval.vector_index import VectorIndex
+
+INDEX_TYPES = ["flat", "ivf_flat", "ivf_pq", "hnsw"]
+
+@pytest.fixture(scope="module")
+def corpus():
+    vectors = np.random.default_rng(0).standard_normal((2000, 32)).astype("float32")
+    return [f"d{i}" for i in range(2000)], vectors
+
+def _index(corpus, index_type):
+    doc_ids, vectors = corpus
+    return VectorIndex.from_embeddings(doc_ids, vectors, ANNIndexConfig(index_type=index_type, nlist=16, nprobe=16, pq_m=8))
+
+def _top_ids(index, vectors, k=1):
+    return [[doc_id for doc_id, _ in row] for row in index.search(vectors, k)]
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_upsert_and_remove(corpus, index_type):
+    doc_ids, vectors = corpus
+    index = _index(corpus, index_type)
+    index.remove(doc_ids[:10])
+    index.upsert(["new", "d20"], vectors[[0, 1]])  # d20 is replaced by d1's vector
+
+    assert len(index) == 2000 - 10 + 1
+    assert _top_ids(index, vectors[[0]]) == [["new"]]
+    assert "d0" not in {doc_id for row in _top_ids(index, vectors[:10], k=5) for doc_id in row}
+    assert _top_ids(index, vectors[[1]], k=1) == [["d20"]]
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_compact_keeps_labels(corpus, index_type):
+    doc_ids, vectors = corpus
+    index = _index(corpus, index_type)
+    index.remove(doc_ids[:100])
+    index.upsert(["new"], vectors[[0]])
+    index.compact()
+
+    assert index.delta.ntotal == 0
+    assert len(index) == 2000 - 100 + 1
+    assert _top_ids(index, vectors[[500, 501, 1999]]) == [["d500"], ["d501"], ["d1999"]]
+    assert _top_ids(index, vectors[[0]]) == [["new"]]
+    assert not {doc_id for row in _top_ids(index, vectors[:100], k=3) for doc_id in row} & set(doc_ids[:100])
+    if index_type != "hnsw":
+        assert not index.tombstones  # physically removed (Flat) or rebuilt (IVF)
+
+    # Still updatable after compaction
+    index.remove(["d500"])
+    assert _top_ids(index, vectors[[500]]) != [["d500"]]
+
+
+def test_compact_keeps_nprobe(corpus):
+    index = _index(corpus, "ivf_flat")
+    index.remove(["d0"])
+    index.compact()
+    assert faiss.extract_index_ivf(index.base).nprobe == 16
+
+
+def _updater(doc_ids, texts, vectors):
+    from types import SimpleNamespace
+    from src.retrieval.bm25_engine import BM25Engine
+    from src.retrieval.index_updates import IndexUpdater
+    bm25_search = SimpleNamespace(bm25=BM25Engine.from_corpus(doc_ids, [text.split() for text in texts]))
+    vector_search = SimpleNamespace(index=VectorIndex.from_embeddings(doc_ids, vectors, ANNIndexConfig()), index_config=ANNIndexConfig())
+    return IndexUpdater(bm25_search, vector_search)
+
+def test_content_version_is_derived_from_rules(corpus):
+    from src.retrieval.index_updates import IndexedDocument
+    _, vectors = corpus
+    doc_ids, texts = ["r1", "r2"], ["export license required", "hazmat label missing"]
+    first, second = _updater(doc_ids, texts, vectors[:2]), _updater(doc_ids, texts, vectors[:2])
+    assert first.content_version() == second.content_version()  # same rules, separate processes
+
+    original = first.content_version()
+    first.upsert([IndexedDocument(id="r2", text="hazmat label and permit missing", vector=vectors[2].tolist())])
+    assert first.content_version() != original
+
+    # A restart that rebuilds the edited rules starts again at generation 0, but not at the old version
+    restarted = _updater(doc_ids, [texts[0], "hazmat label and permit missing"], vectors[:2])
+    assert restarted.generation == 0
+    assert restarted.content_version() != original
+
+
+def test_content_version_survives_snapshots(tmp_path, texts):
+    from types import SimpleNamespace
+    from src.retrieval.bm25_engine import BM25Engine
+    from src.retrieval.index_snapshot import IndexSnapshot
+    from src.retrieval.index_updates import IndexUpdater
+    doc_ids, corpus = texts
+    vectors = VectorIndex.from_embeddings([], np.zeros((0, 8), dtype="float32"), ANNIndexConfig())
+    version = lambda bm25: IndexUpdater(SimpleNamespace(bm25=bm25), SimpleNamespace(index=vectors)).content_version()
+    built = BM25Engine.from_corpus(doc_ids, corpus)
+    snapshot = IndexSnapshot("bm25", root_dir=str(tmp_path))
+    assert snapshot.save_bm25(built)
+    assert version(snapshot.load_bm25()) == version(built)  # workers that loaded the snapshot share memo entries with builders
+
+    updated = BM25Engine.from_corpus(doc_ids[:250], corpus[:250]).copy()
+    updated.add_documents(doc_ids[250:], corpus[250:])  # same rules, still in the delta segment
+    assert version(updated) == version(built)
+
+def test_updater_refuses_sharded_indexes():
+    from types import SimpleNamespace
+    from src.retrieval.index_updates import IndexUpdater
+    from src.retrieval.sharded_search import ShardedBM25, ShardedRetriever, ShardedVectors
+    shards = ShardedRetriever(2)
+    with pytest.raises(ValueError, match="RETRIEVAL_SHARDS"):
+        IndexUpdater(SimpleNamespace(bm25=ShardedBM25(shards)), SimpleNamespace(index=ShardedVectors(shards)))
+
+
+def _hybrid(bm25_leg, vector_leg, timeout=0.2):
+    from concurrent.futures import ThreadPoolExecutor
+    from types import SimpleNamespace
+    from src.retrieval.query_cache import LRUCache
+    HybridSearch = pytest.importorskip("src.retrieval.hybrid_search", exc_type=ImportError).HybridSearch  # needs the database layer
+    search = HybridSearch.__new__(HybridSearch)  # legs stubbed below: no models or indexes needed
+    search.indexes = SimpleNamespace(current=SimpleNamespace(number=0))
+    search.result_cache = LRUCache(16)
+    search.executor = ThreadPoolExecutor(max_workers=2)
+    search.bm25_timeout = search.vector_timeout = timeout
+    search.batch_chunk_size = 8
+    search._bm25_leg = lambda query, generation: bm25_leg()
+    search._vector_leg = lambda query, generation: vector_leg()
+    return search
+
+def test_legs_share_one_deadline():
+    import time
+    search = pytest.importorskip("src.retrieval.hybrid_search", exc_type=ImportError)
+    SearchQuery, SearchResult = search.SearchQuery, search.SearchResult
+
+    def slow():
+        time.sleep(0.15)
+        return [SearchResult(id="bm25", score=1.0)]
+
+    def slower():
+        time.sleep(0.3)
+        return [SearchResult(id="vector", score=1.0)]
+
+    started = time.monotonic()
+    response = _hybrid(slow, slower).retrieve(SearchQuery(query_text="export license"))
+    assert time.monotonic() - started < 0.28  # not bm25 wait + full vector timeout
+    assert response.degraded == ["vector"]
+    assert [result.id for result in response.results] == ["bm25"]
+
+def test_batch_failure_is_raised():
+    search = pytest.importorskip("src.retrieval.hybrid_search", exc_type=ImportError)
+    hybrid = _hybrid(list, list)
+    hybrid._begin = lambda query, generation: 1 / 0  # a failure outside the legs
+    with pytest.raises(ZeroDivisionError):
+        hybrid.retrieve_batch(search.BatchSearchQuery(query_texts=["export license"]))
+
+def test_bulk_query_encode_bypasses_micro_batcher():
+    from types import SimpleNamespace
+    VectorSearch = pytest.importorskip("src.retrieval.vector_search", exc_type=ImportError).VectorSearch  # needs the database layer
+    from src.retrieval.query_cache import LRUCache
+    calls = []
+    def encode(texts, batch_size, convert_to_numpy):
+        calls.append(len(texts))
+        return np.ones((len(texts), 4), dtype="float32")
+    search = VectorSearch.__new__(VectorSearch)
+    search.model = SimpleNamespace(encode=encode, get_sentence_embedding_dimension=lambda: 4)
+    search.encoder = None  # the micro-batcher (capped per batch) must not be used for bulk requests
+    search.embedding_cache = LRUCache(1000)
+    queries = [f"query {i}" for i in range(100)]
+    assert search.encode_queries(queries + queries[:10]).shape == (110, 4)
+    assert calls == [100]  # one model call for every distinct miss
+    search.encode_queries(queries)
+    assert calls == [100]  # all cached
+
+def test_snapshot_cleanup_spares_builds_in_progress(tmp_path, corpus):
+    import os
+    import time
+    from src.retrieval.index_snapshot import IndexSnapshot
+    snapshot = IndexSnapshot("vectors", root_dir=str(tmp_path), keep=2)
+    index = _index(corpus, "flat")
+    assert snapshot.save_faiss(index)
+    in_progress = snapshot._new_build_dir()  # another worker, still writing
+    assert snapshot.save_faiss(index) and snapshot.save_faiss(index)
+    later = os.path.join(snapshot.root, f"build-{time.time_ns() + 10 ** 9}-1")  # finished by another worker, not yet current
+    os.makedirs(later)
+    assert snapshot.save_faiss(index)
+
+    builds = sorted(entry for entry in os.listdir(snapshot.root) if entry.startswith("build-"))
+    assert os.path.isdir(in_progress) and os.path.isdir(later)
+    assert len(builds) == 3  # current, one previous (keep=2), and the later one
+    assert os.path.join(snapshot.root, builds[1]) == snapshot.current_path()
+    assert snapshot.load_faiss() is not None
+
+def test_snapshot_rebuilds_when_source_changes(tmp_path, corpus, texts, monkeypatch):
+    import src.retrieval.index_snapshot as index_snapshot
+    from src.retrieval.bm25_engine import BM25Engine
+    snapshot = index_snapshot.IndexSnapshot("rules", root_dir=str(tmp_path))
+    doc_ids, tokens = texts
+    assert snapshot.save_bm25(BM25Engine.from_corpus(doc_ids, tokens), source="300:2024-05-01")
+    assert snapshot.load_bm25("300:2024-05-01") is not None
+    assert snapshot.load_bm25("301:2024-05-02") is None  # rules changed since the build
+    assert snapshot.load_bm25() is not None  # database unreachable: loaded unchecked
+
+    assert snapshot.save_faiss(_index(corpus, "flat"), source="300:2024-05-01")
+    assert snapshot.load_faiss(source="300:2024-05-01") is not None
+    assert snapshot.load_faiss(source="301:2024-05-02") is None
+
+    monkeypatch.setattr(index_snapshot, "INDEX_SNAPSHOT_REBUILD", True)
+    assert snapshot.load_faiss(source="300:2024-05-01") is None
+
+
+@pytest.fixture(scope="module")
+def texts():
+    rng = np.random.default_rng(1)
+    vocabulary = [f"t{i}" for i in range(60)]
+    return [[f"r{i}" for i in range(300)], [list(rng.choice(vocabulary, size=rng.integers(3, 25))) for _ in range(300)]]
+
+def _reference_top_k(corpus, query, k):
+    rank_bm25 = pytest.importorskip("rank_bm25")
+    scores = rank_bm25.BM25Okapi(corpus).get_scores(query)
+    return [(index, score) for index, score in sorted(enumerate(scores), key=lambda item: -item[1])[:k]]
+
+@pytest.mark.parametrize("query", [["t1"], ["t3", "t7", "t3"], ["t5", "missing"], ["missing"]])
+def test_bm25_matches_rank_bm25(texts, query):
+    from src.retrieval.bm25_engine import BM25Engine
+    doc_ids, corpus = texts
+    engine = BM25Engine.from_corpus(doc_ids, corpus)
+    expected = _reference_top_k(corpus, query, 10)
+    assert [doc_id for doc_id, _ in engine.top_k(query, 10)] == [doc_ids[index] for index, _ in expected]
+    assert [score for _, score in engine.top_k(query, 10)] == pytest.approx([score for _, score in expected])
+    assert engine.top_k_batch([query, ["t2"]], 10)[0] == engine.top_k(query, 10)
+
+def test_streamed_bm25_build_matches_single_pass(texts):
+    from src.retrieval.bm25_engine import BM25Engine
+    doc_ids, corpus = texts
+    chunks = [(doc_ids[start:start + 64], corpus[start:start + 64], None) for start in range(0, len(doc_ids), 64)]
+    streamed, single = BM25Engine.from_chunks(chunks), BM25Engine.from_corpus(doc_ids, corpus)
+    for query in (["t1"], ["t3", "t7"], ["t11", "t12", "t13"]):
+        assert streamed.top_k(query, 10) == single.top_k(query, 10)
+
+def test_bm25_updates_match_a_rebuild(texts):
+    from src.retrieval.bm25_engine import BM25Engine
+    doc_ids, corpus = texts
+    engine = BM25Engine.from_corpus(doc_ids[:250], corpus[:250]).copy()
+    engine.remove_documents(doc_ids[:20])
+    engine.add_documents(doc_ids[250:], corpus[250:])
+    rebuilt = BM25Engine.from_corpus(doc_ids[20:], corpus[20:])
+    queries = (["t1"], ["t3", "t7"], ["t40", "t41"])
+    for _ in ("delta", "compacted"):
+        for query in queries:
+            ranked, expected = engine.top_k(query, 10), rebuilt.top_k(query, 10)
+            assert [doc_id for doc_id, _ in ranked] == [doc_id for doc_id, _ in expected]
+            assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+        engine.compact()
+
+
+def _jurisdictions(doc_ids):
+    return [{"jurisdiction": ["EU", "US", "UK"][i % 3], "transport_mode": ["road", "rail"] if i % 5 == 0 else "sea"}
+            for i in range(len(doc_ids))]
+
+def _filtered_scores(engine, query, filters):
+    return {doc_id: pytest.approx(score) for doc_id, score in engine.top_k(query, len(engine), filters=filters)}
+
+def test_filtered_bm25_survives_updates_and_snapshots(tmp_path, texts):
+    from src.retrieval.bm25_engine import BM25Engine
+    from src.retrieval.index_snapshot import IndexSnapshot
+    doc_ids, corpus = texts
+    metadata = _jurisdictions(doc_ids)
+    engine = BM25Engine.from_corpus(doc_ids, corpus, metadata)
+    filters, query = {"jurisdiction": ["EU"], "transport_mode": ["rail"]}, ["t3", "t7"]
+    allowed = {doc_id for doc_id, attributes in zip(doc_ids, metadata) if attributes["jurisdiction"] == "EU" and "rail" in attributes["transport_mode"]}
+    unfiltered = [(doc_id, score) for doc_id, score in engine.top_k(query, len(doc_ids)) if doc_id in allowed]
+    assert [score for _, score in engine.top_k(query, 5, filters=filters)] == pytest.approx([score for _, score in unfiltered[:5]])
+    assert {doc_id for doc_id, _ in engine.top_k(query, len(doc_ids), filters=filters)} == allowed  # zero scores pad with matches only
+
+    updated = engine.copy()
+    removed = [doc_id for doc_id, _ in unfiltered[:3]]
+    updated.remove_documents(removed)
+    updated.add_documents(["eu-new", "us-new", "r15"], [query * 3, query * 3, ["t50"]],
+                          [{"jurisdiction": "EU", "transport_mode": "rail"}, {"jurisdiction": "US", "transport_mode": "rail"},
+                           {"jurisdiction": "US", "transport_mode": "sea"}])  # r15 no longer matches
+    ranked = updated.top_k(query, len(doc_ids), filters=filters)
+    assert ranked[0][0] == "eu-new"
+    assert {doc_id for doc_id, _ in ranked} == allowed - set(removed) - {"r15"} | {"eu-new"}
+
+    snapshot = IndexSnapshot("filtered_bm25", root_dir=str(tmp_path))
+    assert snapshot.save_bm25(updated)
+    assert _filtered_scores(snapshot.load_bm25(), query, filters) == _filtered_scores(updated, query, filters)
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_filtered_vector_search_survives_updates_and_snapshots(tmp_path, corpus, index_type):
+    from src.retrieval.index_snapshot import IndexSnapshot
+    doc_ids, vectors = corpus
+    metadata = _jurisdictions(doc_ids)
+    index = VectorIndex.from_embeddings(doc_ids, vectors, ANNIndexConfig(index_type=index_type, nlist=16, nprobe=16, pq_m=8), metadata)
+    filters = {"jurisdiction": ["EU"]}
+    allowed = {doc_id for doc_id, attributes in zip(doc_ids, metadata) if attributes["jurisdiction"] == "EU"}
+    for row in index.search(vectors[:20], 10, filters=filters):
+        assert row and {doc_id for doc_id, _ in row} <= allowed
+    if index_type == "flat":
+        exact = [sorted(allowed, key=lambda doc_id: float(np.sum((vectors[int(doc_id[1:])] - query) ** 2)))[:10] for query in vectors[:20]]
+        assert _top_ids(index, vectors[:20], k=10) != exact  # unfiltered neighbours differ
+        assert [[doc_id for doc_id, _ in row] for row in index.search(vectors[:20], 10, filters=filters)] == exact
+
+    index.remove(["d0", "d3"])
+    index.upsert(["eu-new", "us-new", "d6"], vectors[[1, 2, 6]], [{"jurisdiction": "EU"}, {"jurisdiction": "US"}, {"jurisdiction": "US"}])
+    allowed = allowed - {"d0", "d3", "d6"} | {"eu-new"}
+    results = index.search(vectors[[1, 2, 6]], 10, filters=filters)
+    assert results[0][0][0] == "eu-new"
+    assert all({doc_id for doc_id, _ in row} <= allowed for row in results)
+
+    snapshot = IndexSnapshot("filtered_vectors", root_dir=str(tmp_path))
+    assert snapshot.save_faiss(index)
+    index.compact()  # as saved (IVF-PQ re-encodes when rebuilt)
+    assert snapshot.load_faiss().search(vectors[:20], 10, filters=filters) == index.search(vectors[:20], 10, filters=filters)
+
+def test_sharded_bm25_matches_a_single_engine(texts):
+    from src.retrieval.bm25_engine import BM25Engine
+    from src.retrieval.sharded_search import ShardedRetriever
+    doc_ids, corpus = texts
+    metadata = _jurisdictions(doc_ids)
+    embeddings = np.random.default_rng(2).standard_normal((len(doc_ids), 8)).astype("float32")
+    engine = BM25Engine.from_corpus(doc_ids, corpus, metadata)
+    vectors = VectorIndex.from_embeddings(doc_ids, embeddings, ANNIndexConfig(), metadata)
+    shards = ShardedRetriever(2)
+    try:
+        shards.build(doc_ids, corpus, doc_ids, embeddings, metadata, metadata)
+        queries = [["t1"], ["t3", "t7", "t3"], ["t5", "missing"], ["t11", "t12", "t13"]]
+        for filters in (None, {"jurisdiction": ["EU"]}):
+            for ranked, expected in zip(shards.top_k_batch(queries, 10, filters=filters), engine.top_k_batch(queries, 10, filters=filters)):
+                assert [doc_id for doc_id, _ in ranked] == [doc_id for doc_id, _ in expected]  # same order, ties included
+                assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+            sharded_hits = shards.search_vectors(embeddings[:5], 5, filters=filters)
+            assert [[doc_id for doc_id, _ in row] for row in sharded_hits] == [[doc_id for doc_id, _ in row] for row in vectors.search(embeddings[:5], 5, filters=filters)]
+    finally:
+        shards.close()